@@ -42,6 +42,7 @@ def create_api(app):
         - **404**: Recurso no encontrado
         - **409**: Conflicto (ej: email duplicado)
         - **413**: Archivo muy grande
+        - **429**: Demasiadas solicitudes (ver encabezados `RateLimit-*` y `Retry-After`)
         - **500**: Error interno del servidor
         ''',
         doc='/api/docs/',  # URL para Swagger UI
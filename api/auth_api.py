@@ -1,12 +1,14 @@
 """
 API Swagger para endpoints de autenticación
 """
-import asyncio
-from flask import request, current_app
+from flask import request, current_app, g
 from flask_restx import Namespace, Resource
 
 from controllers.auth_controller import AuthController
+from services.async_runner import async_runner
+from services.rate_limiting import rate_limit
 from .swagger_models import create_swagger_models
+from .profile_api import swagger_jwt_required
 
 # Crear namespace para autenticación
 auth_ns = Namespace('auth', description='Autenticación y gestión de usuarios', path='/api/auth')
@@ -33,18 +35,13 @@ def register_auth_api(api):
         )
         @auth_ns.expect(models['user_registration'], validate=True)
         @auth_ns.marshal_with(models['user_response'], code=201)
+        @rate_limit('register')
         def post(self):
             """Registrar nuevo usuario"""
             try:
                 data = request.get_json()
-                # Ejecutar función async en un loop
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                try:
-                    result = loop.run_until_complete(auth_controller.register(data))
-                    return result
-                finally:
-                    loop.close()
+                # Ejecutar el controlador async en el event loop del worker
+                return async_runner.run(auth_controller.register(data))
             except Exception as e:
                 current_app.logger.error(f"Error registering user: {str(e)}")
                 return {'message': 'Error interno del servidor'}, 500
@@ -58,16 +55,21 @@ def register_auth_api(api):
                 200: ('Login exitoso', models['user_response']),
                 400: ('Datos de entrada inválidos', models['error_response']),
                 401: ('Credenciales incorrectas', models['error_response']),
-                404: ('Usuario no encontrado', models['error_response'])
+                404: ('Usuario no encontrado', models['error_response']),
+                429: ('Demasiados intentos fallidos', models['error_response'])
             }
         )
         @auth_ns.expect(models['user_login'], validate=True)
         @auth_ns.marshal_with(models['user_response'], code=200)
+        @rate_limit('login')
         def post(self):
             """Iniciar sesión de usuario"""
             try:
                 data = request.get_json()
-                return auth_controller.login(data)
+                response_data, status_code = auth_controller.login(data, request.remote_addr)
+                if status_code == 429:
+                    return response_data, status_code, {'Retry-After': str(response_data['retryAfter'])}
+                return response_data, status_code
             except Exception as e:
                 current_app.logger.error(f"Error logging in user: {str(e)}")
                 return {'message': 'Error interno del servidor'}, 500
@@ -85,6 +87,7 @@ def register_auth_api(api):
         )
         @auth_ns.expect(models['forgot_password'], validate=True)
         @auth_ns.marshal_with(models['base_response'], code=200)
+        @rate_limit('forgot_password')
         def post(self):
             """Solicitar restablecimiento de contraseña"""
             try:
@@ -106,6 +109,7 @@ def register_auth_api(api):
         )
         @auth_ns.expect(models['verify_token'], validate=True)
         @auth_ns.marshal_with(models['base_response'], code=200)
+        @rate_limit('verify_reset_token')
         def post(self):
             """Verificar token de restablecimiento"""
             try:
@@ -128,6 +132,7 @@ def register_auth_api(api):
         )
         @auth_ns.expect(models['reset_password'], validate=True)
         @auth_ns.marshal_with(models['base_response'], code=200)
+        @rate_limit('reset_password')
         def post(self):
             """Restablecer contraseña"""
             try:
@@ -137,6 +142,75 @@ def register_auth_api(api):
                 current_app.logger.error(f"Error resetting password: {str(e)}")
                 return {'message': 'Error interno del servidor'}, 500
 
+    @auth_ns.route('/refresh')
+    class RefreshResource(Resource):
+        @auth_ns.doc(
+            'refresh_token',
+            description='Renovar el access token con un refresh token (rotación)',
+            responses={
+                200: ('Token renovado exitosamente', models['token_response']),
+                400: ('Refresh token requerido', models['error_response']),
+                401: ('Refresh token inválido, expirado o reutilizado', models['error_response'])
+            }
+        )
+        @auth_ns.expect(models['refresh_request'], validate=True)
+        @auth_ns.marshal_with(models['token_response'], code=200)
+        @rate_limit('refresh_token')
+        def post(self):
+            """Renovar access token"""
+            try:
+                data = request.get_json()
+                return auth_controller.refresh_token(data)
+            except Exception as e:
+                current_app.logger.error(f"Error refreshing token: {str(e)}")
+                return {'message': 'Error interno del servidor'}, 500
+
+    @auth_ns.route('/logout')
+    class LogoutResource(Resource):
+        @auth_ns.doc(
+            'logout',
+            description='Cerrar la sesión actual revocando el access token (y el refresh token si se envía)',
+            security='Bearer',
+            responses={
+                200: ('Sesión cerrada exitosamente', models['base_response']),
+                401: ('Token inválido, expirado o revocado', models['error_response'])
+            }
+        )
+        @auth_ns.expect(models['logout_request'])
+        @auth_ns.marshal_with(models['base_response'], code=200)
+        @rate_limit('logout')
+        @swagger_jwt_required
+        def post(self, current_user_id):
+            """Cerrar sesión"""
+            try:
+                data = request.get_json(silent=True) or {}
+                return auth_controller.logout(g.current_token, g.token_claims, data)
+            except Exception as e:
+                current_app.logger.error(f"Error logging out: {str(e)}")
+                return {'message': 'Error interno del servidor'}, 500
+
+    @auth_ns.route('/revoke-all')
+    class RevokeAllResource(Resource):
+        @auth_ns.doc(
+            'revoke_all_sessions',
+            description='Revocar todas las sesiones del usuario autenticado',
+            security='Bearer',
+            responses={
+                200: ('Sesiones revocadas', models['base_response']),
+                401: ('Token inválido, expirado o revocado', models['error_response'])
+            }
+        )
+        @auth_ns.marshal_with(models['base_response'], code=200)
+        @rate_limit('logout')
+        @swagger_jwt_required
+        def post(self, current_user_id):
+            """Revocar todas las sesiones"""
+            try:
+                return auth_controller.revoke_all_sessions(current_user_id)
+            except Exception as e:
+                current_app.logger.error(f"Error revoking sessions: {str(e)}")
+                return {'message': 'Error interno del servidor'}, 500
+
     @auth_ns.route('/google_login') # New route for Google Sign-In
     class GoogleLoginResource(Resource):
         @auth_ns.doc(
@@ -151,6 +225,7 @@ def register_auth_api(api):
         )
         @auth_ns.expect(models['google_login_request'], validate=True)
         @auth_ns.marshal_with(models['user_response'], code=200)
+        @rate_limit('google_login')
         def post(self):
             """Manejar el login/registro con Google"""
             try:
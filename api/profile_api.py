@@ -1,14 +1,16 @@
 """
 API Swagger para endpoints de perfil de usuario
 """
-import os
 import jwt
-from flask import request, current_app
+from flask import request, current_app, g
 from flask_restx import Namespace, Resource
 from werkzeug.datastructures import FileStorage
 from functools import wraps
 
 from controllers.profile_controller import ProfileController
+from services.rate_limiting import rate_limit
+from services.token_service import token_service, extract_bearer_token
+from services.token_denylist import RevokedTokenError
 from .swagger_models import create_swagger_models
 
 # Crear namespace para perfil
@@ -18,26 +20,25 @@ def swagger_jwt_required(f):
     """Decorador JWT personalizado para Swagger"""
     @wraps(f)
     def decorated(self, *args, **kwargs):
-        token = None
-        
         # JWT se puede enviar en el header Authorization
-        auth_header = request.headers.get('Authorization')
-        if auth_header:
-            try:
-                token = auth_header.split(" ")[1]  # "Bearer <token>"
-            except IndexError:
-                return {'message': 'Formato de token inválido'}, 401
+        try:
+            token = extract_bearer_token(request.headers.get('Authorization'))  # "Bearer <token>"
+        except IndexError:
+            return {'message': 'Formato de token inválido'}, 401
         
         if not token:
             return {'message': 'Token requerido'}, 401
         
         try:
-            # Decodificar token
-            secret_key = os.getenv('JWT_SECRET', 'mascotas_secret_key')
-            data = jwt.decode(token, secret_key, algorithms=['HS256'])
+            # Verificar token (caché compartida con el blueprint de perfil)
+            data = token_service.verify_token(token)
             current_user_id = data['userId']
+            g.current_token = token
+            g.token_claims = data
         except jwt.ExpiredSignatureError:
             return {'message': 'Token expirado'}, 401
+        except RevokedTokenError:
+            return {'message': 'Token revocado'}, 401
         except jwt.InvalidTokenError:
             return {'message': 'Token inválido'}, 401
         
@@ -72,11 +73,13 @@ def register_profile_api(api):
             }
         )
         @profile_ns.marshal_with(models['profile_response'], code=200)
+        @rate_limit('profile_read')
         @swagger_jwt_required
         def get(self, current_user_id):
             """Obtener perfil del usuario autenticado"""
             try:
-                return profile_controller.get_profile(current_user_id)
+                response_data, status_code = profile_controller.get_profile(current_user_id)
+                return response_data, status_code, ProfileController.etag_headers(response_data)
             except Exception as e:
                 current_app.logger.error(f"Error getting profile: {str(e)}")
                 return {'message': 'Error interno del servidor'}, 500
@@ -85,22 +88,27 @@ def register_profile_api(api):
             'update_profile',
             description='Actualizar información del perfil del usuario',
             security='Bearer',
+            params={'If-Match': {'in': 'header', 'description': 'ETag del perfil leído (opcional)'}},
             responses={
                 200: ('Perfil actualizado exitosamente', models['profile_update_response']),
                 400: ('Datos de entrada inválidos', models['error_response']),
                 401: ('Token inválido o expirado', models['error_response']),
                 404: ('Usuario no encontrado', models['error_response']),
-                409: ('Email ya existe', models['error_response'])
+                409: ('El perfil fue modificado por otra solicitud', models['error_response']),
+                412: ('El ETag de If-Match ya no es la versión actual', models['error_response'])
             }
         )
         @profile_ns.expect(models['profile_update'], validate=True)
         @profile_ns.marshal_with(models['profile_update_response'], code=200)
+        @rate_limit('profile_write')
         @swagger_jwt_required
         def put(self, current_user_id):
             """Actualizar perfil del usuario autenticado"""
             try:
                 data = request.get_json()
-                return profile_controller.update_profile(current_user_id, data)
+                response_data, status_code = profile_controller.update_profile(
+                    current_user_id, data, if_match=request.headers.get('If-Match'))
+                return response_data, status_code, ProfileController.etag_headers(response_data)
             except Exception as e:
                 current_app.logger.error(f"Error updating profile: {str(e)}")
                 return {'message': 'Error interno del servidor'}, 500
@@ -120,6 +128,7 @@ def register_profile_api(api):
         )
         @profile_ns.expect(models['password_change'], validate=True)
         @profile_ns.marshal_with(models['base_response'], code=200)
+        @rate_limit('change_password')
         @swagger_jwt_required
         def put(self, current_user_id):
             """Cambiar contraseña del usuario autenticado"""
@@ -145,6 +154,7 @@ def register_profile_api(api):
         )
         @profile_ns.expect(upload_parser)
         @profile_ns.marshal_with(models['file_upload_response'], code=200)
+        @rate_limit('upload_picture')
         @swagger_jwt_required
         def post(self, current_user_id):
             """Subir foto de perfil del usuario autenticado"""
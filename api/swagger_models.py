@@ -61,13 +61,38 @@ def create_swagger_models(api):
         'profilePicture': fields.String(description='URL de la foto de perfil'),
         'hasPassword': fields.Boolean(description='Indica si tiene contraseña establecida'),
         'createdAt': fields.DateTime(description='Fecha de creación'),
-        'updatedAt': fields.DateTime(description='Fecha de última actualización')
+        'updatedAt': fields.DateTime(description='Fecha de última actualización'),
+        'version': fields.Integer(description='Versión del perfil (ETag para If-Match)')
     })
     
     user_response = api.model('UserResponse', {
         'message': fields.String(description='Mensaje de respuesta'),
         'user': fields.Nested(user_info, description='Información del usuario'),
-        'token': fields.String(description='Token JWT para autenticación')
+        'token': fields.String(description='Access token JWT de vida corta'),
+        'refreshToken': fields.String(description='Refresh token para renovar el access token'),
+        'expiresIn': fields.Integer(description='Segundos de validez del access token')
+    })
+    
+    refresh_request = api.model('RefreshRequest', {
+        'refreshToken': fields.String(
+            required=True,
+            description='Refresh token recibido en el login o en la última renovación',
+            example='p2Xb9...'
+        )
+    })
+    
+    logout_request = api.model('LogoutRequest', {
+        'refreshToken': fields.String(
+            description='Refresh token de la sesión a cerrar (opcional)',
+            example='p2Xb9...'
+        )
+    })
+    
+    token_response = api.model('TokenResponse', {
+        'message': fields.String(description='Mensaje de respuesta'),
+        'token': fields.String(description='Nuevo access token JWT'),
+        'refreshToken': fields.String(description='Nuevo refresh token (el anterior queda inválido)'),
+        'expiresIn': fields.Integer(description='Segundos de validez del access token')
     })
     
     # Modelos de Perfil
@@ -165,6 +190,9 @@ def create_swagger_models(api):
         'user_login': user_login,
         'user_info': user_info,
         'user_response': user_response,
+        'refresh_request': refresh_request,
+        'token_response': token_response,
+        'logout_request': logout_request,
         'profile_response': profile_response,
         'profile_update': profile_update,
         'profile_update_response': profile_update_response,
@@ -6,14 +6,23 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 import os
 
+# Cargar variables de entorno antes de importar el proyecto: varios módulos
+# (key_ring, password_hasher, rate limiting, caches) leen su configuración al importarse
+load_dotenv()
+
 from config.database import init_db
+from config.indexes import bootstrap_indexes
 from routes.user_routes import user_bp
 from routes.password_reset_routes import password_reset_bp
 from routes.profile_routes import profile_bp
+from routes.auth_routes import auth_bp
+from routes.jwks_routes import jwks_bp
 from api import create_api
-
-# Cargar variables de entorno
-load_dotenv()
+from services.token_service import token_service
+from services.rate_limiting import init_rate_limiting
+from services.user_cache import user_cache
+from services.identity_map import init_identity_map
+from services.change_watcher import init_change_watcher
 
 def create_app():
     """Factory function para crear la aplicación Flask"""
@@ -36,18 +45,39 @@ def create_app():
         methods=['GET', 'POST', 'PUT', 'DELETE', 'OPTIONS']  # Explicitly list allowed methods
     )
     
-    # Inicializar base de datos
+    # Configurar la base de datos (cada worker crea su cliente al usarla)
     init_db(app)
+    
+    # Crear índices una sola vez al arrancar (no en cada escritura), con un
+    # cliente que se cierra antes del fork de los workers
+    if os.getenv('MONGO_ENSURE_INDEXES', 'true').lower() == 'true':
+        bootstrap_indexes()
+    
+    # Servicio de verificación de JWT (lee el secreto una sola vez)
+    token_service.init_app(app)
+    
+    # Invalidar la caché de usuarios con los cambios de otros nodos (un
+    # watcher por worker, arrancado en su primer request)
+    init_change_watcher(app, user_cache)
+    
       # Crear carpeta de uploads si no existe
     upload_folder = 'uploads'
     os.makedirs(upload_folder, exist_ok=True)
     
+    # Rate limiting para todas las rutas (blueprints y Swagger)
+    init_rate_limiting(app)
+    
+    # Consultas de usuarios por request en encabezados (depuración)
+    init_identity_map(app)
+    
     # Inicializar API Swagger
     api = create_api(app)
     
     # Registrar blueprints (rutas legadas para compatibilidad)
     app.register_blueprint(user_bp, url_prefix='/api/users')
     app.register_blueprint(password_reset_bp, url_prefix='/api/auth')
+    app.register_blueprint(auth_bp, url_prefix='/api/auth')
+    app.register_blueprint(jwks_bp)
     app.register_blueprint(profile_bp, url_prefix='/api/profile')
     
     # Ruta para servir archivos estáticos (imágenes subidas)
@@ -71,6 +101,11 @@ def create_app():
     def not_found(error):
         return jsonify({'message': f'Route not found'}), 404
     
+    # Manejador de errores 429 (rate limiting)
+    @app.errorhandler(429)
+    def too_many_requests(error):
+        return jsonify({'message': 'Demasiadas solicitudes, intenta más tarde', 'limit': str(error.description)}), 429
+    
     # Manejador de errores 500
     @app.errorhandler(500)
     def internal_error(error):
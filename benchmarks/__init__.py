@@ -0,0 +1 @@
+# Archivo vacío para hacer de esta carpeta un paquete Python
@@ -0,0 +1,61 @@
+"""
+Micro-benchmark: costo de ejecutar un controlador async desde una ruta Flask
+
+Compara el patrón anterior (new_event_loop + run_until_complete + close en
+cada request) con AsyncRunner (un loop persistente por worker), para una
+corrutina vacía y para una que hace I/O con asyncio.to_thread (como el
+repositorio async con el driver thread, que con un loop nuevo crea además un
+pool de hilos nuevo en cada request).
+
+Uso:
+    python -m benchmarks.event_loop_runner [iteraciones]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.async_runner import AsyncRunner
+
+
+async def empty_controller():
+    return {'message': 'ok'}, 201
+
+
+async def io_controller():
+    # Simula dos consultas del repositorio async en el pool de hilos
+    await asyncio.gather(asyncio.to_thread(time.sleep, 0), asyncio.to_thread(time.sleep, 0))
+    return {'message': 'ok'}, 201
+
+
+def loop_per_request(controller):
+    # Patrón anterior de routes/user_routes.register y RegisterResource.post
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(controller())
+    finally:
+        loop.close()
+
+
+def measure(call, iterations):
+    call()  # Calentamiento
+    started = time.perf_counter()
+    for _ in range(iterations):
+        call()
+    return (time.perf_counter() - started) / iterations * 1e6
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    runner = AsyncRunner()
+
+    print(f'📊 {iterations} requests por variante')
+    for name, controller in (('corrutina vacía', empty_controller), ('corrutina con to_thread', io_controller)):
+        before = measure(lambda: loop_per_request(controller), iterations)
+        after = measure(lambda: runner.run(controller()), iterations)
+        print(f'   {name:25s} loop por request {before:8.1f} µs   AsyncRunner {after:8.1f} µs   '
+              f'(ahorro {before - after:.1f} µs/request)')
+    runner.stop(timeout=1)
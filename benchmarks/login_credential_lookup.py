@@ -0,0 +1,127 @@
+"""
+Benchmark: búsqueda de credenciales del login sobre una colección grande
+
+Siembra N usuarios (1M por defecto) en `mascotas-bench` y compara:
+    - find_by_email (documento completo)
+    - find_credentials_by_email con proyección
+    - find_credentials_by_email con el índice cubierto (email, password, _id)
+
+Para cada variante reporta latencia media/p99, bytes recibidos y
+totalDocsExamined del explain() (0 en la consulta cubierta).
+
+Uso:
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.login_credential_lookup [usuarios] [consultas]
+
+Elimina la base de datos al terminar.
+"""
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bson
+from pymongo import ASCENDING, IndexModel, monitoring
+
+import config.database as database
+from config.indexes import INDEXES, LOGIN_CREDENTIALS_INDEX, ensure_indexes
+from models.user import User
+from services.user_cache import user_cache
+
+BATCH_SIZE = 10000
+
+
+class ReplyBytes(monitoring.CommandListener):
+    def __init__(self):
+        self.bytes = 0
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        if event.command_name == 'find':
+            self.bytes += len(bson.encode(event.reply))
+
+    def failed(self, event):
+        pass
+
+
+def seed(collection, total):
+    created_at = datetime(2024, 1, 1)
+    for start in range(0, total, BATCH_SIZE):
+        collection.insert_many([{
+            'full_name': f'Usuario {i}',
+            'email': f'usuario{i}@example.com',
+            'password': '$2b$12$' + f'{i:053d}',
+            'username': f'usuario_{i}',
+            'profilePicture': f'/static/uploads/profile_pictures/usuario_{i}.jpg',
+            'gender': 'other',
+            'address': f'Calle {i} # 45-67, Bogotá',
+            'phoneNumber': '+57 300 123 4567',
+            'createdAt': created_at,
+            'updatedAt': created_at,
+        } for i in range(start, min(start + BATCH_SIZE, total))], ordered=False)
+
+
+def run(lookup, emails, listener):
+    timings = []
+    listener.bytes = 0
+    for email in emails:
+        started = time.perf_counter()
+        assert lookup(email).password
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return statistics.mean(timings), timings[int(len(timings) * 0.99) - 1], listener.bytes / len(emails)
+
+
+def docs_examined(collection, email, projection=None, hint=None):
+    cursor = collection.find({'email': email}, projection).limit(1)
+    if hint:
+        cursor = cursor.hint(hint)
+    return cursor.explain()['executionStats']['totalDocsExamined']
+
+
+if __name__ == '__main__':
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+    listener = ReplyBytes()
+    user_cache.enabled = False  # Medir la consulta, no la caché de usuarios
+    database.connection_manager.configure(
+        os.getenv('MONGO_URI', 'mongodb://localhost:27017'), 'mascotas-bench', event_listeners=[listener]
+    )
+    database.connection_manager.ping()
+    db = database.get_db()
+    try:
+        covered_index = IndexModel(
+            [('email', ASCENDING), ('password', ASCENDING), ('_id', ASCENDING)], name=LOGIN_CREDENTIALS_INDEX
+        )
+        ensure_indexes(db, {'users': INDEXES['users'] + [covered_index]})
+        print(f'🌱 Sembrando {total} usuarios...')
+        seed(db.users, total)
+
+        emails = [f'usuario{random.randrange(total)}@example.com' for _ in range(queries)]
+        results = {
+            'find_by_email (documento completo)': run(User.find_by_email, emails, listener),
+            'credenciales (proyección)': run(
+                lambda email: User.find_credentials_by_email(email, covered=False), emails, listener),
+            'credenciales (índice cubierto)': run(
+                lambda email: User.find_credentials_by_email(email, covered=True), emails, listener),
+        }
+        sample = emails[0]
+        examined = {
+            'find_by_email (documento completo)': docs_examined(db.users, sample),
+            'credenciales (proyección)': docs_examined(
+                db.users, sample, User.projection(User.CREDENTIAL_FIELDS)),
+            'credenciales (índice cubierto)': docs_examined(
+                db.users, sample, User.projection(('email', 'password')), LOGIN_CREDENTIALS_INDEX),
+        }
+    finally:
+        db.client.drop_database('mascotas-bench')
+
+    print(f'📊 {queries} logins sobre {total} usuarios')
+    for name, (mean_ms, p99_ms, reply_bytes) in results.items():
+        print(f'   {name:38s} media {mean_ms:6.3f} ms   p99 {p99_ms:6.3f} ms   '
+              f'{reply_bytes:6.0f} bytes/respuesta   docsExamined {examined[name]}')
@@ -0,0 +1,95 @@
+"""
+Benchmark: round trips y latencia al consumir un código de restablecimiento
+
+Compara el flujo anterior (find_by_token + mark_as_used + invalidate_user_tokens)
+con el nuevo (consume + invalidate_user_tokens) contra una base de datos real,
+contando los comandos enviados a MongoDB con un CommandListener.
+
+Uso:
+    MONGO_URI=mongodb://localhost:27017 python -m benchmarks.password_reset_consume [iteraciones]
+
+Usa la base de datos `mascotas-bench` y la elimina al terminar.
+"""
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from pymongo import monitoring
+
+import config.database as database
+from config.indexes import INDEXES, ensure_indexes
+from models.password_reset_token import PasswordResetToken
+
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+def legacy_flow(token_hash):
+    # Flujo anterior de reset_password
+    reset_token = PasswordResetToken.find_by_token(token_hash)
+    if not reset_token or not reset_token.is_valid():
+        return False
+    reset_token.save()  # mark_as_used hacía un save() completo
+    PasswordResetToken.invalidate_user_tokens(reset_token.user_id)
+    return True
+
+
+def consume_flow(token_hash):
+    reset_token = PasswordResetToken.consume(token_hash)
+    if not reset_token:
+        return False
+    PasswordResetToken.invalidate_user_tokens(reset_token.user_id)
+    return True
+
+
+def run(flow, iterations, counter):
+    timings = []
+    round_trips = 0
+    for i in range(iterations):
+        _, code_hash = PasswordResetToken.generate_token()
+        PasswordResetToken(user_id=ObjectId(), token=code_hash).save()
+
+        counter.count = 0
+        started = time.perf_counter()
+        assert flow(code_hash)
+        timings.append((time.perf_counter() - started) * 1000)
+        round_trips += counter.count
+    timings.sort()
+    return round_trips / iterations, statistics.mean(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    counter = CommandCounter()
+    database.connection_manager.configure(
+        os.getenv('MONGO_URI', 'mongodb://localhost:27017'), 'mascotas-bench', event_listeners=[counter]
+    )
+    database.connection_manager.ping()
+    db = database.get_db()
+    try:
+        ensure_indexes(db, {'password_reset_tokens': INDEXES['password_reset_tokens']})
+        results = {
+            'anterior (find + save + invalidate)': run(legacy_flow, iterations, counter),
+            'consume (find_one_and_update + invalidate)': run(consume_flow, iterations, counter),
+        }
+    finally:
+        db.client.drop_database('mascotas-bench')
+
+    print(f'📊 {iterations} códigos consumidos')
+    for name, (round_trips, mean_ms, p99_ms) in results.items():
+        print(f'   {name:45s} {round_trips:4.1f} round trips   media {mean_ms:6.2f} ms   p99 {p99_ms:6.2f} ms')
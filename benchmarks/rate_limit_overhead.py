@@ -0,0 +1,62 @@
+"""
+Benchmark: costo por request del rate limiting
+
+Compara la misma ruta con el limiter deshabilitado y habilitado (memory://
+o el almacén de RATE_LIMIT_STORAGE_URI) y reporta la latencia media y p99.
+
+Uso:
+    python -m benchmarks.rate_limit_overhead [requests]
+"""
+import os
+import statistics
+import sys
+import time
+
+# Límite alto para medir solo el costo de contar, sin respuestas 429
+os.environ.setdefault('RATE_LIMIT_PROFILE_READ', '100000000 per minute')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Blueprint, Flask, jsonify
+
+from services.rate_limiting import init_rate_limiting, rate_limit
+
+
+def build_app(enabled):
+    bench_bp = Blueprint('bench', __name__)
+
+    @bench_bp.route('/profile', methods=['GET'])
+    @rate_limit('profile_read')
+    def profile():
+        return jsonify({'ok': True})
+
+    app = Flask(f'bench_{enabled}')
+    app.config['RATELIMIT_ENABLED'] = enabled
+    init_rate_limiting(app)
+    app.register_blueprint(bench_bp)
+    return app
+
+
+def measure(app, requests_count):
+    client = app.test_client()
+    for _ in range(200):  # Calentamiento
+        client.get('/profile')
+
+    timings = []
+    for _ in range(requests_count):
+        started = time.perf_counter()
+        client.get('/profile')
+        timings.append((time.perf_counter() - started) * 1e6)
+    timings.sort()
+    return statistics.mean(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+if __name__ == '__main__':
+    requests_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+
+    base_mean, base_p99 = measure(build_app(False), requests_count)
+    limited_mean, limited_p99 = measure(build_app(True), requests_count)
+
+    print(f'📊 {requests_count} requests, almacén: {os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")}')
+    print(f'   sin limiter : media {base_mean:8.1f} µs   p99 {base_p99:8.1f} µs')
+    print(f'   con limiter : media {limited_mean:8.1f} µs   p99 {limited_p99:8.1f} µs')
+    print(f'   sobrecosto  : {limited_mean - base_mean:8.1f} µs por request')
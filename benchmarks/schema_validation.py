@@ -0,0 +1,114 @@
+"""
+Micro-benchmark: validación de payloads de registro y perfil
+
+Compara la cadena anterior (un handler por regla, cada uno con su propio
+strip()/re.match) con el schema compilado de services.validation_schemas,
+llamado directamente y dentro de la cadena (SchemaValidationHandler). Solo
+se miden las validaciones puras: los handlers que consultan la BD no cambian.
+
+Uso:
+    python -m benchmarks.schema_validation [iteraciones]
+"""
+import asyncio
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from handlers.schema_validation_handler import SchemaValidationHandler
+from services.validation_schemas import validate_profile_update, validate_registration
+from utils.handler_template import Handler
+
+REGISTRATION = {'full_name': '  Usuario de Prueba ', 'email': 'Usuario@Example.com', 'password': 'Password123'}
+PROFILE = {
+    'full_name': 'Usuario de Prueba',
+    'email': 'usuario@example.com',
+    'username': 'usuario_prueba',
+    'gender': 'Other',
+    'address': 'Calle 123 # 45-67, Bogotá',
+    'phoneNumber': '+57 300 123 4567',
+}
+
+
+class LegacyCheck(Handler):
+    """Handler anterior de una sola regla"""
+
+    def __init__(self, rule, message):
+        super().__init__()
+        self.rule = rule
+        self.message = message
+
+    async def check(self, context):
+        return None if self.rule(context) else ({'message': self.message}, 400)
+
+
+def legacy_chain(rules):
+    first = handler = LegacyCheck(*rules[0])
+    for rule in rules[1:]:
+        handler = handler.set_next(LegacyCheck(*rule))
+    return first.freeze()
+
+
+def optional(key, rule):
+    # Patrón anterior de los handlers de perfil: solo validar si se envía
+    def check(context):
+        value = context.get(key)
+        value = value.strip() if value else None
+        return not value or rule(value)
+    return check
+
+
+EMAIL = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
+
+LEGACY_REGISTRATION_CHAIN = legacy_chain([
+    (lambda c: c.get('full_name', '').strip() and c.get('email', '').strip() and c.get('password', ''),
+     'Todos los campos son obligatorios (nombre, email, contraseña)'),
+    (lambda c: len(c.get('full_name', '').strip()) >= 2, 'El nombre debe tener al menos 2 caracteres'),
+    (lambda c: re.match(EMAIL, c.get('email', '')), 'El formato del correo electrónico no es válido'),
+    (lambda c: len(c.get('password', '')) >= 6, 'La contraseña debe tener al menos 6 caracteres'),
+    (lambda c: re.match(r'(?=.*[a-z])(?=.*[A-Z])(?=.*\d)', c.get('password', '')), 'Contraseña débil'),
+])
+
+LEGACY_PROFILE_CHAIN = legacy_chain([
+    (lambda c: c.get('full_name') is None or len(c['full_name'].strip()) >= 2, 'Nombre inválido'),
+    (lambda c: c.get('email') is None or re.match(EMAIL, c['email'].strip().lower()), 'Email inválido'),
+    (optional('username', lambda v: re.match(r'^[a-zA-Z0-9_]{3,20}$', v)), 'Username inválido'),
+    (optional('gender', lambda v: v.lower() in ['male', 'female', 'other', 'prefer_not_to_say']), 'Género inválido'),
+    (optional('phoneNumber', lambda v: re.match(r'^[\+]?[\d\s\-\(\)]{7,20}$', v)), 'Teléfono inválido'),
+    (optional('address', lambda v: 5 <= len(v.strip()) <= 200), 'Dirección inválida'),
+])
+
+SCHEMA_REGISTRATION_CHAIN = SchemaValidationHandler(validate_registration).freeze()
+SCHEMA_PROFILE_CHAIN = SchemaValidationHandler(validate_profile_update).freeze()
+
+
+async def run_chain(chain, payload, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        # Copia: la cadena con schema escribe los valores normalizados en el contexto
+        assert await chain.handle(dict(payload), print)
+    return (time.perf_counter() - started) / iterations * 1e9
+
+
+def run_validator(validate, payload, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        assert not validate(dict(payload))[1]
+    return (time.perf_counter() - started) / iterations * 1e9
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    print(f'📊 {iterations} validaciones por variante')
+    for name, payload, legacy, chain, validate in (
+        ('registro', REGISTRATION, LEGACY_REGISTRATION_CHAIN, SCHEMA_REGISTRATION_CHAIN, validate_registration),
+        ('perfil', PROFILE, LEGACY_PROFILE_CHAIN, SCHEMA_PROFILE_CHAIN, validate_profile_update),
+    ):
+        before = min(asyncio.run(run_chain(legacy, payload, iterations)) for _ in range(3))
+        in_chain = min(asyncio.run(run_chain(chain, payload, iterations)) for _ in range(3))
+        direct = min(run_validator(validate, payload, iterations) for _ in range(3))
+        print(f'   {name:9s} cadena anterior {before:6.0f} ns   schema en cadena {in_chain:6.0f} ns   '
+              f'schema directo {direct:6.0f} ns   ({before / in_chain:.1f}x)')
@@ -0,0 +1,102 @@
+"""
+Micro-benchmark: costo de mapear un documento de MongoDB a User
+
+Compara la construcción anterior (clase con __dict__ y __init__ con kwargs)
+con User.from_document (__slots__), completa y con proyección de credenciales.
+Reporta tiempo por mapeo y memoria asignada por instancia (tracemalloc).
+
+Uso:
+    python -m benchmarks.user_mapping [iteraciones]
+"""
+import os
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+
+from models.user import User
+
+DOCUMENT = {
+    '_id': ObjectId(),
+    'full_name': 'Usuario de Prueba',
+    'email': 'usuario@example.com',
+    'password': '$2b$12$' + 'x' * 53,
+    'username': 'usuario_prueba',
+    'profilePicture': '/static/uploads/profile_pictures/usuario.jpg',
+    'gender': 'other',
+    'address': 'Calle 123 # 45-67, Bogotá',
+    'phoneNumber': '+57 300 123 4567',
+    'createdAt': datetime(2024, 1, 1),
+    'updatedAt': datetime(2024, 1, 1),
+}
+CREDENTIALS = {'_id': DOCUMENT['_id'], 'email': DOCUMENT['email'], 'password': DOCUMENT['password']}
+
+
+class LegacyUser:
+    """Construcción anterior: __dict__ por instancia y kwargs"""
+
+    def __init__(self, full_name=None, email=None, password=None, **kwargs):
+        self.full_name = full_name
+        self.email = email.lower() if email else None
+        self.password = password
+        self.username = kwargs.get('username', None)
+        self.profile_picture = kwargs.get('profile_picture', None)
+        self.gender = kwargs.get('gender', None)
+        self.address = kwargs.get('address', None)
+        self.phone_number = kwargs.get('phone_number', None)
+        self.created_at = kwargs.get('created_at', datetime.utcnow())
+        self.updated_at = kwargs.get('updated_at', datetime.utcnow())
+        self._id = kwargs.get('_id', None)
+
+
+def legacy_mapping(user_data=DOCUMENT):
+    return LegacyUser(
+        full_name=user_data.get('full_name'),
+        email=user_data.get('email'),
+        password=user_data.get('password'),
+        username=user_data.get('username'),
+        profile_picture=user_data.get('profilePicture'),
+        gender=user_data.get('gender'),
+        address=user_data.get('address'),
+        phone_number=user_data.get('phoneNumber'),
+        created_at=user_data.get('createdAt'),
+        updated_at=user_data.get('updatedAt'),
+        _id=str(user_data['_id'])
+    )
+
+
+def slots_mapping():
+    return User.from_document(DOCUMENT)
+
+
+def projected_mapping():
+    return User.from_document(CREDENTIALS, ['email', 'password'])
+
+
+def bytes_per_instance(factory, count=10000):
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    instances = [factory() for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del instances
+    return allocated / count
+
+
+if __name__ == '__main__':
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+    print(f'📊 {iterations} mapeos por variante')
+    for name, factory in (
+        ('anterior (__dict__ + kwargs)', legacy_mapping),
+        ('from_document (__slots__)', slots_mapping),
+        ('from_document (proyección credenciales)', projected_mapping),
+    ):
+        seconds = min(timeit.repeat(factory, number=iterations, repeat=3))
+        print(f'   {name:42s} {seconds / iterations * 1e9:7.0f} ns/mapeo   '
+              f'{bytes_per_instance(factory):6.0f} bytes/instancia')
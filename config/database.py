@@ -1,40 +1,237 @@
 """
 Configuración de conexión a MongoDB
+
+Un MongoClient no sobrevive a un fork (sus sockets y hilos de monitoreo
+quedan en el proceso padre), así que el ConnectionManager crea el cliente de
+forma perezosa en cada proceso y lo descarta en el hijo tras un fork. Las
+tareas de arranque del proceso maestro (ping, índices) usan short_lived_db(),
+un cliente propio que se cierra antes de que el servidor haga fork. El pool
+se configura con variables de entorno:
+
+    MONGO_MAX_POOL_SIZE                 maxPoolSize (100)
+    MONGO_MIN_POOL_SIZE                 minPoolSize (0)
+    MONGO_WAIT_QUEUE_TIMEOUT_MS         waitQueueTimeoutMS (sin límite)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS   serverSelectionTimeoutMS (30000)
 """
-from pymongo import MongoClient
+from collections import deque
+from contextlib import contextmanager
+from pymongo import MongoClient, monitoring
 from pymongo.errors import ConnectionFailure
 import os
+import re
+import threading
+import time
+
+DEFAULT_MONGO_URI = 'mongodb://localhost:27017/mascotas-app'
+DEFAULT_DB_NAME = 'mascotas-app'
+
+
+def pool_options_from_env():
+    """Opciones del pool de conexiones definidas en el entorno"""
+    options = {
+        'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', '100')),
+        'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', '0')),
+        'serverSelectionTimeoutMS': int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', '30000')),
+    }
+    if os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS'):
+        options['waitQueueTimeoutMS'] = int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS'))
+    return options
+
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Mide cuánto espera cada operación para obtener una conexión del pool.
+
+    El inicio y el fin del checkout ocurren en el mismo hilo, así que el
+    instante de inicio se guarda en un threading.local.
+    """
+
+    def __init__(self, sample_size=1000):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=sample_size)  # Últimas esperas en ms, para percentiles
+        self._stats = {
+            'checkouts': 0, 'checkout_failures': 0, 'checkout_timeouts': 0,
+            'total_wait_ms': 0.0, 'max_wait_ms': 0.0,
+            'connections_created': 0, 'connections_closed': 0, 'pool_cleared': 0,
+        }
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        started = getattr(self._local, 'started', None)
+        if started is None:
+            return
+        wait_ms = (time.perf_counter() - started) * 1000
+        self._local.started = None
+        with self._lock:
+            self._stats['checkouts'] += 1
+            self._stats['total_wait_ms'] += wait_ms
+            self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], wait_ms)
+            self._waits.append(wait_ms)
+
+    def connection_check_out_failed(self, event):
+        self._local.started = None
+        self._count('checkout_failures')
+        if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+            self._count('checkout_timeouts')
+
+    def connection_created(self, event):
+        self._count('connections_created')
+
+    def connection_closed(self, event):
+        self._count('connections_closed')
+
+    def pool_cleared(self, event):
+        self._count('pool_cleared')
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_checked_in(self, event):
+        pass
+
+    def get_metrics(self):
+        with self._lock:
+            metrics = dict(self._stats)
+            waits = sorted(self._waits)
+        metrics['avg_wait_ms'] = metrics['total_wait_ms'] / metrics['checkouts'] if metrics['checkouts'] else 0.0
+        metrics['p50_wait_ms'] = waits[len(waits) // 2] if waits else 0.0
+        metrics['p99_wait_ms'] = waits[min(len(waits) - 1, int(len(waits) * 0.99))] if waits else 0.0
+        return metrics
+
+
+class ConnectionManager:
+    """Un MongoClient por proceso, creado en el primer get_db()"""
+
+    def __init__(self):
+        self.uri = None
+        self.db_name = DEFAULT_DB_NAME
+        self.client_options = {}
+        self.metrics = PoolMetricsListener()
+        self._client = None
+        self._db = None
+        self._lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def configure(self, uri=None, db_name=None, **client_options):
+        """
+        Definir URI, base de datos y opciones del cliente (no conecta)
+
+        Args:
+            uri (str): URI de MongoDB (por defecto MONGO_URI)
+            db_name (str): Base de datos (por defecto MONGO_DB_NAME)
+            **client_options: Opciones extra de MongoClient; sobrescriben las del pool
+        """
+        with self._lock:
+            self.uri = uri or os.getenv('MONGO_URI', DEFAULT_MONGO_URI)
+            self.db_name = db_name or os.getenv('MONGO_DB_NAME', DEFAULT_DB_NAME)
+            self.client_options = dict(pool_options_from_env(), **client_options)
+            self._close()
+
+    def _after_fork(self):
+        # El cliente heredado pertenece al padre: no se usa ni se cierra aquí
+        self._client = None
+        self._db = None
+        self._lock = threading.Lock()
+        self.metrics = PoolMetricsListener()
+
+    def _close(self):
+        if self._client is not None:
+            self._client.close()
+        self._client = None
+        self._db = None
+
+    def new_client(self):
+        """Cliente independiente del del proceso (quien lo crea lo cierra)"""
+        if self.uri is None:
+            raise Exception('Database not initialized. Call init_db() first.')
+        return MongoClient(self.uri, **self.client_options)
+
+    def get_client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    if self.uri is None:
+                        raise Exception('Database not initialized. Call init_db() first.')
+                    listeners = list(self.client_options.get('event_listeners', [])) + [self.metrics]
+                    options = dict(self.client_options, event_listeners=listeners)
+                    self._client = MongoClient(self.uri, **options)
+                    self._db = self._client[self.db_name]
+        return self._client
+
+    def get_db(self):
+        if self._db is None:
+            self.get_client()
+        return self._db
+
+    def ping(self):
+        """Verificar la conexión (bloquea hasta serverSelectionTimeoutMS)"""
+        return self.get_client().admin.command('ping')
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+    def get_metrics(self):
+        return self.metrics.get_metrics()
+
+
+# Instancia global
+connection_manager = ConnectionManager()
+
+
+@contextmanager
+def short_lived_db():
+    """
+    Base de datos sobre un cliente de corta duración, cerrado al salir
+
+    Para el proceso maestro: no deja un cliente abierto que los workers
+    heredarían al hacer fork.
+    """
+    client = connection_manager.new_client()
+    try:
+        yield client[connection_manager.db_name]
+    finally:
+        client.close()
 
-# Variable global para la base de datos
-db = None
 
 def init_db(app=None):
-    """Inicializar conexión a MongoDB"""
-    global db
-    
+    """
+    Configurar la conexión a MongoDB (no crea el cliente)
+
+    El cliente se crea en el primer get_db() de cada proceso. Con
+    MONGO_PING_ON_START=true se verifica la conexión al arrancar con un
+    cliente de corta duración.
+    """
     try:
-        # Obtener URI de MongoDB desde variables de entorno
-        mongo_uri = os.getenv('MONGO_URI', 'mongodb://localhost:27017/mascotas-app')
-        
+        connection_manager.configure()
+
         # Log de conexión (sin mostrar contraseña)
-        uri_safe = mongo_uri.replace(r':([^:@]+)@', ':***@') if ':' in mongo_uri else mongo_uri
+        uri_safe = re.sub(r':([^:@/]+)@', ':***@', connection_manager.uri)
         print(f'🔗 Conectando a MongoDB: {uri_safe}')
-        
-        # Crear cliente de MongoDB
-        client = MongoClient(mongo_uri)
-        
-        # Probar la conexión
-        client.admin.command('ping')
-        
-        # Obtener la base de datos
-        db_name = 'mascotas-app'
-        db = client[db_name]
-        
-        print(f'✅ MongoDB Connected: {client.address}')
-        print(f'📊 Database: {db_name}')
-        
-        return db
-        
+        print(f'📊 Database: {connection_manager.db_name} (pool: {connection_manager.client_options})')
+
+        if os.getenv('MONGO_PING_ON_START', 'false').lower() == 'true':
+            with short_lived_db() as db:
+                db.client.admin.command('ping')
+                print(f'✅ MongoDB Connected: {db.client.address}')
+
     except ConnectionFailure as e:
         print(f'❌ Error connecting to MongoDB: {e}')
         if 'authentication' in str(e).lower():
@@ -47,8 +244,5 @@ def init_db(app=None):
         raise e
 
 def get_db():
-    """Obtener instancia de la base de datos"""
-    global db
-    if db is None:
-        raise Exception('Database not initialized. Call init_db() first.')
-    return db
+    """Obtener instancia de la base de datos del proceso actual"""
+    return connection_manager.get_db()
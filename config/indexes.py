@@ -0,0 +1,184 @@
+"""
+Declaración de índices de MongoDB y bootstrap idempotente
+
+Los índices se crean una sola vez al arrancar (create_app) o desde la línea de
+comandos, en lugar de en cada escritura de los modelos:
+
+    python -m config.indexes            # Crear los que falten y reportar drift
+    python -m config.indexes --check    # Solo reportar (exit 1 si hay drift)
+    python -m config.indexes --fix      # Recrear índices con opciones distintas
+"""
+import os
+import sys
+
+if __name__ == '__main__':
+    # Como CLI, cargar .env antes de leer MONGO_COVERED_LOGIN_INDEX más abajo
+    from dotenv import load_dotenv
+    load_dotenv()
+
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from config.database import short_lived_db
+
+# Opciones que definen un índice (las demás, como 'v' o 'ns', se ignoran al comparar)
+_COMPARED_OPTIONS = ('unique', 'sparse', 'expireAfterSeconds', 'partialFilterExpression')
+
+
+def _index(keys, **options):
+    if isinstance(keys, str):
+        keys = [(keys, ASCENDING)]
+    return IndexModel(keys, **options)
+
+
+# Índice opcional que cubre la búsqueda de credenciales del login: con _id y
+# password en las claves, find_credentials_by_email se responde solo desde el
+# índice (totalDocsExamined == 0) a costa de duplicar los hashes en él.
+COVERED_LOGIN_INDEX = os.getenv('MONGO_COVERED_LOGIN_INDEX', 'false').lower() == 'true'
+LOGIN_CREDENTIALS_INDEX = 'login_credentials'
+
+# Índices por colección. Los nombres se derivan de las claves (p. ej. 'email_1'),
+# igual que los que creaban antes los modelos, para no duplicar los existentes.
+INDEXES = {
+    'users': [
+        _index('email', unique=True),
+        _index('username', unique=True, sparse=True),
+    ] + ([
+        _index([('email', ASCENDING), ('password', ASCENDING), ('_id', ASCENDING)], name=LOGIN_CREDENTIALS_INDEX),
+    ] if COVERED_LOGIN_INDEX else []),
+    'password_reset_tokens': [
+        # TTL para auto-eliminación de tokens expirados
+        _index('expires_at', expireAfterSeconds=0),
+        # Igualdad primero y rango (expires_at) al final: consume / find_by_token
+        _index([('token', ASCENDING), ('used', ASCENDING), ('expires_at', ASCENDING)]),
+        # find_valid_token_by_hash e invalidate_user_tokens
+        _index([('user_id', ASCENDING), ('used', ASCENDING), ('expires_at', ASCENDING)]),
+    ],
+    'refresh_tokens': [
+        _index('expires_at', expireAfterSeconds=0),
+        _index('token', unique=True),
+        _index('family_id'),
+        _index('user_id'),
+    ],
+    'revoked_tokens': [
+        _index('expires_at', expireAfterSeconds=0),
+        _index('revoked_at'),
+        _index('key', unique=True),
+    ],
+    'login_throttle': [
+        _index('expires_at', expireAfterSeconds=0),
+    ],
+    'change_stream_tokens': [
+        # Resume tokens de workers que ya no existen (uno por pid)
+        _index('updated_at', expireAfterSeconds=86400),
+    ],
+}
+
+
+def _normalize(options):
+    normalized = {}
+    for option in _COMPARED_OPTIONS:
+        value = options.get(option)
+        if value in (None, False):
+            continue
+        normalized[option] = int(value) if option == 'expireAfterSeconds' else value
+    keys = options['key']
+    # IndexModel guarda las claves como SON; index_information() como lista de tuplas
+    items = keys.items() if hasattr(keys, 'items') else keys
+    normalized['key'] = [(field, int(direction) if isinstance(direction, (int, float)) else direction)
+                         for field, direction in items]
+    return normalized
+
+
+def index_drift(db, indexes=None):
+    """
+    Comparar los índices declarados con los existentes
+
+    Returns:
+        dict: {coleccion: {'missing': [...], 'changed': [...], 'extra': [...]}}
+              solo con las colecciones que tienen diferencias
+    """
+    indexes = indexes or INDEXES
+    report = {}
+    for collection_name, models in indexes.items():
+        existing = db[collection_name].index_information()
+        missing, changed = [], []
+        declared = set()
+        for model in models:
+            name = model.document['name']
+            declared.add(name)
+            if name not in existing:
+                missing.append(name)
+            elif _normalize(existing[name]) != _normalize(model.document):
+                changed.append(name)
+        extra = [name for name in existing if name != '_id_' and name not in declared]
+        if missing or changed or extra:
+            report[collection_name] = {'missing': missing, 'changed': changed, 'extra': extra}
+    return report
+
+
+def bootstrap_indexes():
+    """
+    Aplicar INDEXES al arrancar con un cliente de corta duración
+
+    create_app corre en el proceso maestro: el cliente se cierra antes del
+    fork y cada worker crea el suyo en su primer get_db().
+    """
+    with short_lived_db() as db:
+        return ensure_indexes(db)
+
+
+def ensure_indexes(db, indexes=None, fix=False):
+    """
+    Crear los índices que falten (idempotente) y reportar drift
+
+    Args:
+        db: Base de datos de pymongo
+        indexes (dict): Declaración a aplicar (por defecto INDEXES)
+        fix (bool): Eliminar y recrear los índices declarados con opciones distintas
+
+    Returns:
+        dict: Drift que queda tras aplicar (ver index_drift)
+    """
+    indexes = indexes or INDEXES
+    drift = index_drift(db, indexes)
+
+    for collection_name, models in indexes.items():
+        collection_drift = drift.get(collection_name, {})
+        changed = set(collection_drift.get('changed', []))
+        to_create = [m for m in models if m.document['name'] in collection_drift.get('missing', [])]
+
+        if fix:
+            for name in changed:
+                print(f'🛠️ Recreando índice {collection_name}.{name}')
+                db[collection_name].drop_index(name)
+            to_create += [m for m in models if m.document['name'] in changed]
+
+        if to_create:
+            try:
+                db[collection_name].create_indexes(to_create)
+                print(f'📇 Índices creados en {collection_name}: {", ".join(m.document["name"] for m in to_create)}')
+            except OperationFailure as e:
+                print(f'❌ Error creando índices en {collection_name}: {e}')
+
+    remaining = index_drift(db, indexes)
+    for collection_name, collection_drift in remaining.items():
+        for kind, label in (('missing', 'faltante'), ('changed', 'con opciones distintas'), ('extra', 'no declarado')):
+            for name in collection_drift[kind]:
+                print(f'⚠️ Índice {label}: {collection_name}.{name}')
+    return remaining
+
+
+if __name__ == '__main__':
+    from config.database import init_db
+
+    init_db()
+    with short_lived_db() as database:
+        if '--check' in sys.argv:
+            report = index_drift(database)
+            for name, collection_drift in report.items():
+                print(f'{name}: {collection_drift}')
+            sys.exit(1 if any(d['missing'] or d['changed'] for d in report.values()) else 0)
+
+        remaining_drift = ensure_indexes(database, fix='--fix' in sys.argv)
+    print('✅ Índices al día' if not remaining_drift else '⚠️ Quedan diferencias en los índices')
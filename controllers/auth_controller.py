@@ -3,13 +3,11 @@ Controlador de autenticación que integra UserController y PasswordResetControll
 """
 from .user_controller import UserController
 from .password_reset_controller import PasswordResetController
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
 from flask import current_app, jsonify
 from models.user import User
-import jwt
-from datetime import datetime, timedelta
-import bcrypt # For creating a dummy password if needed
+from services.password_hashing_service import password_hasher
+from services.token_service import token_service, InvalidRefreshTokenError
+from services.google_token_verifier import google_token_verifier
 
 class AuthController:
     """Controlador unificado para todas las operaciones de autenticación"""
@@ -28,17 +26,18 @@ class AuthController:
         return await UserController.register_user(data)
     
     @staticmethod
-    def login(data):
+    def login(data, client_ip=None):
         """
         Iniciar sesión de usuario
         
         Args:
             data (dict): Credenciales de login
+            client_ip (str): IP del cliente para el throttle de intentos
             
         Returns:
             tuple: (response_data, status_code)
         """
-        return UserController.login_user(data)
+        return UserController.login_user(data, client_ip)
     
     @staticmethod
     def forgot_password(data):
@@ -79,6 +78,78 @@ class AuthController:
         """
         return PasswordResetController.reset_password(data)
 
+    @staticmethod
+    def refresh_token(data):
+        """
+        Rotar refresh token y emitir un nuevo access token
+        
+        Args:
+            data (dict): Datos con refreshToken
+            
+        Returns:
+            tuple: (response_data, status_code)
+        """
+        try:
+            raw_refresh_token = (data or {}).get('refreshToken', '')
+            if not isinstance(raw_refresh_token, str) or not raw_refresh_token.strip():
+                return {'message': 'Refresh token requerido'}, 400
+            
+            tokens = token_service.rotate_refresh_token(raw_refresh_token.strip())
+            return {'message': 'Token renovado exitosamente', **tokens}, 200
+            
+        except InvalidRefreshTokenError as e:
+            return {'message': str(e)}, 401
+        except Exception as e:
+            print(f'❌ Error en refresh_token: {e}')
+            return {'message': 'Error renovando token', 'error': str(e)}, 500
+
+    @staticmethod
+    def logout(token, claims, data=None):
+        """
+        Cerrar sesión: revoca el access token actual y, si se envía, su refresh token
+        
+        Args:
+            token (str): Access token actual
+            claims (dict): Claims verificados del access token
+            data (dict): Datos opcionales con refreshToken
+            
+        Returns:
+            tuple: (response_data, status_code)
+        """
+        try:
+            token_service.revoke_access_token(token, claims)
+            
+            raw_refresh_token = (data or {}).get('refreshToken')
+            if isinstance(raw_refresh_token, str) and raw_refresh_token.strip():
+                token_service.revoke_refresh_token(raw_refresh_token.strip(), claims['userId'])
+            
+            print(f'👋 Logout para usuario: {claims["userId"]}')
+            return {'message': 'Sesión cerrada exitosamente'}, 200
+            
+        except Exception as e:
+            print(f'❌ Error en logout: {e}')
+            return {'message': 'Error cerrando sesión', 'error': str(e)}, 500
+
+    @staticmethod
+    def revoke_all_sessions(user_id):
+        """
+        Revocar todas las sesiones (access y refresh tokens) de un usuario
+        
+        Args:
+            user_id (str): ID del usuario autenticado
+            
+        Returns:
+            tuple: (response_data, status_code)
+        """
+        try:
+            token_service.revoke_all_sessions(user_id)
+            print(f'🔒 Todas las sesiones revocadas para usuario: {user_id}')
+            return {'message': 'Todas las sesiones fueron cerradas'}, 200
+            
+        except Exception as e:
+            print(f'❌ Error en revoke_all_sessions: {e}')
+            return {'message': 'Error cerrando sesiones', 'error': str(e)}, 500
+
     @staticmethod
     def google_login(data):
         """
@@ -96,8 +167,8 @@ class AuthController:
                 return {'message': 'Google Sign-In is not configured on the server.'}, 500
 
             try:
-                # Verify the ID token
-                idinfo = id_token.verify_oauth2_token(token, google_requests.Request(), CLIENT_ID)
+                # Verify the ID token (Google certs are cached per process)
+                idinfo = google_token_verifier.verify(token, CLIENT_ID)
                 
                 # Extract user information
                 user_email = idinfo.get('email')
@@ -122,7 +193,7 @@ class AuthController:
                 # 2. Prompt them to set a password later if they try to use password-based login.
                 # For simplicity, we'll create them without a password or with a placeholder.
                 # Let's create a placeholder hashed password (user won't use it directly)
-                placeholder_password = bcrypt.hashpw(user_email.encode('utf-8') + current_app.config['SECRET_KEY'].encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+                placeholder_password = password_hasher.hash_password(user_email + current_app.config['SECRET_KEY'])
                 
                 new_user = User(
                     full_name=user_full_name,
@@ -137,17 +208,12 @@ class AuthController:
                     current_app.logger.error(f"Error creating user via Google Sign-In (duplicate?): {str(e)}")
                     return {'message': str(e)}, 409
             
-            # Generate JWT for the user
-            secret_key = current_app.config['SECRET_KEY']
-            payload = {
-                'userId': str(user._id),
-                'exp': datetime.utcnow() + timedelta(days=30) # Standard token expiration
-            }
-            app_token = jwt.encode(payload, secret_key, algorithm='HS256')
+            # Generate short-lived access token + refresh token for the user
+            tokens = token_service.issue_token_pair(user._id)
             
             current_app.logger.info(f"User {user_email} logged in via Google.")
             return {
-                'token': app_token,
+                **tokens,
                 'user': user.to_dict() 
             }, 200
 
@@ -1,11 +1,13 @@
 """
 Controlador para restablecimiento de contraseñas
 """
-import bcrypt
 from flask import current_app # Asegúrate que current_app esté importado
 from models.user import User
 from models.password_reset_token import PasswordResetToken
 from services.email_service import EmailService
+from services.password_hashing_service import password_hasher
+from services.validation_schemas import validate_password_reset_request, validate_password_reset
+from services.user_writes import save_with_retry
 import hashlib
 
 class PasswordResetController:
@@ -23,30 +25,13 @@ class PasswordResetController:
             tuple: (response_data, status_code)
         """
         try:
-            email_value = request_data.get('email') # Obtener el valor primero
-
-            if isinstance(email_value, str): # Verificar si es una cadena
-                email = email_value.strip().lower()
-            elif email_value is None: # Si la clave 'email' no existe
-                 email = '' # Asignar cadena vacía para que las validaciones posteriores funcionen
-            else:
-                # Si 'email' existe pero no es una cadena (inesperado)
-                # Usar current_app.logger si está disponible y configurado, sino print
-                if hasattr(current_app, 'logger'):
-                    current_app.logger.error(f"Formato inesperado para 'email' en request_data: {type(email_value)}")
-                else:
-                    print(f"ERROR: Formato inesperado para 'email' en request_data: {type(email_value)}")
-                return {'message': 'Formato de email inválido en la solicitud.'}, 400
-            
-            print(f'🔐 Solicitud de reset para: {email}')
+            print(f"🔐 Solicitud de reset para: {request_data.get('email')}")
             
-            # Validar que el email esté presente
-            if not email:
-                return {'message': 'El correo electrónico es obligatorio'}, 400
-            
-            # Validar formato de email
-            if not User.validate_email(email):
-                return {'message': 'El formato del correo electrónico no es válido'}, 400
+            # Validar presencia, tipo y formato del email
+            data, errors = validate_password_reset_request(request_data)
+            if errors:
+                return {'message': errors[0][1]}, 400
+            email = data['email']
             
             # Buscar usuario por email
             user = User.find_by_email(email)
@@ -158,37 +143,24 @@ class PasswordResetController:
             tuple: (response_data, status_code)
         """
         try:
-            token = request_data.get('token', '').strip()
-            new_password = request_data.get('newPassword', '') # Changed 'password' to 'newPassword'
-            
             print(f'🔐 Restablecimiento de contraseña con token')
             
-            # Validaciones básicas
-            if not token:
-                return {'message': 'Token requerido'}, 400
-            
-            if not new_password:
-                return {'message': 'La nueva contraseña es obligatoria'}, 400
-            
-            # Validar longitud de contraseña
-            if len(new_password) < 6:
-                return {'message': 'La contraseña debe tener al menos 6 caracteres'}, 400
-            
-            # Validar fortaleza de contraseña (misma validación que registro)
-            import re
-            pattern = r'(?=.*[a-z])(?=.*[A-Z])(?=.*\d)'
-            if not re.match(pattern, new_password):
-                return {
-                    'message': 'La contraseña debe contener al menos una mayúscula, una minúscula y un número'
-                }, 400
+            # Token obligatorio; nueva contraseña obligatoria, de al menos 6
+            # caracteres y con la misma fortaleza que en el registro
+            data, errors = validate_password_reset(request_data)
+            if errors:
+                return {'message': errors[0][1]}, 400
+            token = data['token']
+            new_password = data['newPassword']
             
             # Hash del token para búsqueda
             token_hash = hashlib.sha256(token.encode()).hexdigest()
             
-            # Buscar y validar token
-            reset_token = PasswordResetToken.find_by_token(token_hash)
+            # Validar y marcar el token como usado en un solo round trip
+            # (dos solicitudes con el mismo código no pueden consumirlo ambas)
+            reset_token = PasswordResetToken.consume(token_hash)
             
-            if not reset_token or not reset_token.is_valid():
+            if not reset_token:
                 return {
                     'message': 'Token inválido o expirado'
                 }, 400
@@ -199,17 +171,12 @@ class PasswordResetController:
             if not user:
                 return {'message': 'Usuario no encontrado'}, 400
             
-            # Hashear nueva contraseña
-            password_bytes = new_password.encode('utf-8')
-            salt = bcrypt.gensalt()
-            hashed_password = bcrypt.hashpw(password_bytes, salt).decode('utf-8')
-            
-            # Actualizar contraseña del usuario
-            user.password = hashed_password
-            user.save()
+            # Hashear nueva contraseña en el pool de hashing
+            hashed_password = password_hasher.hash_password(new_password)
             
-            # Marcar token como usado
-            reset_token.mark_as_used()
+            # Actualizar contraseña del usuario (el restablecimiento gana a
+            # una edición concurrente: se reaplica sobre la versión nueva)
+            save_with_retry(user, lambda user: setattr(user, 'password', hashed_password))
             
             # Invalidar todos los demás tokens del usuario
             PasswordResetToken.invalidate_user_tokens(user._id)
@@ -1,18 +1,53 @@
 """
 Controlador para gestión de perfil de usuario
 """
-import bcrypt
 import jwt
 from datetime import datetime
 from flask import current_app
-from models.user import User
+from werkzeug.http import parse_etags
+from models.user import DuplicateUserFieldError, User, UserVersionConflictError
 from services.file_upload_service import FileUploadService
 from services.audit_service import audit_logger
-import re
+from services.password_hashing_service import password_hasher
+from services.validation_schemas import UNIQUE_FIELD_MESSAGES, validate_profile_request, validate_password_change
+import services.profile_validation as profile_validation
+from services.user_writes import save_with_retry
 
 class ProfileController:
     """Controlador para operaciones de perfil de usuario"""
     
+    # Campos editables, en el orden de updatedFields: (campo del payload, atributo de User)
+    UPDATABLE_FIELDS = (
+        ('full_name', 'full_name'),
+        ('email', 'email'),
+        ('username', 'username'),
+        ('profilePicture', 'profile_picture'),
+        ('gender', 'gender'),
+        ('address', 'address'),
+        ('phoneNumber', 'phone_number'),
+    )
+    
+    CONFLICT_MESSAGE = 'El perfil fue modificado por otra solicitud'
+    
+    @staticmethod
+    def etag(version):
+        """ETag del perfil: la versión del documento (0 si es anterior al campo)"""
+        return f'"{version or 0}"'
+    
+    @staticmethod
+    def etag_headers(response_data):
+        """Encabezado ETag para una respuesta que incluye el perfil"""
+        profile = response_data.get('profile') or {}
+        if 'version' not in profile:
+            return {}
+        return {'ETag': ProfileController.etag(profile['version'])}
+    
+    @staticmethod
+    def if_match_allows(if_match, version):
+        """Si el encabezado If-Match acepta la versión actual del perfil"""
+        etags = parse_etags(if_match)
+        return etags.star_tag or etags.contains(str(version or 0))
+    
     @staticmethod
     def get_profile(user_id):
         """
@@ -34,7 +69,7 @@ class ProfileController:
                 return {'message': 'Usuario no encontrado'}, 404
             
             # Retornar datos del perfil (sin contraseña)
-            profile_data = user.to_dict(include_password=False)
+            profile_data = user.to_dict(include_password=False, fields=User.PROFILE_RESPONSE_FIELDS)
               # Agregar indicador de contraseña protegida
             profile_data['hasPassword'] = bool(user.password)
             
@@ -56,13 +91,18 @@ class ProfileController:
             }, 500
     
     @staticmethod
-    def update_profile(user_id, request_data):
+    def update_profile(user_id, request_data, if_match=None):
         """
         Actualizar información del perfil del usuario
         
+        Sin If-Match, si otro request guarda el usuario en medio se reintenta
+        sobre la versión nueva; con If-Match el cliente pidió editar una
+        versión concreta y el conflicto se responde con 412.
+        
         Args:
             user_id (str): ID del usuario
             request_data (dict): Datos a actualizar
+            if_match (str): Encabezado If-Match con el ETag leído (opcional)
             
         Returns:
             tuple: (response_data, status_code)
@@ -70,94 +110,41 @@ class ProfileController:
         try:
             print(f'📝 Actualizando perfil para usuario: {user_id}')
             
-            # Buscar usuario existente
-            user = User.find_by_id(user_id)
+            # Validar y normalizar todos los campos en una pasada (sin BD)
+            data, errors = validate_profile_request(request_data)
+            if errors:
+                return {'message': errors[0][1]}, 400
+            
+            # Usuario y unicidad de email/username en una sola consulta; con
+            # PROFILE_CONFLICT_CHECK=index la unicidad la garantiza el índice
+            email, username = data.get('email'), data.get('username')
+            conflicts = []
+            if profile_validation.PROFILE_CONFLICT_CHECK == 'query' and (email or username):
+                user, conflicts = User.find_with_conflicts(user_id, email=email, username=username)
+            else:
+                user = User.find_by_id(user_id)
             
             if not user:
                 return {'message': 'Usuario no encontrado'}, 404
             
-            # Validar y procesar campos a actualizar
-            validation_result = ProfileController._validate_profile_data(request_data, user)
-            if validation_result['has_errors']:
-                return {'message': validation_result['message']}, 400
-            
-            # Actualizar campos del usuario
-            updated_fields = []
-            
-            # Campos básicos
-            if 'full_name' in request_data:
-                full_name = request_data['full_name'].strip()
-                if len(full_name) >= 2:
-                    user.full_name = full_name
-                    updated_fields.append('full_name')
-                else:
-                    return {'message': 'El nombre debe tener al menos 2 caracteres'}, 400
-            
-            if 'email' in request_data:
-                email = request_data['email'].strip().lower()
-                if User.validate_email(email):
-                    # Verificar que el email no esté en uso por otro usuario
-                    existing_user = User.find_by_email(email)
-                    if existing_user and existing_user._id != user._id:
-                        return {'message': 'El correo ya está en uso por otro usuario'}, 400
-                    user.email = email
-                    updated_fields.append('email')
-                else:
-                    return {'message': 'Formato de correo inválido'}, 400
-            
-            # Campos opcionales
-            if 'username' in request_data:
-                username = request_data['username'].strip() if request_data['username'] else None
-                if username:
-                    if User.validate_username(username):
-                        # Verificar que el username no esté en uso
-                        existing_user = User.find_by_username(username)
-                        if existing_user and existing_user._id != user._id:
-                            return {'message': 'El nombre de usuario ya está en uso'}, 400
-                        user.username = username
-                        updated_fields.append('username')
-                    else:
-                        return {
-                            'message': 'Username inválido. Debe tener 3-20 caracteres y solo letras, números y guiones bajos'
-                        }, 400
-                else:
-                    user.username = None
-                    updated_fields.append('username')
-            
-            if 'profilePicture' in request_data:
-                user.profile_picture = request_data['profilePicture']
-                updated_fields.append('profilePicture')
-            
-            if 'gender' in request_data:
-                gender = request_data['gender']
-                if User.validate_gender(gender):
-                    user.gender = gender.lower() if gender else None
-                    updated_fields.append('gender')
-                else:
-                    return {
-                        'message': 'Género inválido. Opciones: male, female, other, prefer_not_to_say'
-                    }, 400
-            
-            if 'address' in request_data:
-                address = request_data['address'].strip() if request_data['address'] else None
-                if User.validate_address(address):
-                    user.address = address
-                    updated_fields.append('address')
-                else:
-                    return {'message': 'Dirección inválida. Debe tener entre 5 y 200 caracteres'}, 400
-            
-            if 'phoneNumber' in request_data:
-                phone = request_data['phoneNumber'].strip() if request_data['phoneNumber'] else None
-                if User.validate_phone_number(phone):
-                    user.phone_number = phone
-                    updated_fields.append('phoneNumber')
-                else:
-                    return {'message': 'Número de teléfono inválido'}, 400
-            
-            # Actualizar timestamp
-            user.updated_at = datetime.utcnow()
-              # Guardar cambios
-            user.save()
+            if conflicts:
+                return {'message': UNIQUE_FIELD_MESSAGES[conflicts[0]]}, 400
+            
+            if if_match is not None and not ProfileController.if_match_allows(if_match, user.version):
+                return {'message': ProfileController.CONFLICT_MESSAGE}, 412
+            
+            # Campos a actualizar (en los opcionales, vacío o null los borra)
+            updated_fields = [field for field, _ in ProfileController.UPDATABLE_FIELDS if field in data]
+            
+            def apply_changes(user):
+                for field, attribute in ProfileController.UPDATABLE_FIELDS:
+                    if field in data:
+                        setattr(user, attribute, data[field])
+                # Actualizar timestamp
+                user.updated_at = datetime.utcnow()
+            
+            # Guardar cambios (update condicional a la versión leída)
+            save_with_retry(user, apply_changes, retries=0 if if_match is not None else None)
             
             # Registrar auditoría
             updated_data = {field: getattr(user, field.replace('Name', '_name').replace('Picture', '_picture').replace('Number', '_number'), None) 
@@ -169,10 +156,17 @@ class ProfileController:
             # Retornar perfil actualizado
             return {
                 'message': 'Perfil actualizado exitosamente',
-                'profile': user.to_dict(include_password=False),
+                'profile': user.to_dict(include_password=False, fields=User.PROFILE_RESPONSE_FIELDS),
                 'updatedFields': updated_fields
             }, 200
             
+        except DuplicateUserFieldError as e:
+            # Otro usuario tomó el email/username (o no se consultó antes)
+            print(f'❌ Campo único en uso: {e.field}')
+            return {'message': UNIQUE_FIELD_MESSAGES[e.field]}, 400
+        except UserVersionConflictError as e:
+            print(f'❌ {e}')
+            return {'message': ProfileController.CONFLICT_MESSAGE}, 412 if if_match is not None else 409
         except ValueError as e:
             print(f'❌ Error de validación: {e}')
             return {'message': str(e)}, 400
@@ -196,52 +190,54 @@ class ProfileController:
             tuple: (response_data, status_code)
         """
         try:
-            current_password = request_data.get('currentPassword', '')
-            new_password = request_data.get('newPassword', '')
-            
             print(f'🔐 Cambio de contraseña para usuario: {user_id}')
             
-            # Validaciones básicas
-            if not current_password or not new_password:
-                return {'message': 'Contraseña actual y nueva son obligatorias'}, 400
+            _, errors = validate_password_change(request_data)
+            
+            # Validaciones básicas (campos obligatorios)
+            if errors and errors[0][0] != 'newPassword':
+                return {'message': errors[0][1]}, 400
+            current_password = request_data['currentPassword']
+            new_password = request_data['newPassword']
             
             # Buscar usuario
             user = User.find_by_id(user_id)
             if not user:
                 return {'message': 'Usuario no encontrado'}, 404
-              # Verificar contraseña actual
-            current_password_bytes = current_password.encode('utf-8')
-            stored_password_bytes = user.password.encode('utf-8')
-            is_current_valid = bcrypt.checkpw(current_password_bytes, stored_password_bytes)
             
-            if not is_current_valid:
+            # Verificar contraseña actual en el pool de hashing
+            current_check = password_hasher.submit_verify(current_password, user.password)
+            
+            if not current_check.result():
                 audit_logger.log_password_change(user_id, user.email, success=False, reason='Contraseña actual incorrecta')
                 return {'message': 'Contraseña actual incorrecta'}, 400
             
-            # Validar nueva contraseña
-            if len(new_password) < 6:
-                return {'message': 'La nueva contraseña debe tener al menos 6 caracteres'}, 400
+            # El error de la nueva contraseña se reporta después de verificar la actual
+            if errors:
+                return {'message': errors[0][1]}, 400
             
-            # Validar fortaleza de contraseña
-            pattern = r'(?=.*[a-z])(?=.*[A-Z])(?=.*\d)'
-            if not re.match(pattern, new_password):
-                return {
-                    'message': 'La nueva contraseña debe contener al menos una mayúscula, una minúscula y un número'
-                }, 400
-            
-            # Verificar que la nueva contraseña sea diferente
-            new_password_bytes = new_password.encode('utf-8')
-            is_same_password = bcrypt.checkpw(new_password_bytes, stored_password_bytes)
-            if is_same_password:
+            # Solo con la actual correcta se gasta otro hash en comparar la nueva
+            same_check = password_hasher.submit_verify(new_password, user.password)
+            if same_check.result():
                 return {'message': 'La nueva contraseña debe ser diferente a la actual'}, 400
             
             # Hashear nueva contraseña
-            salt = bcrypt.gensalt()
-            hashed_password = bcrypt.hashpw(new_password_bytes, salt).decode('utf-8')
-              # Actualizar contraseña
-            user.password = hashed_password
-            user.updated_at = datetime.utcnow()
-            user.save()
+            hashed_password = password_hasher.hash_password(new_password)
+            verified_hash = user.password
+            
+            def apply_password(user):
+                # Si al recargar la contraseña ya no es la verificada, no pisarla
+                if user.password != verified_hash:
+                    raise UserVersionConflictError(user._id)
+                user.password = hashed_password
+                user.updated_at = datetime.utcnow()
+            
+            # Actualizar contraseña
+            try:
+                save_with_retry(user, apply_password)
+            except UserVersionConflictError as e:
+                print(f'❌ {e}')
+                return {'message': 'La contraseña fue modificada por otra solicitud'}, 409
             
             # Registrar auditoría
             audit_logger.log_password_change(user_id, user.email, success=True)
@@ -289,16 +285,27 @@ class ProfileController:
             
             # Resultado contiene la URL de la nueva imagen
             new_picture_url = result
+            previous_pictures = []
             
-            # Eliminar imagen anterior si existe
-            if user.profile_picture:
-                FileUploadService.delete_old_picture(user.profile_picture)
+            def apply_picture(user):
+                # La imagen reemplazada es la de la versión que se guarda
+                previous_pictures[:] = [user.profile_picture]
+                user.profile_picture = new_picture_url
+                user.updated_at = datetime.utcnow()
             
             # Actualizar URL en la base de datos
-            user.profile_picture = new_picture_url
-            user.updated_at = datetime.utcnow()
-            
-            if user.save():
+            try:
+                saved = save_with_retry(user, apply_picture)
+            except UserVersionConflictError as e:
+                print(f'❌ {e}')
+                FileUploadService.delete_old_picture(new_picture_url)
+                return {'message': ProfileController.CONFLICT_MESSAGE}, 409
+            
+            if saved:
+                # Eliminar imagen anterior si existe (ya no la referencia el usuario)
+                if previous_pictures[0]:
+                    FileUploadService.delete_old_picture(previous_pictures[0])
+                
                 # Registrar auditoría
                 audit_logger.log_profile_picture_upload(user_id, user.email, success=True)
                 
@@ -316,38 +323,3 @@ class ProfileController:
                 'message': 'Error subiendo foto de perfil',
                 'error': str(e)
             }, 500
-    
-    @staticmethod
-    def _validate_profile_data(data, current_user):
-        """
-        Validar datos del perfil
-        
-        Args:
-            data (dict): Datos a validar
-            current_user (User): Usuario actual
-            
-        Returns:
-            dict: Resultado de validación
-        """
-        # Lista de campos válidos para actualizar
-        allowed_fields = [
-            'full_name', 'email', 'username', 'profilePicture', 
-            'gender', 'address', 'phoneNumber'
-        ]
-        
-        # Verificar que no se envíen campos no permitidos
-        invalid_fields = [field for field in data.keys() if field not in allowed_fields]
-        if invalid_fields:
-            return {
-                'has_errors': True,
-                'message': f'Campos no permitidos: {", ".join(invalid_fields)}'
-            }
-        
-        # Al menos un campo debe ser enviado
-        if not any(field in data for field in allowed_fields):
-            return {
-                'has_errors': True,
-                'message': 'Debe proporcionar al menos un campo para actualizar'
-            }
-        
-        return {'has_errors': False, 'message': 'Validación exitosa'}
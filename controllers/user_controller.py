@@ -1,12 +1,14 @@
 """
 Controlador para manejo de usuarios
 """
-import bcrypt
-import jwt
-from datetime import datetime, timedelta
 from flask import current_app, jsonify
 from models.user import User
-from services.user_creation_validation import create_user_validation_chain
+from models.async_repository import user_repository
+from services.user_creation_validation import create_user_validation_chain, COLLECT_VALIDATION_ERRORS
+from utils.handler_template import merge_validation_errors
+from services.password_hashing_service import password_hasher
+from services.token_service import token_service
+from services.login_throttle import login_throttle, LoginThrottledError
 
 class UserController:
     """Controlador para operaciones de usuario"""
@@ -15,14 +17,10 @@ class UserController:
     async def register_user(request_data):
         """Registrar un nuevo usuario"""
         try:
-            # Obtener datos del request
-            full_name = request_data.get('full_name', '').strip() # Cambiado a full_name
-            email = request_data.get('email', '').strip()
-            password = request_data.get('password', '')
-            
-            print(f'📝 Datos recibidos para registro: full_name={full_name}, email={email}, password=***')
+            print(f"📝 Datos recibidos para registro: full_name={request_data.get('full_name')}, "
+                  f"email={request_data.get('email')}, password=***")
             
-            # Crear cadena de validación
+            # Cadena de validación (construida una sola vez); normaliza request_data
             validation_chain = create_user_validation_chain()
             
             # Variable para capturar la respuesta de validación
@@ -34,20 +32,24 @@ class UserController:
                 validation_response['data'] = data
                 validation_response['status'] = status_code
             
-            # Ejecutar validaciones
-            validation_passed = await validation_chain.handle(request_data, response_handler)
-            
-            # Si las validaciones fallaron, retornar el error
-            if not validation_passed or validation_response['sent']:
+            if COLLECT_VALIDATION_ERRORS:
+                # Ejecutar todas las validaciones y reportar todos los errores
+                errors = await validation_chain.handle_all(request_data)
+                if errors:
+                    print('❌ Validaciones fallaron')
+                    return merge_validation_errors(errors)
+            elif not await validation_chain.handle(request_data, response_handler):
+                # Se detiene en el primer error
                 print('❌ Validaciones fallaron')
                 return validation_response['data'], validation_response['status']
             
             print('✅ Validaciones pasaron, creando usuario...')
+            full_name = request_data['full_name']
+            email = request_data['email']
+            password = request_data['password']
             
-            # Hashear la contraseña
-            password_bytes = password.encode('utf-8')
-            salt = bcrypt.gensalt()
-            hashed_password = bcrypt.hashpw(password_bytes, salt).decode('utf-8')
+            # Hashear la contraseña en el pool (no bloquea el event loop)
+            hashed_password = await password_hasher.hash_password_async(password)
             
             # Crear el usuario
             user = User(
@@ -56,7 +58,7 @@ class UserController:
                 password=hashed_password
             )
             
-            user_id = user.save()
+            user_id = await user_repository.save(user)
             print(f'✅ Usuario creado: {user_id}')
             
             # Responder con el usuario creado (sin la contraseña)
@@ -73,8 +75,14 @@ class UserController:
             }, 500
     
     @staticmethod
-    def login_user(request_data):
-        """Iniciar sesión de usuario"""
+    def login_user(request_data, client_ip=None):
+        """
+        Iniciar sesión de usuario
+        
+        Args:
+            request_data (dict): Credenciales de login
+            client_ip (str): IP del cliente, usada por el throttle de intentos
+        """
         try:
             email = request_data.get('email', '').strip()
             password = request_data.get('password', '')
@@ -85,36 +93,47 @@ class UserController:
             if not email or not password:
                 return {'message': 'Todos los campos son obligatorios'}, 400
             
-            # Buscar el usuario por email
-            user = User.find_by_email(email)
+            # Rechazar intentos bloqueados antes de consultar la BD o hashear
+            try:
+                login_throttle.check(email, client_ip)
+            except LoginThrottledError as e:
+                print(f'🚫 Login rechazado por throttle para: {email}')
+                return {'message': str(e), 'retryAfter': e.retry_after}, 429
+            
+            # Buscar solo las credenciales (proyección o índice cubierto)
+            user = User.find_credentials_by_email(email)
             print(f'🔍 Usuario encontrado: {"Sí" if user else "No"}')
             
             if not user:
+                login_throttle.register_failure(email, client_ip)
                 return {'message': 'Credenciales inválidas'}, 400
             
-            # Verificar la contraseña
-            password_bytes = password.encode('utf-8')
-            stored_password_bytes = user.password.encode('utf-8')
-            is_match = bcrypt.checkpw(password_bytes, stored_password_bytes)
+            # Verificar la contraseña en el pool de hashing
+            is_match = password_hasher.verify_password(password, user.password)
             print(f'🔐 Contraseña válida: {"Sí" if is_match else "No"}')
             
             if not is_match:
+                login_throttle.register_failure(email, client_ip)
                 return {'message': 'Credenciales inválidas'}, 400
             
-            # Crear el token JWT
-            secret_key = current_app.config['SECRET_KEY']
-            payload = {
-                'userId': str(user._id),
-                'exp': datetime.utcnow() + timedelta(days=30)
-            }
+            login_throttle.register_success(email, client_ip)
+            
+            # Rehash transparente si el hash usa un algoritmo/costo anterior
+            if password_hasher.needs_rehash(user.password):
+                user_id, old_hash = str(user._id), user.password
+                password_hasher.rehash_in_background(
+                    password,
+                    lambda new_hash: User.update_password_hash(user_id, new_hash, old_hash)
+                )
             
-            token = jwt.encode(payload, secret_key, algorithm='HS256')
+            # Crear access token de vida corta + refresh token
+            tokens = token_service.issue_token_pair(user._id)
             
             print(f'✅ Login exitoso para: {email}')
             
             return {
-                'token': token,
-                'user': user.to_dict()
+                **tokens,
+                'user': user.to_dict(fields=User.LOGIN_RESPONSE_FIELDS)
             }, 200
             
         except Exception as e:
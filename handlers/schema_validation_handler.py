@@ -0,0 +1,41 @@
+"""
+Handler que valida el payload completo con un schema compilado
+"""
+from utils.handler_template import Handler
+
+class SchemaValidationHandler(Handler):
+    """
+    Validar y normalizar todos los campos con un validador de utils.schema
+
+    Si la validación pasa, los valores normalizados (sin espacios, email en
+    minúsculas, ...) se escriben en el contexto para los handlers siguientes.
+    """
+
+    def __init__(self, validate, context_keys=()):
+        """
+        Args:
+            validate: Validador compilado (Schema.compile())
+            context_keys (tuple): Claves del contexto que no son parte del
+                payload (p. ej. current_user_id) y no se validan
+        """
+        super().__init__()
+        self.validate = validate
+        self.context_keys = context_keys
+
+    def _run(self, context):
+        payload = context
+        if self.context_keys:
+            payload = {key: value for key, value in context.items() if key not in self.context_keys}
+        data, errors = self.validate(payload)
+        if not errors:
+            context.update(data)
+        return errors
+
+    async def check(self, context):
+        errors = self._run(context)
+        if errors:
+            return {'message': errors[0][1]}, 400
+        return None
+
+    async def check_all(self, context):
+        return [({'message': message}, 400) for _, message in self._run(context)]
@@ -0,0 +1,293 @@
+"""
+Repositorios asíncronos de User y PasswordResetToken
+
+Misma API que los modelos (find_by_email, save, consume, ...) pero con
+corrutinas, para que las cadenas de validación y los controladores async
+hagan I/O sin bloquear el event loop y puedan solapar consultas con
+asyncio.gather.
+
+Drivers (MONGO_ASYNC_DRIVER):
+    motor   Motor (opcional): I/O nativa sobre asyncio, un cliente por event loop
+    thread  Los modelos síncronos en asyncio.to_thread (sin dependencias extra)
+    auto    motor si está instalado, si no thread (por defecto)
+"""
+import asyncio
+import os
+import weakref
+from datetime import datetime
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+import config.indexes as indexes
+from config.database import connection_manager
+from models.password_reset_token import PasswordResetToken
+from models.user import User
+from services.identity_map import record_query
+from services.singleflight import reset_token_flight, user_flight
+from services.user_cache import user_cache
+
+
+class MotorDatabase:
+    """
+    Base de datos de Motor para el event loop actual
+
+    Un cliente de Motor queda ligado al loop en el que se usa por primera vez,
+    así que se crea uno por loop (y ninguno se hereda tras un fork).
+    """
+
+    def __init__(self):
+        import motor.motor_asyncio
+
+        self._motor = motor.motor_asyncio
+        self._clients = weakref.WeakKeyDictionary()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._clients.clear)
+
+    def get_db(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            if connection_manager.uri is None:
+                raise Exception('Database not initialized. Call init_db() first.')
+            listeners = list(connection_manager.client_options.get('event_listeners', [])) + [connection_manager.metrics]
+            options = dict(connection_manager.client_options, event_listeners=listeners)
+            client = self._motor.AsyncIOMotorClient(connection_manager.uri, **options)
+            self._clients[loop] = client
+        return client[connection_manager.db_name]
+
+
+class ThreadUserRepository:
+    """User en el pool de hilos por defecto del loop"""
+
+    async def find_by_email(self, email, fields=None):
+        return await asyncio.to_thread(User.find_by_email, email, fields)
+
+    async def find_by_id(self, user_id, fields=None):
+        return await asyncio.to_thread(User.find_by_id, user_id, fields)
+
+    async def find_by_username(self, username, fields=None):
+        return await asyncio.to_thread(User.find_by_username, username, fields)
+
+    async def find_credentials_by_email(self, email, covered=None):
+        return await asyncio.to_thread(User.find_credentials_by_email, email, covered)
+
+    async def find_conflicts(self, email=None, username=None, exclude_id=None):
+        return await asyncio.to_thread(User.find_conflicts, email, username, exclude_id)
+
+    async def save(self, user):
+        return await asyncio.to_thread(user.save)
+
+    async def update_password_hash(self, user_id, new_hash, old_hash):
+        return await asyncio.to_thread(User.update_password_hash, user_id, new_hash, old_hash)
+
+
+class MotorUserRepository:
+    """
+    User con Motor
+
+    Pasa por los mismos ganchos que el modelo síncrono: identity map del
+    request, record_query, caché read-through, singleflight, y las
+    escrituras de User.begin_write()/finish_write().
+
+    Los usuarios cargados con proyección cargan los campos que falten de forma
+    síncrona (User.__getattr__): en código async conviene pedir todo lo que
+    se va a leer.
+    """
+
+    def __init__(self, database):
+        self.database = database
+
+    def _collection(self):
+        return self.database.get_db().users
+
+    @staticmethod
+    async def _mapped(field, value, load):
+        # Como User._mapped, con load() como corrutina
+        user, identity_map = User.identity_lookup(field, value)
+        if user is None:
+            user = User.identity_register(identity_map, await load())
+        return user
+
+    async def _find_one(self, query, fields=None, hint=None):
+        projection = User.projection(fields) if fields is not None else None
+        options = {'hint': hint} if hint else {}
+
+        async def load():
+            record_query('find_one')
+            return await self._collection().find_one(query, projection, **options)
+
+        user_data = await user_flight.do_async(User.read_key(query, fields, hint), load)
+        return User.from_document(user_data, fields) if user_data else None
+
+    async def _find_cached(self, field, value, query):
+        async def load():
+            record_query('find_one')
+            return await self._collection().find_one(query)
+
+        user_data = await user_cache.get_async(field, value, lambda: user_flight.do_async(User.read_key(query), load))
+        return User.from_document(user_data) if user_data else None
+
+    async def find_by_email(self, email, fields=None):
+        email = email.lower()
+        if fields is None:
+            return await self._mapped('email', email, lambda: self._find_cached('email', email, {'email': email}))
+        return await self._mapped('email', email, lambda: self._find_one({'email': email}, fields))
+
+    async def find_by_id(self, user_id, fields=None):
+        user_id = str(user_id)
+        if fields is None:
+            return await self._mapped('_id', user_id, lambda: self._find_cached(
+                '_id', user_id, {'_id': ObjectId(user_id)}))
+        return await self._mapped('_id', user_id, lambda: self._find_one({'_id': ObjectId(user_id)}, fields))
+
+    async def find_by_username(self, username, fields=None):
+        if not username:
+            return None
+        if fields is None:
+            return await self._mapped('username', username, lambda: self._find_cached(
+                'username', username, {'username': username}))
+        return await self._mapped('username', username, lambda: self._find_one({'username': username}, fields))
+
+    async def find_credentials_by_email(self, email, covered=None):
+        email = email.lower()
+        if covered is None:
+            covered = indexes.COVERED_LOGIN_INDEX
+        if covered:
+            return await self._mapped('email', email, lambda: self._find_one(
+                {'email': email}, ('email', 'password'), hint=indexes.LOGIN_CREDENTIALS_INDEX))
+        return await self._mapped('email', email, lambda: self._find_one({'email': email}, User.CREDENTIAL_FIELDS))
+
+    async def find_conflicts(self, email=None, username=None, exclude_id=None):
+        query = User.conflicts_query(email, username, exclude_id)
+        if query is None:
+            return []
+        record_query('find')
+        documents = await self._collection().find(query, {'email': 1, 'username': 1}).limit(2).to_list(2)
+        return User.conflicting_fields(documents, email, username)
+
+    async def save(self, user):
+        """Mismo contrato que User.save(), con la misma escritura"""
+        write = user.begin_write()
+        if write is None:
+            return user._id
+        operation, args = write
+        with User.write_errors():
+            result = await getattr(self._collection(), operation)(*args)
+        return user.finish_write(operation, args, result)
+
+    async def update_password_hash(self, user_id, new_hash, old_hash):
+        query, update = User.begin_password_hash_update(user_id, new_hash, old_hash)
+        result = await self._collection().update_one(query, update)
+        return User.finish_password_hash_update(user_id, result)
+
+
+class ThreadPasswordResetTokenRepository:
+    """PasswordResetToken en el pool de hilos por defecto del loop"""
+
+    async def find_by_token(self, token_hash):
+        return await asyncio.to_thread(PasswordResetToken.find_by_token, token_hash)
+
+    async def consume(self, token_hash, user_id=None):
+        return await asyncio.to_thread(PasswordResetToken.consume, token_hash, user_id)
+
+    async def invalidate_user_tokens(self, user_id):
+        return await asyncio.to_thread(PasswordResetToken.invalidate_user_tokens, user_id)
+
+    async def find_valid_token_by_hash(self, user_id, token_hash):
+        return await asyncio.to_thread(PasswordResetToken.find_valid_token_by_hash, user_id, token_hash)
+
+    async def save(self, token):
+        return await asyncio.to_thread(token.save)
+
+
+class MotorPasswordResetTokenRepository:
+    """PasswordResetToken con Motor"""
+
+    def __init__(self, database):
+        self.database = database
+
+    def _collection(self):
+        return self.database.get_db().password_reset_tokens
+
+    async def _find_valid(self, key, query):
+        def load():
+            return self._collection().find_one(dict(query, used=False, expires_at={'$gt': datetime.utcnow()}))
+
+        token_data = await reset_token_flight.do_async(key, load)
+        return PasswordResetToken._from_document(token_data) if token_data else None
+
+    async def find_by_token(self, token_hash):
+        return await self._find_valid(('find_by_token', token_hash), {'token': token_hash})
+
+    async def consume(self, token_hash, user_id=None):
+        now = datetime.utcnow()
+        query = {'token': token_hash, 'used': False, 'expires_at': {'$gt': now}}
+        if user_id is not None:
+            query['user_id'] = ObjectId(user_id)
+        token_data = await self._collection().find_one_and_update(
+            query,
+            {'$set': {'used': True, 'used_at': now}},
+            return_document=ReturnDocument.AFTER
+        )
+        reset_token_flight.invalidate()
+        return PasswordResetToken._from_document(token_data) if token_data else None
+
+    async def invalidate_user_tokens(self, user_id):
+        now = datetime.utcnow()
+        await self._collection().update_many(
+            {'user_id': ObjectId(user_id), 'used': False, 'expires_at': {'$gt': now}},
+            {'$set': {'used': True, 'used_at': now}}
+        )
+        reset_token_flight.invalidate()
+
+    async def find_valid_token_by_hash(self, user_id, token_hash):
+        try:
+            user_id = ObjectId(user_id)
+        except Exception:
+            print(f"Error: user_id inválido para ObjectId: {user_id}")
+            return None
+        return await self._find_valid(('find_valid_token_by_hash', str(user_id), token_hash),
+                                      {'user_id': user_id, 'token': token_hash})
+
+    async def save(self, token):
+        token_data = {
+            'user_id': ObjectId(token.user_id),
+            'token': token.token,
+            'expires_at': token.expires_at,
+            'used': token.used,
+            'created_at': token.created_at
+        }
+        if token._id:
+            await self._collection().update_one({'_id': ObjectId(token._id)}, {'$set': token_data})
+        else:
+            result = await self._collection().insert_one(token_data)
+            token._id = result.inserted_id
+        reset_token_flight.invalidate()
+        return token._id
+
+
+def create_repositories(driver=None):
+    """
+    Crear los repositorios según MONGO_ASYNC_DRIVER (auto | motor | thread)
+
+    Returns:
+        tuple: (repositorio de usuarios, repositorio de tokens de reset)
+    """
+    driver = (driver or os.getenv('MONGO_ASYNC_DRIVER', 'auto')).lower()
+    if driver not in ('auto', 'motor', 'thread'):
+        raise ValueError(f'Driver async de MongoDB desconocido: {driver}')
+
+    if driver != 'thread':
+        try:
+            database = MotorDatabase()
+            return MotorUserRepository(database), MotorPasswordResetTokenRepository(database)
+        except ImportError:
+            if driver == 'motor':
+                raise ImportError('MONGO_ASYNC_DRIVER=motor requiere instalar motor')
+
+    return ThreadUserRepository(), ThreadPasswordResetTokenRepository()
+
+
+# Instancias globales
+user_repository, password_reset_token_repository = create_repositories()
@@ -0,0 +1,39 @@
+"""
+Modelo para los resume tokens de los change streams
+"""
+from datetime import datetime
+from config.database import get_db
+
+class ChangeStreamToken:
+    """
+    Último resume token procesado por cada watcher con CHANGE_WATCHER_NAME,
+    para retomar el change stream tras un reinicio sin perder eventos. El
+    nombre debe ser estable y único por worker; los de nombres que dejan de
+    usarse expiran por el índice TTL sobre updated_at.
+    """
+
+    @staticmethod
+    def get_collection():
+        """Obtener la colección de resume tokens"""
+        db = get_db()
+        return db.change_stream_tokens
+
+    @staticmethod
+    def load(name):
+        """Obtener el resume token guardado (None si no hay)"""
+        document = ChangeStreamToken.get_collection().find_one({'_id': name})
+        return document['token'] if document else None
+
+    @staticmethod
+    def save(name, token):
+        """Guardar el resume token de un watcher"""
+        ChangeStreamToken.get_collection().update_one(
+            {'_id': name},
+            {'$set': {'token': token, 'updated_at': datetime.utcnow()}},
+            upsert=True
+        )
+
+    @staticmethod
+    def delete(name):
+        """Olvidar el resume token (p. ej. si ya no está en el oplog)"""
+        ChangeStreamToken.get_collection().delete_one({'_id': name})
@@ -0,0 +1,74 @@
+"""
+Modelo para el estado compartido del throttle de login
+"""
+from datetime import datetime
+from pymongo.errors import DuplicateKeyError
+from config.database import get_db
+
+class LoginThrottleState:
+    """
+    Estado del token bucket por clave (email o IP) compartido entre workers.
+
+    Cada documento lleva un campo `version` para actualizarlo con
+    compare-and-set y un índice TTL que lo borra cuando ya no aporta nada.
+    """
+
+    @staticmethod
+    def get_collection():
+        """Obtener la colección de estado del throttle"""
+        db = get_db()
+        return db.login_throttle
+
+    @staticmethod
+    def find(key):
+        """
+        Buscar el estado de una clave
+
+        Returns:
+            tuple: (state, version) o (None, None)
+        """
+        collection = LoginThrottleState.get_collection()
+        document = collection.find_one({'_id': key})
+        if document is None:
+            return None, None
+        version = document.pop('version', 0)
+        document.pop('_id', None)
+        document.pop('expires_at', None)
+        return document, version
+
+    @staticmethod
+    def compare_and_set(key, version, state, expires_at):
+        """
+        Guardar el estado solo si nadie lo cambió desde `version`
+
+        Returns:
+            bool: True si se guardó
+        """
+        collection = LoginThrottleState.get_collection()
+
+        document = dict(state, expires_at=expires_at)
+        if version is None:
+            try:
+                collection.insert_one(dict(document, _id=key, version=1))
+                return True
+            except DuplicateKeyError:
+                return False
+
+        result = collection.update_one(
+            {'_id': key, 'version': version},
+            {'$set': document, '$inc': {'version': 1}}
+        )
+        return result.matched_count == 1
+
+    @staticmethod
+    def delete(key):
+        """Eliminar el estado de una clave"""
+        collection = LoginThrottleState.get_collection()
+        collection.delete_one({'_id': key})
+
+    @staticmethod
+    def cleanup_expired():
+        """Limpiar estados expirados (por si el índice TTL aún no corrió)"""
+        collection = LoginThrottleState.get_collection()
+        result = collection.delete_many({'expires_at': {'$lt': datetime.utcnow()}})
+        return result.deleted_count
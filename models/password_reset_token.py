@@ -3,7 +3,9 @@ Modelo para tokens de restablecimiento de contraseña
 """
 from datetime import datetime, timedelta
 from bson import ObjectId
+from pymongo import ReturnDocument
 from config.database import get_db
+from services.singleflight import reset_token_flight
 import secrets
 import hashlib
 
@@ -39,9 +41,6 @@ class PasswordResetToken:
         """Guardar token en la base de datos"""
         collection = self.get_collection()
         
-        # Crear índice TTL para auto-eliminación de tokens expirados
-        collection.create_index("expires_at", expireAfterSeconds=0)
-        
         token_data = {
             'user_id': ObjectId(self.user_id),
             'token': self.token,
@@ -56,33 +55,73 @@ class PasswordResetToken:
                 {'_id': ObjectId(self._id)},
                 {'$set': token_data}
             )
+            reset_token_flight.invalidate()
             return self._id
         else:
             # Crear nuevo token
             result = collection.insert_one(token_data)
+            reset_token_flight.invalidate()
             self._id = result.inserted_id
             return self._id
     
+    @staticmethod
+    def _from_document(token_data):
+        return PasswordResetToken(
+            user_id=str(token_data['user_id']),
+            token=token_data['token'],
+            expires_at=token_data['expires_at'],
+            used=token_data['used'],
+            created_at=token_data.get('created_at'),
+            _id=str(token_data['_id'])
+        )
+    
     @staticmethod
     def find_by_token(token_hash):
         """Buscar token por hash"""
+        def load():
+            return PasswordResetToken.get_collection().find_one({
+                'token': token_hash,
+                'used': False,
+                'expires_at': {'$gt': datetime.utcnow()}
+            })
+        
+        # Solicitudes concurrentes con el mismo código comparten la consulta
+        token_data = reset_token_flight.do(('find_by_token', token_hash), load)
+        
+        if token_data:
+            return PasswordResetToken._from_document(token_data)
+        return None
+    
+    @staticmethod
+    def consume(token_hash, user_id=None):
+        """
+        Validar y marcar como usado un token en un solo round trip
+        
+        Args:
+            token_hash (str): Hash del código recibido
+            user_id (str or ObjectId): Restringir a un usuario (opcional)
+            
+        Returns:
+            PasswordResetToken or None: El token consumido, o None si no es válido
+        """
         collection = PasswordResetToken.get_collection()
-        token_data = collection.find_one({
+        now = datetime.utcnow()
+        query = {
             'token': token_hash,
             'used': False,
-            'expires_at': {'$gt': datetime.utcnow()}
-        })
+            'expires_at': {'$gt': now}
+        }
+        if user_id is not None:
+            query['user_id'] = ObjectId(user_id)
         
-        if token_data:
-            return PasswordResetToken(
-                user_id=str(token_data['user_id']),
-                token=token_data['token'],
-                expires_at=token_data['expires_at'],
-                used=token_data['used'],
-                created_at=token_data.get('created_at'),
-                _id=str(token_data['_id'])
-            )
-        return None
+        token_data = collection.find_one_and_update(
+            query,
+            {'$set': {'used': True, 'used_at': now}},
+            return_document=ReturnDocument.AFTER
+        )
+        # Una búsqueda que empiece ahora no puede ver el token como vigente
+        reset_token_flight.invalidate()
+        return PasswordResetToken._from_document(token_data) if token_data else None
     
     @staticmethod
     def invalidate_user_tokens(user_id):
@@ -94,13 +133,21 @@ class PasswordResetToken:
                 'used': False,
                 'expires_at': {'$gt': datetime.utcnow()}
             },
-            {'$set': {'used': True}}
+            {'$set': {'used': True, 'used_at': datetime.utcnow()}}
         )
+        reset_token_flight.invalidate()
     
     def mark_as_used(self):
         """Marcar token como usado"""
         self.used = True
-        return self.save()
+        if not self._id:
+            return self.save()
+        PasswordResetToken.get_collection().update_one(
+            {'_id': ObjectId(self._id)},
+            {'$set': {'used': True, 'used_at': datetime.utcnow()}}
+        )
+        reset_token_flight.invalidate()
+        return self._id
     
     def is_valid(self):
         """Verificar si el token es válido"""
@@ -121,8 +168,6 @@ class PasswordResetToken:
         Returns:
             PasswordResetToken or None: El objeto token si se encuentra y es válido, None en caso contrario.
         """
-        collection = PasswordResetToken.get_collection()
-        
         # Asegurarse que user_id es ObjectId
         if not isinstance(user_id, ObjectId):
             try:
@@ -131,20 +176,16 @@ class PasswordResetToken:
                 print(f"Error: user_id inválido para ObjectId: {user_id}")
                 return None
 
-        token_data = collection.find_one({
-            'user_id': user_id,
-            'token': token_hash,
-            'used': False,
-            'expires_at': {'$gt': datetime.utcnow()}
-        })
+        def load():
+            return PasswordResetToken.get_collection().find_one({
+                'user_id': user_id,
+                'token': token_hash,
+                'used': False,
+                'expires_at': {'$gt': datetime.utcnow()}
+            })
+        
+        token_data = reset_token_flight.do(('find_valid_token_by_hash', str(user_id), token_hash), load)
         
         if token_data:
-            return PasswordResetToken(
-                user_id=str(token_data['user_id']),
-                token=token_data['token'],
-                expires_at=token_data['expires_at'],
-                used=token_data['used'],
-                created_at=token_data.get('created_at'),
-                _id=str(token_data['_id'])
-            )
+            return PasswordResetToken._from_document(token_data)
         return None
@@ -0,0 +1,115 @@
+"""
+Modelo para refresh tokens (rotación de sesiones)
+"""
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument
+from config.database import get_db
+import secrets
+import hashlib
+import os
+
+class RefreshToken:
+    """Modelo para refresh tokens opacos con rotación por familia"""
+
+    def __init__(self, user_id=None, token=None, family_id=None, expires_at=None, used=False, revoked=False, **kwargs):
+        self.user_id = user_id
+        self.token = token  # Hash SHA-256 del token entregado al cliente
+        self.family_id = family_id or secrets.token_hex(16)
+        ttl_days = int(os.getenv('REFRESH_TOKEN_TTL_DAYS', 30))
+        self.expires_at = expires_at or datetime.utcnow() + timedelta(days=ttl_days)
+        self.used = used
+        self.revoked = revoked
+        self.created_at = kwargs.get('created_at', datetime.utcnow())
+        self._id = kwargs.get('_id', None)
+
+    @staticmethod
+    def get_collection():
+        """Obtener la colección de refresh tokens"""
+        db = get_db()
+        return db.refresh_tokens
+
+    @staticmethod
+    def generate_token():
+        """Generar un refresh token aleatorio y su hash"""
+        raw_token = secrets.token_urlsafe(48)
+        return raw_token, RefreshToken.hash_token(raw_token)
+
+    @staticmethod
+    def hash_token(raw_token):
+        """Hash del token para almacenar/buscar en BD"""
+        return hashlib.sha256(raw_token.encode('utf-8')).hexdigest()
+
+    def save(self):
+        """Guardar refresh token en la base de datos"""
+        collection = self.get_collection()
+
+        token_data = {
+            'user_id': ObjectId(self.user_id),
+            'token': self.token,
+            'family_id': self.family_id,
+            'expires_at': self.expires_at,
+            'used': self.used,
+            'revoked': self.revoked,
+            'created_at': self.created_at
+        }
+
+        result = collection.insert_one(token_data)
+        self._id = result.inserted_id
+        return self._id
+
+    @staticmethod
+    def _from_document(token_data):
+        return RefreshToken(
+            user_id=str(token_data['user_id']),
+            token=token_data['token'],
+            family_id=token_data.get('family_id'),
+            expires_at=token_data['expires_at'],
+            used=token_data.get('used', False),
+            revoked=token_data.get('revoked', False),
+            created_at=token_data.get('created_at'),
+            _id=str(token_data['_id'])
+        )
+
+    @staticmethod
+    def consume(token_hash):
+        """
+        Marcar como usado un refresh token válido en una sola operación atómica
+
+        Returns:
+            RefreshToken or None: El token consumido, o None si no es válido
+        """
+        collection = RefreshToken.get_collection()
+        token_data = collection.find_one_and_update(
+            {
+                'token': token_hash,
+                'used': False,
+                'revoked': False,
+                'expires_at': {'$gt': datetime.utcnow()}
+            },
+            {'$set': {'used': True, 'used_at': datetime.utcnow()}},
+            return_document=ReturnDocument.AFTER
+        )
+        return RefreshToken._from_document(token_data) if token_data else None
+
+    @staticmethod
+    def find_by_token(token_hash):
+        """Buscar token por hash sin importar su estado"""
+        collection = RefreshToken.get_collection()
+        token_data = collection.find_one({'token': token_hash})
+        return RefreshToken._from_document(token_data) if token_data else None
+
+    @staticmethod
+    def revoke_family(family_id):
+        """Revocar todos los tokens de una familia (reutilización detectada)"""
+        collection = RefreshToken.get_collection()
+        collection.update_many({'family_id': family_id}, {'$set': {'revoked': True}})
+
+    @staticmethod
+    def revoke_user_tokens(user_id):
+        """Revocar todos los refresh tokens de un usuario"""
+        collection = RefreshToken.get_collection()
+        collection.update_many(
+            {'user_id': ObjectId(user_id), 'revoked': False},
+            {'$set': {'revoked': True}}
+        )
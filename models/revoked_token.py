@@ -0,0 +1,89 @@
+"""
+Modelo para la lista de tokens revocados (denylist)
+"""
+from datetime import datetime
+from bson import ObjectId
+from config.database import get_db
+
+class RevokedToken:
+    """
+    Entradas de la denylist de access tokens.
+
+    Hay dos tipos de entrada:
+    - 'token': revoca un access token concreto por su `jti`.
+    - 'user': revoca todos los tokens de un usuario emitidos antes de `revoked_before`.
+
+    Cada entrada vive hasta que expira el último token al que afecta (índice TTL).
+    `revoked_at` y `revoked_before` los fija el servidor ($currentDate): la sync
+    incremental y la comparación con el `iat` de los tokens usan el mismo
+    reloj, no el de cada worker.
+    """
+
+    KIND_TOKEN = 'token'
+    KIND_USER = 'user'
+
+    @staticmethod
+    def get_collection():
+        """Obtener la colección de tokens revocados"""
+        db = get_db()
+        return db.revoked_tokens
+
+    @staticmethod
+    def revoke(jti, user_id, expires_at):
+        """Revocar un access token por su jti"""
+        collection = RevokedToken.get_collection()
+
+        collection.update_one(
+            {'key': jti},
+            {'$set': {
+                'kind': RevokedToken.KIND_TOKEN,
+                'user_id': ObjectId(user_id),
+                'expires_at': expires_at
+            }, '$currentDate': {'revoked_at': True}},
+            upsert=True
+        )
+
+    @staticmethod
+    def revoke_user(user_id, expires_at):
+        """Revocar todos los tokens emitidos hasta ahora para un usuario"""
+        collection = RevokedToken.get_collection()
+
+        collection.update_one(
+            {'key': RevokedToken.user_key(user_id)},
+            {'$set': {
+                'kind': RevokedToken.KIND_USER,
+                'user_id': ObjectId(user_id),
+                'expires_at': expires_at
+            }, '$currentDate': {'revoked_at': True, 'revoked_before': True}},
+            upsert=True
+        )
+
+    @staticmethod
+    def user_key(user_id):
+        """Clave de la denylist para revocaciones por usuario"""
+        return f'user:{user_id}'
+
+    @staticmethod
+    def find_by_key(key):
+        """Buscar una entrada vigente por su clave (jti o user:<id>)"""
+        collection = RevokedToken.get_collection()
+        return collection.find_one({'key': key, 'expires_at': {'$gt': datetime.utcnow()}})
+
+    @staticmethod
+    def find_keys_since(since=None):
+        """
+        Claves revocadas desde `since` (todas las vigentes si es None)
+
+        Args:
+            since (datetime): Marca de la sync anterior menos el solapamiento
+
+        Returns:
+            list: Lista de (key, revoked_at)
+        """
+        collection = RevokedToken.get_collection()
+        query = {'expires_at': {'$gt': datetime.utcnow()}}
+        if since is not None:
+            query['revoked_at'] = {'$gte': since}
+
+        cursor = collection.find(query, {'key': 1, 'revoked_at': 1, '_id': 0})
+        return [(entry['key'], entry['revoked_at']) for entry in cursor]
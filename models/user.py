@@ -1,14 +1,84 @@
 """
 Modelo de Usuario para MongoDB
 """
+from contextlib import contextmanager
 from datetime import datetime
 from bson import ObjectId
 from config.database import get_db
+import config.indexes as indexes
+from services.identity_map import current_identity_map, record_query
+from services.singleflight import user_flight
+from services.user_cache import user_cache
+import services.validation_schemas as validation_schemas
 from pymongo.errors import DuplicateKeyError
-import re
+
+# Marca de campo no cargado (fuera de la proyección) en el snapshot
+_NOT_LOADED = object()
+
+class DuplicateUserFieldError(ValueError):
+    """Escritura rechazada por un índice único de users (email o username)"""
+    
+    MESSAGES = {
+        'email': 'El correo ya está registrado',
+        'username': 'El nombre de usuario ya está en uso'
+    }
+    
+    def __init__(self, field):
+        super().__init__(self.MESSAGES.get(field, self.MESSAGES['email']))
+        self.field = field
+
+class UserVersionConflictError(Exception):
+    """Update condicional sin efecto: otro request guardó el usuario después de leerlo"""
+    
+    def __init__(self, user_id):
+        super().__init__(f'El usuario {user_id} fue modificado por otra solicitud')
+        self.user_id = user_id
 
 class User:
-    """Modelo de Usuario"""
+    """
+    Modelo de Usuario
+    
+    Usa __slots__ (sin __dict__ por instancia) porque se construye uno en cada
+    request autenticado. Un usuario cargado con una proyección solo tiene los
+    campos pedidos; los demás se leen de la BD en una sola consulta la primera
+    vez que se accede a alguno.
+    
+    Cada escritura incrementa `version` y las actualizaciones solo se aplican
+    si el documento sigue en la versión leída (concurrencia optimista): dos
+    requests que editan al mismo usuario no se pisan en silencio.
+    """
+    
+    # Atributo del modelo -> campo del documento en MongoDB
+    FIELDS = {
+        'full_name': 'full_name',
+        'email': 'email',
+        'password': 'password',
+        'username': 'username',
+        'profile_picture': 'profilePicture',
+        'gender': 'gender',
+        'address': 'address',
+        'phone_number': 'phoneNumber',
+        'created_at': 'createdAt',
+        'updated_at': 'updatedAt',
+        'version': 'version',
+    }
+    # Campos que se omiten (o se eliminan con $unset) cuando no tienen valor
+    OPTIONAL_FIELDS = ('username', 'profile_picture', 'gender', 'address', 'phone_number')
+    
+    # Proyección del login: lo justo para verificar el hash y responder
+    CREDENTIAL_FIELDS = ('email', 'password', 'full_name', 'username', 'profile_picture', 'created_at')
+    # Campos del usuario en la respuesta del login (el perfil completo está en /api/profile)
+    LOGIN_RESPONSE_FIELDS = ('full_name', 'email', 'username', 'profile_picture', 'created_at')
+    # Proyección de la actualización de perfil: todo menos el hash
+    PROFILE_FIELDS = tuple(attribute for attribute in FIELDS if attribute != 'password')
+    # Campos del perfil en /api/profile: los de to_dict más la versión (ETag)
+    PROFILE_RESPONSE_FIELDS = ('full_name', 'email', 'created_at', 'updated_at') + OPTIONAL_FIELDS + ('version',)
+    
+    _ATTRIBUTES = tuple(FIELDS)
+    _POSITIONS = {attribute: position for position, attribute in enumerate(_ATTRIBUTES)}
+    
+    __slots__ = _ATTRIBUTES + ('_id', '_persisted')
+    
     def __init__(self, full_name=None, email=None, password=None, **kwargs):
         self.full_name = full_name
         self.email = email.lower() if email else None
@@ -22,7 +92,10 @@ class User:
         # Campos de auditoría
         self.created_at = kwargs.get('created_at', datetime.utcnow())
         self.updated_at = kwargs.get('updated_at', datetime.utcnow())
+        # Versión del documento para las actualizaciones condicionales
+        self.version = kwargs.get('version', 1)
         self._id = kwargs.get('_id', None)
+        self._persisted = None
     
     @staticmethod
     def get_collection():
@@ -30,117 +103,515 @@ class User:
         db = get_db()
         return db.users
     
+    @staticmethod
+    def projection(fields):
+        """Proyección de MongoDB para una lista de atributos del modelo"""
+        return {User.FIELDS[attribute]: 1 for attribute in fields}
+    
+    @staticmethod
+    def from_document(user_data, fields=None):
+        """
+        Construir un usuario desde un documento de MongoDB (sin cambios pendientes)
+        
+        Args:
+            user_data (dict): Documento leído de la colección
+            fields (iterable): Atributos pedidos en la proyección; si es None
+                el documento está completo y los campos ausentes valen None
+        """
+        user = User.__new__(User)
+        user._id = str(user_data['_id'])
+        if fields is None:
+            # Asignación directa: es el camino de cada request autenticado
+            get = user_data.get
+            values = (
+                get('full_name'), get('email'), get('password'), get('username'), get('profilePicture'),
+                get('gender'), get('address'), get('phoneNumber'), get('createdAt'), get('updatedAt'),
+                get('version')
+            )
+            (user.full_name, user.email, user.password, user.username, user.profile_picture,
+             user.gender, user.address, user.phone_number, user.created_at, user.updated_at,
+             user.version) = values
+        else:
+            values = [_NOT_LOADED] * len(User._ATTRIBUTES)
+            for attribute in fields:
+                value = user_data.get(User.FIELDS[attribute])
+                setattr(user, attribute, value)
+                values[User._POSITIONS[attribute]] = value
+            values = tuple(values)
+        # Snapshot compacto (tupla alineada con FIELDS) para el dirty tracking
+        user._persisted = values
+        return user
+    
+    def _current_values(self):
+        values = []
+        for attribute in User._ATTRIBUTES:
+            try:
+                values.append(object.__getattribute__(self, attribute))
+            except AttributeError:
+                values.append(_NOT_LOADED)
+        return values
+    
+    def __getattr__(self, name):
+        # Solo se llama si el slot no tiene valor: campo fuera de la proyección
+        if name not in User.FIELDS:
+            raise AttributeError(name)
+        values = self._current_values()
+        missing = [attribute for attribute, value in zip(User._ATTRIBUTES, values) if value is _NOT_LOADED]
+        user_data = None
+        if self._id:
+            record_query('find_one')
+            user_data = User.get_collection().find_one({'_id': ObjectId(self._id)}, User.projection(missing))
+        persisted = list(self._persisted) if self._persisted is not None else None
+        for attribute in missing:
+            value = user_data.get(User.FIELDS[attribute]) if user_data else None
+            setattr(self, attribute, value)
+            if persisted is not None:
+                persisted[User._POSITIONS[attribute]] = value
+        if persisted is not None:
+            self._persisted = tuple(persisted)
+        return object.__getattribute__(self, name)
+    
+    def mark_clean(self):
+        """Tomar los valores actuales como los persistidos en la BD"""
+        self._persisted = tuple(self._current_values())
+    
+    def dirty_fields(self):
+        """Atributos modificados desde la última carga o guardado"""
+        if self._persisted is None:
+            return list(User.FIELDS)
+        return [
+            attribute
+            for attribute, value, persisted in zip(User._ATTRIBUTES, self._current_values(), self._persisted)
+            if value is not _NOT_LOADED and (persisted is _NOT_LOADED or value != persisted)
+        ]
+    
+    def update_document(self):
+        """
+        Update mínimo ($set/$unset) con los campos modificados
+        
+        Returns:
+            dict or None: Documento de actualización, o None si no hay cambios
+        """
+        # updated_at se fija aquí y version solo avanza con $inc
+        dirty = [attribute for attribute in self.dirty_fields() if attribute not in ('updated_at', 'version')]
+        if not dirty:
+            return None
+        # Sin snapshot no se sabe qué hay en la BD: no eliminar campos
+        can_unset = self._persisted is not None
+        
+        self.updated_at = datetime.utcnow()
+        to_set, to_unset = {'updatedAt': self.updated_at}, {}
+        for attribute in dirty:
+            value = getattr(self, attribute)
+            if attribute in User.OPTIONAL_FIELDS and not value:
+                if can_unset:
+                    to_unset[User.FIELDS[attribute]] = ''
+            else:
+                to_set[User.FIELDS[attribute]] = value
+        
+        update = {'$set': to_set}
+        if to_unset:
+            update['$unset'] = to_unset
+        return update
+    
+    def write_filter(self):
+        """
+        Filtro del update: el _id y, si se conoce, la versión leída de la BD
+        
+        Un usuario construido a mano o cargado sin el campo version se
+        actualiza sin condición. Un documento anterior al campo tiene version
+        None, y {'version': None} también coincide con el campo ausente.
+        """
+        query = {'_id': ObjectId(self._id)}
+        if self._persisted is not None:
+            version = self._persisted[User._POSITIONS['version']]
+            if version is not _NOT_LOADED:
+                query['version'] = version
+        return query
+    
+    def mark_saved(self, query):
+        """Avanzar la versión tras un update aplicado con write_filter()"""
+        if 'version' in query:
+            self.version = (query['version'] or 0) + 1
+        else:
+            # No se sabe en qué versión quedó: se carga si se pide
+            try:
+                del self.version
+            except AttributeError:
+                pass
+        self.mark_clean()
+    
+    def refresh(self):
+        """
+        Recargar desde la BD los campos cargados y la versión (descarta los
+        cambios sin guardar), en la misma instancia
+        
+        Lee directamente de la colección: la caché o una lectura en curso
+        podrían devolver la versión que acaba de fallar.
+        
+        Returns:
+            bool: False si el usuario ya no existe
+        """
+        fields = [
+            attribute for attribute, value in zip(User._ATTRIBUTES, self._current_values())
+            if value is not _NOT_LOADED
+        ]
+        if 'version' not in fields:
+            fields.append('version')
+        record_query('find_one')
+        user_data = User.get_collection().find_one({'_id': ObjectId(self._id)}, User.projection(fields))
+        if not user_data:
+            return False
+        for attribute in fields:
+            setattr(self, attribute, user_data.get(User.FIELDS[attribute]))
+        self.mark_clean()
+        return True
+    
+    def to_document(self):
+        """Documento completo para insertar (los opcionales solo si tienen valor)"""
+        self.updated_at = datetime.utcnow()
+        user_data = {}
+        for attribute, field in User.FIELDS.items():
+            value = getattr(self, attribute)
+            if attribute in User.OPTIONAL_FIELDS and not value:
+                continue
+            user_data[field] = value
+        return user_data
+    
     def save(self):
-        """Guardar usuario en la base de datos"""
-        collection = self.get_collection()
-        # Crear índice único para email si no existe
-        collection.create_index("email", unique=True)
-        # Crear índice único para username si existe
-        if self.username:
-            collection.create_index("username", unique=True, sparse=True)
-        
-        user_data = {
-            'full_name': self.full_name,
-            'email': self.email,
-            'password': self.password,
-            'createdAt': self.created_at,
-            'updatedAt': datetime.utcnow()
-        }
-        
-        # Agregar campos opcionales solo si tienen valor
-        if self.username:
-            user_data['username'] = self.username
-        if self.profile_picture:
-            user_data['profilePicture'] = self.profile_picture
-        if self.gender:
-            user_data['gender'] = self.gender
-        if self.address:
-            user_data['address'] = self.address
-        if self.phone_number:
-            user_data['phoneNumber'] = self.phone_number
+        """
+        Guardar usuario en la base de datos
+        
+        Un usuario existente solo envía los campos modificados; si no hay
+        cambios no se escribe nada.
+        
+        Raises:
+            DuplicateUserFieldError: Email o username en uso por otro usuario
+            UserVersionConflictError: El documento cambió desde que se leyó
+        """
+        write = self.begin_write()
+        if write is None:
+            return self._id
+        operation, args = write
+        with User.write_errors():
+            result = getattr(self.get_collection(), operation)(*args)
+        return self.finish_write(operation, args, result)
+    
+    def begin_write(self):
+        """
+        Escritura pendiente de save() para cualquier driver (pymongo o Motor)
         
+        El driver ejecuta `collection.<operación>(*args)` dentro de
+        User.write_errors() y pasa el resultado a finish_write().
+        
+        Returns:
+            tuple or None: ('update_one', (filtro, update)) con los campos
+            modificados, ('insert_one', (documento,)), o None sin cambios
+        """
+        if self._id:
+            update = self.update_document()
+            if update is None:
+                return None
+            update['$inc'] = {'version': 1}
+            write = ('update_one', (self.write_filter(), update))
+        else:
+            write = ('insert_one', (self.to_document(),))
+        record_query(write[0])
+        return write
+    
+    def finish_write(self, operation, args, result):
+        """
+        Registrar una escritura de begin_write(): cachés, versión e identity map
+        
+        Raises:
+            UserVersionConflictError: El update no encontró la versión leída
+        """
+        user_flight.invalidate()
+        if operation == 'insert_one':
+            self._id = result.inserted_id
+            self.mark_clean()
+            identity_map = current_identity_map()
+            if identity_map is not None:
+                identity_map.add(self)
+            return self._id
+        
+        query = args[0]
+        # También si falló: el documento en caché puede ser el desactualizado
+        user_cache.invalidate(self._id)
+        if 'version' in query and result.matched_count == 0:
+            raise UserVersionConflictError(self._id)
+        self.mark_saved(query)
+        return self._id
+    
+    @staticmethod
+    @contextmanager
+    def write_errors():
+        """Traducir los errores de índice único de una escritura de users"""
         try:
-            if self._id:
-                # Actualizar usuario existente
-                result = collection.update_one(
-                    {'_id': ObjectId(self._id)},
-                    {'$set': user_data}
-                )
-                return self._id
-            else:
-                # Crear nuevo usuario
-                result = collection.insert_one(user_data)
-                self._id = result.inserted_id
-                return self._id
-                
-        except DuplicateKeyError:
-            raise ValueError('El correo ya está registrado')
+            yield
+        except DuplicateKeyError as e:
+            raise DuplicateUserFieldError(User.duplicate_key_field(e))
     
     @staticmethod
-    def find_by_email(email):
-        """Buscar usuario por email"""
-        collection = User.get_collection()
-        user_data = collection.find_one({'email': email.lower()})
+    def duplicate_key_field(error):
+        """Campo único (email o username) que causó un DuplicateKeyError"""
+        details = error.details or {}
+        for key in (details.get('keyPattern'), details.get('keyValue')):
+            if key:
+                return next(iter(key))
+        return 'username' if 'username_1' in str(error) else 'email'
+    
+    @staticmethod
+    def _mapped(field, value, load):
+        """
+        Usuario del identity map del request, o cargado con load() y registrado
+        
+        Una instancia cargada con proyección sirve para cualquier búsqueda:
+        los campos que le falten se cargan al accederlos.
+        """
+        user, identity_map = User.identity_lookup(field, value)
+        if user is None:
+            user = User.identity_register(identity_map, load())
+        return user
+    
+    @staticmethod
+    def identity_lookup(field, value):
+        """(usuario ya cargado en el request o None, identity map o None)"""
+        identity_map = current_identity_map()
+        if identity_map is None:
+            return None, None
+        return identity_map.get(field, value), identity_map
+    
+    @staticmethod
+    def identity_register(identity_map, user):
+        """Registrar un usuario recién cargado (devuelve la instancia del request)"""
+        if user is not None and identity_map is not None:
+            return identity_map.add(user)
+        return user
+    
+    @staticmethod
+    def read_key(query, fields=None, hint=None):
+        """Clave de singleflight de una lectura (misma consulta y proyección)"""
+        return ('find_one', repr(query), tuple(fields) if fields is not None else None, hint)
+    
+    @staticmethod
+    def _find_one(query, fields=None, hint=None):
+        projection = User.projection(fields) if fields is not None else None
+        options = {'hint': hint} if hint else {}
+        
+        def load():
+            record_query('find_one')
+            return User.get_collection().find_one(query, projection, **options)
+        
+        # Lecturas idénticas concurrentes comparten una sola consulta
+        user_data = user_flight.do(User.read_key(query, fields, hint), load)
         
         if user_data:
-            return User(
-                full_name=user_data.get('full_name'), # Changed to .get()
-                email=user_data.get('email'), # Also make email safe, though it should exist
-                password=user_data.get('password'), # Also make password safe
-                username=user_data.get('username'),
-                profile_picture=user_data.get('profilePicture'),
-                gender=user_data.get('gender'),
-                address=user_data.get('address'),
-                phone_number=user_data.get('phoneNumber'),
-                created_at=user_data.get('createdAt'),
-                updated_at=user_data.get('updatedAt'),
-                _id=str(user_data['_id'])
-            )
+            return User.from_document(user_data, fields)
         return None
     
     @staticmethod
-    def find_by_id(user_id):
-        """Buscar usuario por ID"""
-        collection = User.get_collection()
-        user_data = collection.find_one({'_id': ObjectId(user_id)})
+    def _find_cached(field, value, query):
+        # Documento completo desde la caché read-through (ver services/user_cache)
+        def load():
+            record_query('find_one')
+            return User.get_collection().find_one(query)
+        
+        user_data = user_cache.get(field, value, lambda: user_flight.do(User.read_key(query), load))
         
         if user_data:
-            return User(
-                full_name=user_data.get('full_name'), # Changed to .get()
-                email=user_data.get('email'),
-                password=user_data.get('password'),
-                username=user_data.get('username'),
-                profile_picture=user_data.get('profilePicture'),
-                gender=user_data.get('gender'),
-                address=user_data.get('address'),
-                phone_number=user_data.get('phoneNumber'),
-                created_at=user_data.get('createdAt'),
-                updated_at=user_data.get('updatedAt'),
-                _id=str(user_data['_id'])
-            )
+            return User.from_document(user_data)
         return None
     
-    def to_dict(self, include_password=False):
-        """Convertir usuario a diccionario para respuesta JSON"""
-        user_dict = {
-            '_id': str(self._id),
-            'full_name': self.full_name,
-            'email': self.email,
-            'createdAt': self.created_at,
-            'updatedAt': self.updated_at
-        }
-        
-        # Agregar campos opcionales solo si tienen valor
-        if self.username:
-            user_dict['username'] = self.username
-        if self.profile_picture:
-            user_dict['profilePicture'] = self.profile_picture
-        if self.gender:
-            user_dict['gender'] = self.gender
-        if self.address:
-            user_dict['address'] = self.address
-        if self.phone_number:
-            user_dict['phoneNumber'] = self.phone_number
+    @staticmethod
+    def find_by_email(email, fields=None):
+        """
+        Buscar usuario por email
+        
+        Args:
+            email (str): Email del usuario
+            fields (list): Atributos a cargar (todos si es None, desde la caché)
+        """
+        email = email.lower()
+        if fields is None:
+            return User._mapped('email', email, lambda: User._find_cached('email', email, {'email': email}))
+        return User._mapped('email', email, lambda: User._find_one({'email': email}, fields))
+    
+    @staticmethod
+    def find_credentials_by_email(email, covered=None):
+        """
+        Buscar las credenciales de un usuario para el login
+        
+        Proyecta solo CREDENTIAL_FIELDS en lugar del documento completo. Con el
+        índice cubierto (MONGO_COVERED_LOGIN_INDEX) trae solo _id, email y
+        password desde el índice, sin leer el documento; los demás campos se
+        cargan en una consulta por _id solo si el login tiene éxito.
+        
+        Args:
+            email (str): Email del usuario
+            covered (bool): Usar el índice cubierto (por defecto según la config)
+        """
+        if covered is None:
+            covered = indexes.COVERED_LOGIN_INDEX
+        email = email.lower()
+        if covered:
+            return User._mapped('email', email, lambda: User._find_one(
+                {'email': email}, ('email', 'password'), hint=indexes.LOGIN_CREDENTIALS_INDEX))
+        return User._mapped('email', email, lambda: User._find_one({'email': email}, User.CREDENTIAL_FIELDS))
+    
+    @staticmethod
+    def find_by_id(user_id, fields=None):
+        """
+        Buscar usuario por ID
+        
+        Args:
+            user_id (str): ID del usuario
+            fields (list): Atributos a cargar (todos si es None, desde la caché)
+        """
+        if fields is None:
+            return User._mapped('_id', str(user_id), lambda: User._find_cached(
+                '_id', str(user_id), {'_id': ObjectId(user_id)}))
+        return User._mapped('_id', str(user_id), lambda: User._find_one({'_id': ObjectId(user_id)}, fields))
+    
+    @staticmethod
+    def conflicts_query(email=None, username=None, exclude_id=None):
+        """Consulta $or por los campos únicos enviados (None si no hay ninguno)"""
+        conditions = []
+        if email:
+            conditions.append({'email': email.lower()})
+        if username:
+            conditions.append({'username': username})
+        if not conditions:
+            return None
+        query = {'$or': conditions}
+        if exclude_id:
+            query['_id'] = {'$ne': ObjectId(exclude_id)}
+        return query
+    
+    @staticmethod
+    def conflicting_fields(documents, email=None, username=None):
+        """Campos de conflicts_query que coinciden en los documentos encontrados"""
+        conflicts = []
+        for user_data in documents:
+            if email and user_data.get('email') == email.lower() and 'email' not in conflicts:
+                conflicts.append('email')
+            if username and user_data.get('username') == username and 'username' not in conflicts:
+                conflicts.append('username')
+        return conflicts
+    
+    @staticmethod
+    def find_conflicts(email=None, username=None, exclude_id=None):
+        """
+        Buscar qué campos únicos ya usa otro usuario, en una sola consulta
+        
+        Args:
+            email (str): Email a verificar (opcional)
+            username (str): Username a verificar (opcional)
+            exclude_id (str): Usuario que se está editando (no cuenta como conflicto)
+            
+        Returns:
+            list: 'email' y/o 'username'
+        """
+        query = User.conflicts_query(email, username, exclude_id)
+        if query is None:
+            return []
+        # Como mucho un documento por campo único
+        record_query('find')
+        documents = User.get_collection().find(query, {'email': 1, 'username': 1}).limit(2)
+        return User.conflicting_fields(documents, email, username)
+    
+    @staticmethod
+    def find_with_conflicts(user_id, email=None, username=None, fields=PROFILE_FIELDS):
+        """
+        Cargar un usuario y verificar sus nuevos email/username en una consulta
+        
+        Un solo find con $or por _id, email y username (como mucho tres
+        documentos, todos con la misma proyección) en lugar de find_by_id
+        seguido de find_by_email y find_by_username.
+        
+        Args:
+            user_id (str): Usuario que se está editando
+            email (str): Nuevo email (opcional)
+            username (str): Nuevo username (opcional)
+            fields (tuple): Atributos a cargar del usuario
+            
+        Returns:
+            tuple: (User o None, lista de campos en uso por otros usuarios)
+        """
+        identity_map = current_identity_map()
+        user = identity_map.get('_id', str(user_id)) if identity_map is not None else None
+        if user is not None:
+            # Ya cargado en este request: solo falta la unicidad
+            return user, User.find_conflicts(email, username, exclude_id=user_id)
+        
+        object_id = ObjectId(user_id)
+        conditions = [{'_id': object_id}]
+        conflicts_query = User.conflicts_query(email, username)
+        if conflicts_query is not None:
+            conditions.extend(conflicts_query['$or'])
+        projection = User.projection(set(fields) | {'email', 'username'})
+        
+        others = []
+        record_query('find')
+        for user_data in User.get_collection().find({'$or': conditions}, projection).limit(3):
+            if user_data['_id'] == object_id:
+                user = User.from_document(user_data, fields)
+            else:
+                others.append(user_data)
+        if user is not None and identity_map is not None:
+            user = identity_map.add(user)
+        return user, User.conflicting_fields(others, email, username)
+    
+    @staticmethod
+    def update_password_hash(user_id, new_hash, old_hash):
+        """
+        Reemplazar el hash de contraseña solo si no cambió mientras tanto
+        
+        Se usa para el rehash transparente después del login: si el usuario
+        cambió su contraseña en el intervalo, la actualización no aplica. Como
+        toda escritura, avanza la versión del documento.
+        
+        Returns:
+            bool: True si se actualizó el hash
+        """
+        query, update = User.begin_password_hash_update(user_id, new_hash, old_hash)
+        result = User.get_collection().update_one(query, update)
+        return User.finish_password_hash_update(user_id, result)
+    
+    @staticmethod
+    def begin_password_hash_update(user_id, new_hash, old_hash):
+        """(filtro, update) de update_password_hash para cualquier driver"""
+        record_query('update_one')
+        return (
+            {'_id': ObjectId(user_id), 'password': old_hash},
+            {'$set': {'password': new_hash, 'updatedAt': datetime.utcnow()}, '$inc': {'version': 1}}
+        )
+    
+    @staticmethod
+    def finish_password_hash_update(user_id, result):
+        """Invalidar cachés tras el update; True si se reemplazó el hash"""
+        user_cache.invalidate(str(user_id))
+        user_flight.invalidate()
+        return result.modified_count == 1
+    
+    def to_dict(self, include_password=False, fields=None):
+        """
+        Convertir usuario a diccionario para respuesta JSON
+        
+        Args:
+            include_password (bool): Incluir el hash de la contraseña
+            fields (iterable): Atributos a incluir (todos si es None); con una
+                proyección evita cargar los campos que no se van a responder
+        """
+        if fields is None:
+            fields = ('full_name', 'email', 'created_at', 'updated_at') + User.OPTIONAL_FIELDS
+        
+        user_dict = {'_id': str(self._id)}
+        for attribute in fields:
+            value = getattr(self, attribute)
+            # Agregar campos opcionales solo si tienen valor
+            if value or attribute not in User.OPTIONAL_FIELDS:
+                user_dict[User.FIELDS[attribute]] = value
         
         if include_password:
             user_dict['password'] = self.password
@@ -150,8 +621,7 @@ class User:
     @staticmethod
     def validate_email(email):
         """Validar formato de email"""
-        pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-        return re.match(pattern, email) is not None
+        return validation_schemas.EMAIL_PATTERN.match(email) is not None
     
     @staticmethod
     def validate_username(username):
@@ -160,8 +630,7 @@ class User:
             return True  # Username es opcional
         
         # Username debe tener entre 3 y 20 caracteres, solo letras, números y guiones bajos
-        pattern = r'^[a-zA-Z0-9_]{3,20}$'
-        return re.match(pattern, username) is not None
+        return validation_schemas.USERNAME_PATTERN.match(username) is not None
     
     @staticmethod
     def validate_phone_number(phone_number):
@@ -170,8 +639,7 @@ class User:
             return True  # Teléfono es opcional
         
         # Permitir números con o sin espacios, guiones y paréntesis, mínimo 7 dígitos
-        pattern = r'^[\+]?[\d\s\-\(\)]{7,20}$'
-        return re.match(pattern, phone_number) is not None
+        return validation_schemas.PHONE_PATTERN.match(phone_number) is not None
     
     @staticmethod
     def validate_gender(gender):
@@ -179,8 +647,7 @@ class User:
         if not gender:
             return True  # Género es opcional
         
-        valid_genders = ['male', 'female', 'other', 'prefer_not_to_say']
-        return gender.lower() in valid_genders
+        return gender.lower() in validation_schemas.GENDERS
     
     @staticmethod
     def validate_address(address):
@@ -192,26 +659,12 @@ class User:
         return 5 <= len(address.strip()) <= 200
     
     @staticmethod
-    def find_by_username(username):
+    def find_by_username(username, fields=None):
         """Buscar usuario por username"""
         if not username:
             return None
-            
-        collection = User.get_collection()
-        user_data = collection.find_one({'username': username})
         
-        if user_data:
-            return User(
-                full_name=user_data.get('full_name'), # Changed to .get()
-                email=user_data.get('email'),
-                password=user_data.get('password'),
-                username=user_data.get('username'),
-                profile_picture=user_data.get('profilePicture'),
-                gender=user_data.get('gender'),
-                address=user_data.get('address'),
-                phone_number=user_data.get('phoneNumber'),
-                created_at=user_data.get('createdAt'),
-                updated_at=user_data.get('updatedAt'),
-                _id=str(user_data['_id'])
-            )
-        return None
+        if fields is None:
+            return User._mapped('username', username, lambda: User._find_cached(
+                'username', username, {'username': username}))
+        return User._mapped('username', username, lambda: User._find_one({'username': username}, fields))
@@ -0,0 +1,87 @@
+"""
+Rutas para gestión de sesiones (refresh, logout y revocación)
+"""
+from flask import Blueprint, request, jsonify, g
+from controllers.auth_controller import AuthController
+from routes.profile_routes import token_required
+from services.rate_limiting import rate_limit
+
+# Crear blueprint para rutas de sesión
+auth_bp = Blueprint('auth', __name__)
+
+@auth_bp.route('/refresh', methods=['POST'])
+@rate_limit('refresh_token')
+def refresh():
+    """
+    Renovar el access token usando un refresh token (el refresh token se rota)
+    
+    Expected JSON:
+    {
+        "refreshToken": "..."
+    }
+    """
+    try:
+        # Obtener datos JSON del request
+        request_data = request.get_json()
+        
+        if not request_data:
+            return jsonify({'message': 'No se enviaron datos'}), 400
+        
+        # Llamar al controlador
+        response_data, status_code = AuthController.refresh_token(request_data)
+        return jsonify(response_data), status_code
+        
+    except Exception as e:
+        return jsonify({
+            'message': 'Error renovando token',
+            'error': str(e)
+        }), 500
+
+@auth_bp.route('/logout', methods=['POST'])
+@rate_limit('logout')
+@token_required
+def logout(current_user_id):
+    """
+    Cerrar la sesión actual (revoca el access token y opcionalmente el refresh token)
+    
+    Headers:
+        Authorization: Bearer <jwt_token>
+    
+    Optional JSON:
+    {
+        "refreshToken": "..."
+    }
+    """
+    try:
+        request_data = request.get_json(silent=True) or {}
+        
+        # Llamar al controlador
+        response_data, status_code = AuthController.logout(g.current_token, g.token_claims, request_data)
+        return jsonify(response_data), status_code
+        
+    except Exception as e:
+        return jsonify({
+            'message': 'Error cerrando sesión',
+            'error': str(e)
+        }), 500
+
+@auth_bp.route('/revoke-all', methods=['POST'])
+@rate_limit('logout')
+@token_required
+def revoke_all(current_user_id):
+    """
+    Revocar todas las sesiones del usuario autenticado
+    
+    Headers:
+        Authorization: Bearer <jwt_token>
+    """
+    try:
+        # Llamar al controlador
+        response_data, status_code = AuthController.revoke_all_sessions(current_user_id)
+        return jsonify(response_data), status_code
+        
+    except Exception as e:
+        return jsonify({
+            'message': 'Error cerrando sesiones',
+            'error': str(e)
+        }), 500
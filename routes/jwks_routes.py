@@ -0,0 +1,34 @@
+"""
+Rutas para publicar las llaves públicas de firma (JWKS)
+"""
+import hashlib
+import json
+import os
+from flask import Blueprint, request, jsonify
+from services.key_ring import key_ring
+
+# Crear blueprint para el JWKS (se registra en la raíz)
+jwks_bp = Blueprint('jwks', __name__)
+
+@jwks_bp.route('/.well-known/jwks.json', methods=['GET'])
+def jwks():
+    """
+    Publicar las llaves públicas para que otros servicios verifiquen los tokens localmente
+    
+    La respuesta es cacheable (Cache-Control + ETag); las llaves nuevas se
+    publican antes de usarse al menos durante JWKS_MAX_AGE segundos.
+    """
+    try:
+        document = key_ring.jwks()
+        response = jsonify(document)
+        
+        response.cache_control.public = True
+        response.cache_control.max_age = int(os.getenv('JWKS_MAX_AGE', 3600))
+        response.set_etag(hashlib.sha256(json.dumps(document, sort_keys=True).encode('utf-8')).hexdigest())
+        return response.make_conditional(request)
+        
+    except Exception as e:
+        return jsonify({
+            'message': 'Error obteniendo llaves públicas',
+            'error': str(e)
+        }), 500
@@ -3,11 +3,13 @@ Rutas para restablecimiento de contraseñas
 """
 from flask import Blueprint, request, jsonify
 from controllers.password_reset_controller import PasswordResetController
+from services.rate_limiting import rate_limit
 
 # Crear blueprint para rutas de password reset
 password_reset_bp = Blueprint('password_reset', __name__)
 
 @password_reset_bp.route('/forgot-password', methods=['POST'])
+@rate_limit('forgot_password')
 def forgot_password():
     """
     Solicitar restablecimiento de contraseña
@@ -35,6 +37,7 @@ def forgot_password():
         }), 500
 
 @password_reset_bp.route('/verify-token', methods=['POST'])
+@rate_limit('verify_reset_token')
 def verify_token():
     """
     Verificar validez de token de restablecimiento
@@ -62,6 +65,7 @@ def verify_token():
         }), 500
 
 @password_reset_bp.route('/reset-password', methods=['POST'])
+@rate_limit('reset_password')
 def reset_password():
     """
     Restablecer contraseña con token válido
@@ -1,50 +1,42 @@
 """
 Rutas para gestión de perfil de usuario
 """
-from flask import Blueprint, request, jsonify
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+from flask import Blueprint, request, jsonify, g
 import jwt
 from functools import wraps
 from controllers.profile_controller import ProfileController
-import os
+from services.token_service import token_service, extract_bearer_token
+from services.token_denylist import RevokedTokenError
+from services.rate_limiting import rate_limit
 
 # Crear blueprint para rutas de perfil
 profile_bp = Blueprint('profile', __name__)
 
-# Configurar rate limiter
-limiter = Limiter(
-    key_func=get_remote_address,
-    storage_uri="memory://",
-    default_limits=["200 per day", "50 per hour"]
-)
-
 def token_required(f):
     """
     Decorador para verificar token JWT en las rutas protegidas
     """
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        
         # JWT se puede enviar en el header Authorization
-        auth_header = request.headers.get('Authorization')
-        if auth_header:
-            try:
-                token = auth_header.split(" ")[1]  # "Bearer <token>"
-            except IndexError:
-                return jsonify({'message': 'Formato de token inválido'}), 401
+        try:
+            token = extract_bearer_token(request.headers.get('Authorization'))  # "Bearer <token>"
+        except IndexError:
+            return jsonify({'message': 'Formato de token inválido'}), 401
         
         if not token:
             return jsonify({'message': 'Token requerido'}), 401
         
         try:
-            # Decodificar token
-            secret_key = os.getenv('JWT_SECRET', 'mascotas_secret_key')
-            data = jwt.decode(token, secret_key, algorithms=['HS256'])
+            # Verificar token (con caché de claims verificados)
+            data = token_service.verify_token(token)
             current_user_id = data['userId']
+            g.current_token = token
+            g.token_claims = data
         except jwt.ExpiredSignatureError:
             return jsonify({'message': 'Token expirado'}), 401
+        except RevokedTokenError:
+            return jsonify({'message': 'Token revocado'}), 401
         except jwt.InvalidTokenError:
             return jsonify({'message': 'Token inválido'}), 401
         
@@ -53,6 +45,7 @@ def token_required(f):
     return decorated
 
 @profile_bp.route('/', methods=['GET'])
+@rate_limit('profile_read')
 @token_required
 def get_profile(current_user_id):
     """
@@ -64,7 +57,7 @@ def get_profile(current_user_id):
     try:
         # Llamar al controlador
         response_data, status_code = ProfileController.get_profile(current_user_id)
-        return jsonify(response_data), status_code
+        return jsonify(response_data), status_code, ProfileController.etag_headers(response_data)
         
     except Exception as e:
         return jsonify({
@@ -73,6 +66,7 @@ def get_profile(current_user_id):
         }), 500
 
 @profile_bp.route('/', methods=['PUT'])
+@rate_limit('profile_write')
 @token_required
 def update_profile(current_user_id):
     """
@@ -80,6 +74,7 @@ def update_profile(current_user_id):
     
     Headers:
         Authorization: Bearer <jwt_token>
+        If-Match: ETag del GET (opcional; 412 si el perfil cambió desde entonces)
     
     Expected JSON:
     {
@@ -102,8 +97,9 @@ def update_profile(current_user_id):
             return jsonify({'message': 'No se enviaron datos'}), 400
         
         # Llamar al controlador
-        response_data, status_code = ProfileController.update_profile(current_user_id, request_data)
-        return jsonify(response_data), status_code
+        response_data, status_code = ProfileController.update_profile(
+            current_user_id, request_data, if_match=request.headers.get('If-Match'))
+        return jsonify(response_data), status_code, ProfileController.etag_headers(response_data)
         
     except Exception as e:
         return jsonify({
@@ -112,6 +108,7 @@ def update_profile(current_user_id):
         }), 500
 
 @profile_bp.route('/change-password', methods=['POST'])
+@rate_limit('change_password')
 @token_required
 def change_password(current_user_id):
     """
@@ -144,6 +141,7 @@ def change_password(current_user_id):
         }), 500
 
 @profile_bp.route('/upload-picture', methods=['POST'])
+@rate_limit('upload_picture')
 @token_required
 def upload_profile_picture(current_user_id):
     """
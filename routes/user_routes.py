@@ -2,8 +2,9 @@
 Rutas para manejo de usuarios
 """
 from flask import Blueprint, request, jsonify
-import asyncio
 from controllers.user_controller import UserController
+from services.async_runner import async_runner
+from services.rate_limiting import rate_limit
 
 # Crear blueprint para rutas de usuario
 user_bp = Blueprint('users', __name__)
@@ -14,6 +15,7 @@ def test_users_route():
     return jsonify({'message': 'User routes working'})
 
 @user_bp.route('/register', methods=['POST'])
+@rate_limit('register')
 def register():
     """Registrar un nuevo usuario"""
     try:
@@ -23,17 +25,9 @@ def register():
         if not request_data:
             return jsonify({'message': 'No se enviaron datos'}), 400
         
-        # Llamar al controlador (de forma asíncrona)
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            response_data, status_code = loop.run_until_complete(
-                UserController.register_user(request_data)
-            )
-            return jsonify(response_data), status_code
-        finally:
-            loop.close()
+        # Llamar al controlador async en el event loop del worker
+        response_data, status_code = async_runner.run(UserController.register_user(request_data))
+        return jsonify(response_data), status_code
             
     except Exception as e:
         return jsonify({
@@ -42,6 +36,7 @@ def register():
         }), 500
 
 @user_bp.route('/login', methods=['POST'])
+@rate_limit('login')
 def login():
     """Iniciar sesión de usuario"""
     try:
@@ -52,8 +47,11 @@ def login():
             return jsonify({'message': 'No se enviaron datos'}), 400
         
         # Llamar al controlador
-        response_data, status_code = UserController.login_user(request_data)
-        return jsonify(response_data), status_code
+        response_data, status_code = UserController.login_user(request_data, request.remote_addr)
+        response = jsonify(response_data)
+        if status_code == 429:
+            response.headers['Retry-After'] = str(response_data['retryAfter'])
+        return response, status_code
         
     except Exception as e:
         return jsonify({
@@ -0,0 +1,109 @@
+"""
+Event loop persistente por worker para ejecutar controladores async desde Flask
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncRunner:
+    """
+    Un event loop de larga vida en un hilo daemon, compartido por todas las
+    rutas que llaman a corrutinas (registro en blueprints y en Swagger).
+
+    Evita crear y cerrar un loop (y su pool de hilos de asyncio.to_thread) en
+    cada request, y permite reutilizar los clientes de Motor, que quedan
+    ligados al loop. run_coroutine_threadsafe copia el contexto del hilo que
+    llama, así que current_app y request siguen disponibles en la corrutina.
+    El loop se crea en el primer uso de cada proceso (no se hereda tras fork).
+    """
+
+    def __init__(self, max_workers=None):
+        self.max_workers = max_workers
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {'runs': 0, 'errors': 0, 'loop_starts': 0}
+        self._stats_lock = threading.Lock()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    def _count(self, stat):
+        with self._stats_lock:
+            self._stats[stat] += 1
+
+    def _after_fork(self):
+        # El hilo del loop no existe en el hijo
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        if self._loop is None:
+            with self._lock:
+                if self._loop is None:
+                    loop = asyncio.new_event_loop()
+                    loop.set_default_executor(ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix='async-runner'))
+                    started = threading.Event()
+
+                    def run_loop():
+                        asyncio.set_event_loop(loop)
+                        loop.call_soon(started.set)
+                        loop.run_forever()
+
+                    self._thread = threading.Thread(target=run_loop, name='async-runner', daemon=True)
+                    self._thread.start()
+                    started.wait()
+                    self._loop = loop
+                    self._count('loop_starts')
+        return self._loop
+
+    def run(self, coro, timeout=None):
+        """
+        Ejecutar una corrutina en el loop del worker y esperar su resultado
+
+        Args:
+            coro: Corrutina a ejecutar
+            timeout (float): Segundos máximos de espera (None = sin límite)
+        """
+        loop = self._ensure_loop()
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError('AsyncRunner.run() no puede llamarse desde su propio loop')
+
+        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        try:
+            result = future.result(timeout)
+        except Exception:
+            future.cancel()
+            self._count('errors')
+            raise
+        self._count('runs')
+        return result
+
+    def stop(self, timeout=None):
+        """Detener el loop (el siguiente run() crea uno nuevo)"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            loop.close()
+
+    def get_metrics(self):
+        with self._stats_lock:
+            return dict(self._stats)
+
+
+def async_runner_from_env():
+    """Crear el runner con ASYNC_RUNNER_THREADS hilos para asyncio.to_thread"""
+    max_workers = os.getenv('ASYNC_RUNNER_THREADS')
+    return AsyncRunner(max_workers=int(max_workers) if max_workers else None)
+
+
+# Instancia global
+async_runner = async_runner_from_env()
@@ -0,0 +1,263 @@
+"""
+Watcher de cambios en MongoDB para invalidar cachés en todos los nodos
+
+Escucha un change stream sobre `users` y `password_reset_tokens` y publica
+cada cambio a los suscriptores del proceso (p. ej. la caché de usuarios). El
+resume token se guarda periódicamente para retomar el stream tras un error de
+red. Por defecto se guarda en memoria: un worker que reinicia tiene la caché
+vacía y no necesita los eventos anteriores. Solo con CHANGE_WATCHER_NAME (un
+nombre estable y único por worker) se persiste en MongoDB para retomar tras
+reiniciar. Si el servidor no soporta change streams (un mongod standalone de desarrollo)
+cae a polling por los campos de fecha que escriben los modelos.
+
+Cada worker tiene su propia caché en memoria, así que cada uno necesita su
+watcher: se arranca en el primer request del proceso (no en el maestro, cuyo
+hilo y cliente de MongoDB no sobreviven al fork del servidor).
+"""
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from config.database import get_db
+from models.change_stream_token import ChangeStreamToken
+
+WATCHED_COLLECTIONS = ('users', 'password_reset_tokens')
+
+# Campos de fecha por colección para el modo polling
+POLL_FIELDS = {
+    'users': ('updatedAt',),
+    'password_reset_tokens': ('created_at', 'used_at'),
+}
+
+# Códigos de error de MongoDB
+CHANGE_STREAMS_UNSUPPORTED = 40573  # Solo replica sets / clusters
+RESUME_TOKEN_LOST = (260, 280, 286)  # InvalidResumeToken, ChangeStreamFatalError, ChangeStreamHistoryLost
+
+# Operación publicada cuando no se puede garantizar que no se perdieron eventos
+INVALIDATE_ALL = 'invalidate_all'
+
+
+class ChangeWatcher:
+    """
+    Publica eventos {'collection', 'operation', 'document_id'} a suscriptores.
+
+    Los callbacks corren en el hilo del watcher y deben ser rápidos; un error
+    en uno no afecta a los demás. Tras perder el resume token se publica
+    INVALIDATE_ALL para que cada suscriptor descarte todo su estado.
+    """
+
+    def __init__(self, db=None, name=None, collections=WATCHED_COLLECTIONS, token_store=None,
+                 max_await_ms=1000, checkpoint_interval=5.0, poll_interval=5.0, poll_overlap=2.0,
+                 retry_interval=5.0):
+        self.db = db  # None: la base de datos del proceso, resuelta en el hilo
+        stable_name = name or os.getenv('CHANGE_WATCHER_NAME')
+        self.name = stable_name or worker_watcher_name()
+        self.collections = tuple(collections)
+        # Con hostname-pid nadie volvería a leer el token: no escribirlo en MongoDB
+        self.token_store = token_store or (ChangeStreamToken if stable_name else ProcessTokenStore())
+        self.max_await_ms = max_await_ms
+        self.checkpoint_interval = checkpoint_interval
+        self.poll_interval = poll_interval
+        self.poll_overlap = poll_overlap
+        self.retry_interval = retry_interval
+        self.mode = None  # 'change_stream' | 'polling'
+
+        self._subscribers = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._poll_since = {}
+        self._stats = {'events': 0, 'checkpoints': 0, 'resets': 0, 'errors': 0, 'subscriber_errors': 0}
+
+    def subscribe(self, collection, callback):
+        """Registrar callback(event) para una colección ('*' para todas)"""
+        self._subscribers.setdefault(collection, []).append(callback)
+
+    def publish(self, event):
+        self._stats['events'] += 1
+        for callback in self._subscribers.get(event['collection'], []) + self._subscribers.get('*', []):
+            try:
+                callback(event)
+            except Exception as e:
+                self._stats['subscriber_errors'] += 1
+                print(f'⚠️ Error en suscriptor de cambios: {e}')
+
+    def _publish_reset(self):
+        self._stats['resets'] += 1
+        for collection in self.collections:
+            self.publish({'collection': collection, 'operation': INVALIDATE_ALL, 'document_id': None})
+
+    def start(self):
+        """Arrancar el watcher en un hilo daemon"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self.run, name=f'change-watcher-{self.name}', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                if self.mode == 'polling':
+                    self.poll_once()
+                    self._stop.wait(self.poll_interval)
+                else:
+                    self.watch()
+            except OperationFailure as e:
+                if e.code == CHANGE_STREAMS_UNSUPPORTED:
+                    print('⚠️ Change streams no disponibles (¿standalone?), usando polling')
+                    self.mode = 'polling'
+                    continue
+                self._handle_error(e)
+            except PyMongoError as e:
+                self._handle_error(e)
+
+    def _database(self):
+        # El cliente del proceso actual (config.database lo recrea tras un fork)
+        return self.db if self.db is not None else get_db()
+
+    def _handle_error(self, error):
+        self._stats['errors'] += 1
+        print(f'❌ Error en el watcher de cambios: {error}')
+        self._stop.wait(self.retry_interval)
+
+    # Change streams
+
+    def _pipeline(self):
+        return [{'$match': {'ns.coll': {'$in': list(self.collections)}}}]
+
+    def watch(self):
+        """Consumir el change stream hasta stop() o un error"""
+        token = self.token_store.load(self.name)
+        db = self._database()
+        try:
+            stream = db.watch(self._pipeline(), resume_after=token, max_await_time_ms=self.max_await_ms)
+        except OperationFailure as e:
+            if token is None or e.code not in RESUME_TOKEN_LOST:
+                raise
+            # El token ya salió del oplog: empezar de cero y avisar a los suscriptores
+            print('⚠️ Resume token perdido, reiniciando el change stream')
+            self.token_store.delete(self.name)
+            self._publish_reset()
+            stream = db.watch(self._pipeline(), max_await_time_ms=self.max_await_ms)
+
+        self.mode = 'change_stream'
+        saved_token = token
+        last_checkpoint = time.monotonic()
+        with stream:
+            while not self._stop.is_set() and stream.alive:
+                change = stream.try_next()
+                if change is not None:
+                    self.publish({
+                        'collection': change['ns']['coll'],
+                        'operation': change['operationType'],
+                        'document_id': change.get('documentKey', {}).get('_id'),
+                    })
+                # Guardar el token como mucho cada checkpoint_interval (no por evento)
+                now = time.monotonic()
+                if stream.resume_token != saved_token and (
+                        change is None or now - last_checkpoint >= self.checkpoint_interval):
+                    self.token_store.save(self.name, stream.resume_token)
+                    saved_token = stream.resume_token
+                    last_checkpoint = now
+                    self._stats['checkpoints'] += 1
+
+    # Polling
+
+    def poll_once(self, now=None):
+        """
+        Publicar los documentos modificados desde el último poll
+
+        Repite una ventana de `poll_overlap` segundos para tolerar desfases de
+        reloj entre nodos; invalidar dos veces no tiene efecto. No detecta
+        borrados: para eso se necesitan change streams.
+        """
+        now = now or datetime.utcnow()
+        db = self._database()
+        for collection in self.collections:
+            fields = POLL_FIELDS.get(collection)
+            if not fields:
+                continue
+            since = self._poll_since.get(collection)
+            self._poll_since[collection] = now
+            if since is None:
+                continue  # Primer poll: solo fijar el punto de partida
+            since -= timedelta(seconds=self.poll_overlap)
+            query = {'$or': [{field: {'$gt': since}} for field in fields]}
+            for document in db[collection].find(query, {'_id': 1}):
+                self.publish({'collection': collection, 'operation': 'update', 'document_id': document['_id']})
+
+    def get_metrics(self):
+        return dict(self._stats, mode=self.mode)
+
+
+class ProcessTokenStore:
+    """Resume tokens en memoria: sirven para reconectar dentro del mismo proceso"""
+
+    def __init__(self):
+        self._tokens = {}
+
+    def load(self, name):
+        return self._tokens.get(name)
+
+    def save(self, name, token):
+        self._tokens[name] = token
+
+    def delete(self, name):
+        self._tokens.pop(name, None)
+
+
+def worker_watcher_name():
+    """Nombre del watcher de un worker sin CHANGE_WATCHER_NAME: hostname y pid"""
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+def init_change_watcher(app, user_cache):
+    """
+    Invalidar la caché de usuarios con cada cambio en `users`, con un watcher
+    por proceso arrancado en su primer request (CHANGE_WATCHER_ENABLED=true)
+
+    Returns:
+        callable or None: Devuelve (arrancándolo si hace falta) el watcher
+        del proceso actual; None si está deshabilitado
+    """
+    if os.getenv('CHANGE_WATCHER_ENABLED', 'false').lower() != 'true':
+        return None
+
+    poll_interval = float(os.getenv('CHANGE_WATCHER_POLL_INTERVAL', '5'))
+    watchers = {}  # pid -> watcher (solo el del proceso actual)
+    lock = threading.Lock()
+
+    def invalidate_user(event):
+        if event['operation'] == INVALIDATE_ALL:
+            user_cache.clear()
+        else:
+            user_cache.invalidate(str(event['document_id']))
+
+    def current_watcher():
+        pid = os.getpid()
+        watcher = watchers.get(pid)
+        if watcher is None:
+            with lock:
+                watcher = watchers.get(pid)
+                if watcher is None:
+                    watcher = ChangeWatcher(poll_interval=poll_interval)
+                    watcher.subscribe('users', invalidate_user)
+                    # El watcher heredado del padre no tiene hilo en este proceso
+                    watchers.clear()
+                    watchers[pid] = watcher.start()
+        return watcher
+
+    @app.before_request
+    def start_change_watcher():
+        current_watcher()
+
+    return current_watcher
@@ -0,0 +1,206 @@
+"""
+Verificación de ID tokens de Google con caché de certificados compartida por proceso
+"""
+import os
+import re
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from google.auth import jwt as google_jwt
+
+GOOGLE_CERTS_URL = 'https://www.googleapis.com/oauth2/v1/certs'
+GOOGLE_ISSUERS = ('accounts.google.com', 'https://accounts.google.com')
+
+_MAX_AGE_PATTERN = re.compile(r'max-age=(\d+)')
+
+
+def build_http_session(pool_size=10):
+    """Sesión HTTP reutilizable (keep-alive y pool de conexiones)"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+# Sesión compartida por todos los clientes HTTP del proceso
+http_session = build_http_session()
+
+
+class HttpCertSource:
+    """Descarga certificados PEM (kid -> cert) respetando Cache-Control"""
+
+    def __init__(self, url=GOOGLE_CERTS_URL, session=None, timeout=5, default_max_age=3600):
+        self.url = url
+        self.session = session or http_session
+        self.timeout = timeout
+        self.default_max_age = default_max_age
+
+    def fetch(self):
+        """
+        Returns:
+            tuple: (certs, max_age_seconds)
+        """
+        response = self.session.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+
+        max_age = self.default_max_age
+        match = _MAX_AGE_PATTERN.search(response.headers.get('Cache-Control', ''))
+        if match:
+            max_age = int(match.group(1))
+            # Si viene de un caché intermedio, descontar lo que ya lleva guardado
+            age = response.headers.get('Age', '')
+            if age.isdigit():
+                max_age = max(0, max_age - int(age))
+        return response.json(), max_age
+
+
+class StaticCertSource:
+    """Fuente fija de certificados (emisor local para tests y benchmarks)"""
+
+    def __init__(self, certs, max_age=3600):
+        self.certs = dict(certs)
+        self.max_age = max_age
+        self.fetch_count = 0
+
+    def fetch(self):
+        self.fetch_count += 1
+        return dict(self.certs), self.max_age
+
+
+class CachedCertStore:
+    """
+    Caché de certificados compartida por el proceso.
+
+    Los certificados se guardan durante el max-age indicado por la fuente y se
+    renuevan en segundo plano `refresh_margin` segundos antes de expirar, de
+    modo que las verificaciones no esperan a la red. Si la renovación falla se
+    siguen usando los certificados anteriores y se reintenta más tarde.
+    """
+
+    def __init__(self, source=None, refresh_margin=None, retry_interval=30, min_refetch_interval=60):
+        self.source = source or HttpCertSource()
+        self.refresh_margin = refresh_margin if refresh_margin is not None else float(
+            os.getenv('GOOGLE_CERTS_REFRESH_MARGIN', 300)
+        )
+        self.retry_interval = retry_interval
+        self.min_refetch_interval = min_refetch_interval
+        self._lock = threading.Lock()
+        self._certs = None
+        self._expires_at = 0.0
+        self._fetched_at = 0.0
+        self._timer = None
+        self._stats = {'fetches': 0, 'fetch_errors': 0, 'hits': 0, 'background_refreshes': 0}
+
+    def _refresh(self):
+        certs, max_age = self.source.fetch()
+        now = time.monotonic()
+        with self._lock:
+            self._certs = certs
+            self._fetched_at = now
+            self._expires_at = now + max_age
+            self._stats['fetches'] += 1
+        self._schedule(max(max_age - self.refresh_margin, 1))
+        return certs
+
+    def _schedule(self, delay):
+        timer = threading.Timer(delay, self._background_refresh)
+        timer.daemon = True
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = timer
+        timer.start()
+
+    def _background_refresh(self):
+        try:
+            self._refresh()
+            self._stats['background_refreshes'] += 1
+        except Exception as e:
+            self._stats['fetch_errors'] += 1
+            print(f'⚠️ Error renovando certificados de Google: {e}')
+            self._schedule(self.retry_interval)
+
+    def get_certs(self, kid=None):
+        """
+        Obtener certificados vigentes
+
+        Args:
+            kid (str): Si se indica y no está en caché, se fuerza una descarga
+                (Google rotó sus llaves) como máximo una vez por `min_refetch_interval`
+        """
+        now = time.monotonic()
+        with self._lock:
+            certs = self._certs
+            fresh = certs is not None and now < self._expires_at
+            can_refetch = now - self._fetched_at >= self.min_refetch_interval
+
+        if fresh and (kid is None or kid in certs or not can_refetch):
+            self._stats['hits'] += 1
+            return certs
+
+        try:
+            return self._refresh()
+        except Exception as e:
+            self._stats['fetch_errors'] += 1
+            if certs is None:
+                raise
+            print(f'⚠️ Usando certificados de Google en caché tras error: {e}')
+            return certs
+
+    def close(self):
+        """Detener la renovación en segundo plano"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def get_metrics(self):
+        metrics = dict(self._stats)
+        metrics['cached_certs'] = len(self._certs or {})
+        metrics['expires_in'] = max(0.0, self._expires_at - time.monotonic())
+        return metrics
+
+
+class GoogleTokenVerifier:
+    """Verificador reutilizable de ID tokens de Google"""
+
+    def __init__(self, cert_store=None, issuers=GOOGLE_ISSUERS, clock_skew_in_seconds=10):
+        self._cert_store = cert_store
+        self.issuers = issuers
+        self.clock_skew_in_seconds = clock_skew_in_seconds
+
+    @property
+    def cert_store(self):
+        # Se crea al primer uso para no abrir hilos ni conexiones al importar
+        if self._cert_store is None:
+            self._cert_store = CachedCertStore()
+        return self._cert_store
+
+    def verify(self, token, audience):
+        """
+        Verificar firma, audiencia, expiración y emisor de un ID token
+
+        Returns:
+            dict: Claims del token
+
+        Raises:
+            ValueError: Si el token no es válido (igual que google.oauth2.id_token)
+        """
+        header = google_jwt.decode_header(token)
+        certs = self.cert_store.get_certs(header.get('kid'))
+        idinfo = google_jwt.decode(
+            token,
+            certs=certs,
+            audience=audience,
+            clock_skew_in_seconds=self.clock_skew_in_seconds
+        )
+        if idinfo.get('iss') not in self.issuers:
+            raise ValueError(f"Wrong issuer. 'iss' should be one of {self.issuers} but got {idinfo.get('iss')}")
+        return idinfo
+
+
+# Instancia global (una por worker)
+google_token_verifier = GoogleTokenVerifier()
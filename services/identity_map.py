@@ -0,0 +1,116 @@
+"""
+Identity map por request para los usuarios cargados de MongoDB
+
+Dentro de un request cada usuario se lee como mucho una vez: los finders de
+User consultan primero el mapa guardado en flask.g y devuelven la misma
+instancia a todas las capas (handlers, controladores, ...). El mapa también
+cuenta las consultas a la colección users del request, para tests y
+depuración (encabezados X-User-Queries con IDENTITY_MAP_DEBUG_HEADERS=true).
+"""
+import os
+import threading
+from collections import Counter
+
+from flask import g, has_app_context
+
+IDENTITY_MAP_ENABLED = os.getenv('IDENTITY_MAP_ENABLED', 'true').lower() == 'true'
+
+
+def _loaded_value(entity, attribute):
+    # Sin disparar la carga perezosa de campos fuera de la proyección
+    try:
+        return object.__getattribute__(entity, attribute)
+    except AttributeError:
+        return None
+
+
+class IdentityMap:
+    """
+    Entidades por _id, con alias por campos únicos (email, username)
+
+    Un alias solo es válido mientras la instancia conserve ese valor: si el
+    request cambia el email del usuario, buscar por el email viejo es un miss.
+    """
+
+    def __init__(self, key_fields=('email', 'username')):
+        self.key_fields = key_fields
+        self._entities = {}  # _id -> entidad
+        self._aliases = {}  # (campo, valor) -> _id
+        self._lock = threading.Lock()  # asyncio.to_thread comparte el mapa entre hilos
+        self._stats = {'hits': 0, 'misses': 0}
+        self._queries = Counter()
+
+    def get(self, field, value):
+        """Entidad ya cargada por '_id' o por un campo único, o None"""
+        with self._lock:
+            entity_id = value if field == '_id' else self._aliases.get((field, value))
+            entity = self._entities.get(entity_id) if entity_id is not None else None
+            if entity is not None and field != '_id' and _loaded_value(entity, field) != value:
+                entity = None
+            self._stats['hits' if entity is not None else 'misses'] += 1
+            return entity
+
+    def add(self, entity):
+        """
+        Registrar una entidad recién cargada
+
+        Returns:
+            La instancia registrada: si el _id ya estaba, la existente (una
+            sola instancia por documento en el request)
+        """
+        entity_id = str(entity._id)
+        with self._lock:
+            entity = self._entities.setdefault(entity_id, entity)
+            for field in self.key_fields:
+                value = _loaded_value(entity, field)
+                if value:
+                    self._aliases[(field, value)] = entity_id
+            return entity
+
+    def record_query(self, operation):
+        with self._lock:
+            self._queries[operation] += 1
+
+    def get_metrics(self):
+        with self._lock:
+            metrics = dict(self._stats)
+            metrics['queries'] = dict(self._queries)
+        metrics['total_queries'] = sum(metrics['queries'].values())
+        return metrics
+
+
+def current_identity_map():
+    """Identity map del request actual (None fuera de un contexto de Flask o si está deshabilitado)"""
+    if not IDENTITY_MAP_ENABLED or not has_app_context():
+        return None
+    identity_map = g.get('_identity_map')
+    if identity_map is None:
+        identity_map = g._identity_map = IdentityMap()
+    return identity_map
+
+
+def record_query(operation):
+    """Contar una consulta a la colección users en el request actual"""
+    identity_map = current_identity_map()
+    if identity_map is not None:
+        identity_map.record_query(operation)
+
+
+def request_metrics():
+    """Aciertos, misses y consultas del request actual (None si no hay request)"""
+    identity_map = g.get('_identity_map') if has_app_context() else None
+    return identity_map.get_metrics() if identity_map is not None else None
+
+
+def _inject_headers(response):
+    metrics = request_metrics()
+    if metrics is not None:
+        response.headers['X-User-Queries'] = str(metrics['total_queries'])
+        response.headers['X-Identity-Map-Hits'] = str(metrics['hits'])
+    return response
+
+
+def init_identity_map(app):
+    """Exponer las métricas del request en encabezados (IDENTITY_MAP_DEBUG_HEADERS=true)"""
+    if os.getenv('IDENTITY_MAP_DEBUG_HEADERS', 'false').lower() == 'true':
+        app.after_request(_inject_headers)
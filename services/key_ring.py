@@ -0,0 +1,334 @@
+"""
+Anillo de llaves para firma asimétrica de JWT (RS256 / EdDSA) con rotación
+
+Los workers comparten el directorio de llaves: la rotación se hace bajo un
+lock de archivo (flock, o msvcrt.locking en Windows) en ese directorio y se vuelve a comprobar con las
+llaves en disco, así dos workers no crean dos llaves a la vez. Con
+JWT_KEY_AUTO_ROTATE=false los workers solo recargan y la rotación la hace un
+cron con `python -m services.key_ring rotate-if-due`.
+"""
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from jwt.algorithms import has_crypto
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+if has_crypto:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ed25519, rsa
+    from jwt.algorithms import OKPAlgorithm, RSAAlgorithm
+
+ASYMMETRIC_ALGORITHMS = ('RS256', 'EdDSA')
+# Archivo del directorio de llaves sobre el que se toma el lock de rotación
+ROTATION_LOCK_FILE = '.rotation.lock'
+
+
+def _lock_file(lock_file):
+    """Lock exclusivo bloqueante sobre un archivo abierto"""
+    if fcntl is not None:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        return
+    # msvcrt bloquea bytes desde la posición actual y LK_LOCK se rinde tras ~10 s
+    lock_file.seek(0)
+    while True:
+        try:
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+            return
+        except OSError:
+            continue
+
+
+def _unlock_file(lock_file):
+    if fcntl is not None:
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+    else:
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class SigningKey:
+    """Llave de firma identificada por su `kid`"""
+
+    def __init__(self, kid, algorithm, private_pem, created_at, activates_at):
+        self.kid = kid
+        self.algorithm = algorithm
+        self.private_pem = private_pem
+        self.created_at = created_at
+        self.activates_at = activates_at
+        self.private_key = serialization.load_pem_private_key(private_pem, password=None)
+        self.public_key = self.private_key.public_key()
+
+    @staticmethod
+    def generate(algorithm, activates_at=None):
+        """Generar una llave nueva para el algoritmo indicado"""
+        if algorithm == 'RS256':
+            private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        elif algorithm == 'EdDSA':
+            private_key = ed25519.Ed25519PrivateKey.generate()
+        else:
+            raise ValueError(f'Algoritmo de firma no soportado: {algorithm}')
+
+        private_pem = private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.PKCS8,
+            encryption_algorithm=serialization.NoEncryption()
+        )
+        now = datetime.utcnow()
+        kid = f'{now.strftime("%Y%m%d%H%M%S")}-{secrets.token_hex(4)}'
+        return SigningKey(kid, algorithm, private_pem, now, activates_at or now)
+
+    def to_jwk(self):
+        """Representación JWK pública de la llave"""
+        if self.algorithm == 'RS256':
+            jwk = json.loads(RSAAlgorithm.to_jwk(self.public_key))
+        else:
+            jwk = json.loads(OKPAlgorithm.to_jwk(self.public_key))
+        jwk.update({'kid': self.kid, 'alg': self.algorithm, 'use': 'sig'})
+        return jwk
+
+
+class KeyRing:
+    """
+    Conjunto de llaves de firma persistido en un directorio compartido.
+
+    - La llave activa es la más reciente cuya fecha de activación ya pasó.
+    - Una llave nueva se publica en el JWKS `publish_ahead` antes de usarse,
+      para que los servicios que cachean el JWKS ya la conozcan.
+    - Una llave reemplazada se sigue publicando durante `overlap` para que los
+      tokens que firmó puedan verificarse hasta expirar.
+    - Con `auto_rotate=False` los workers no rotan (solo crean la primera llave
+      si no hay ninguna); la rotación queda para el CLI.
+    """
+
+    def __init__(self, algorithm=None, keys_dir=None, rotation_interval=None, publish_ahead=None,
+                 overlap=None, reload_interval=None, auto_rotate=None):
+        self.algorithm = algorithm or os.getenv('JWT_ALGORITHM', 'HS256')
+        self.keys_dir = keys_dir or os.getenv('JWT_KEYS_DIR', 'keys')
+        self.rotation_interval = rotation_interval or timedelta(days=int(os.getenv('JWT_KEY_ROTATION_DAYS', 30)))
+        self.publish_ahead = publish_ahead if publish_ahead is not None else timedelta(
+            seconds=int(os.getenv('JWKS_MAX_AGE', 3600))
+        )
+        self.overlap = overlap or timedelta(seconds=int(os.getenv('JWT_KEY_OVERLAP_SECONDS', 86400)))
+        self.reload_interval = reload_interval if reload_interval is not None else float(
+            os.getenv('JWT_KEYS_RELOAD_SECONDS', 60)
+        )
+        self.auto_rotate = auto_rotate if auto_rotate is not None else (
+            os.getenv('JWT_KEY_AUTO_ROTATE', 'true').lower() == 'true'
+        )
+        self._lock = threading.RLock()
+        self._keys = {}
+        self._next_reload = 0.0
+
+    @property
+    def enabled(self):
+        """La firma asimétrica está habilitada"""
+        return self.algorithm in ASYMMETRIC_ALGORITHMS
+
+    # ------------------------------------------------------------------
+    # Persistencia
+    # ------------------------------------------------------------------
+    def load(self):
+        """Leer las llaves del directorio (otros workers pueden haber rotado)"""
+        if not has_crypto:
+            raise ImportError('La firma asimétrica requiere instalar cryptography')
+
+        keys = {}
+        if os.path.isdir(self.keys_dir):
+            for filename in os.listdir(self.keys_dir):
+                if not filename.endswith('.json'):
+                    continue
+                kid = filename[:-len('.json')]
+                try:
+                    with open(os.path.join(self.keys_dir, filename), encoding='utf-8') as f:
+                        metadata = json.load(f)
+                    with open(os.path.join(self.keys_dir, f'{kid}.pem'), 'rb') as f:
+                        private_pem = f.read()
+                    keys[kid] = SigningKey(
+                        kid,
+                        metadata['algorithm'],
+                        private_pem,
+                        datetime.fromisoformat(metadata['created_at']),
+                        datetime.fromisoformat(metadata['activates_at'])
+                    )
+                except (OSError, ValueError, KeyError) as e:
+                    print(f'⚠️ Llave de firma ignorada ({kid}): {e}')
+
+        with self._lock:
+            self._keys = keys
+            self._next_reload = time.monotonic() + self.reload_interval
+        return keys
+
+    def _save(self, key):
+        os.makedirs(self.keys_dir, exist_ok=True)
+        pem_path = os.path.join(self.keys_dir, f'{key.kid}.pem')
+        fd = os.open(pem_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key.private_pem)
+        # El JSON se escribe al final: su presencia indica que la llave está completa
+        with open(os.path.join(self.keys_dir, f'{key.kid}.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'algorithm': key.algorithm,
+                'created_at': key.created_at.isoformat(),
+                'activates_at': key.activates_at.isoformat()
+            }, f)
+
+    def _ensure_loaded(self):
+        if time.monotonic() >= self._next_reload:
+            self.load()
+
+    # ------------------------------------------------------------------
+    # Rotación
+    # ------------------------------------------------------------------
+    def _sorted_keys(self):
+        return sorted(self._keys.values(), key=lambda k: k.activates_at)
+
+    def rotate(self, immediate=False):
+        """
+        Crear una llave nueva
+
+        Args:
+            immediate (bool): Activarla ya (solo si no hay llaves publicadas)
+        """
+        activates_at = datetime.utcnow() if immediate else datetime.utcnow() + self.publish_ahead
+        key = SigningKey.generate(self.algorithm, activates_at)
+        self._save(key)
+        with self._lock:
+            self._keys[key.kid] = key
+        print(f'🔑 Nueva llave de firma {key.kid} ({key.algorithm}), activa desde {activates_at.isoformat()}')
+        return key
+
+    @contextmanager
+    def _rotation_lock(self):
+        """Lock exclusivo entre procesos y hilos sobre el directorio de llaves"""
+        os.makedirs(self.keys_dir, exist_ok=True)
+        with open(os.path.join(self.keys_dir, ROTATION_LOCK_FILE), 'a+') as lock_file:
+            _lock_file(lock_file)
+            try:
+                yield
+            finally:
+                _unlock_file(lock_file)
+
+    def _due_rotation(self):
+        """(hay que rotar, la llave nueva se activa ya) según las llaves cargadas"""
+        with self._lock:
+            keys = [k for k in self._sorted_keys() if k.algorithm == self.algorithm]
+        if not keys:
+            return True, True
+        newest = keys[-1]
+        now = datetime.utcnow()
+        return newest.activates_at <= now and now - newest.activates_at >= self.rotation_interval, False
+
+    def maybe_rotate(self):
+        """Programar una llave nueva si la activa cumplió su intervalo de rotación"""
+        due, immediate = self._due_rotation()
+        if not due or not (immediate or self.auto_rotate):
+            return None
+        return self.rotate_if_due()
+
+    def rotate_if_due(self):
+        """Rotar bajo el lock, volviendo a comprobar con las llaves en disco"""
+        with self._rotation_lock():
+            # Otro worker pudo rotar mientras esperábamos el lock
+            self.load()
+            due, immediate = self._due_rotation()
+            return self.rotate(immediate=immediate) if due else None
+
+    def prune(self):
+        """Eliminar llaves que ya no se publican"""
+        with self._lock:
+            published = {k.kid for k in self.published_keys()}
+            for kid in [kid for kid in self._keys if kid not in published]:
+                for extension in ('json', 'pem'):
+                    try:
+                        os.remove(os.path.join(self.keys_dir, f'{kid}.{extension}'))
+                    except OSError:
+                        pass
+                del self._keys[kid]
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    def active_key(self):
+        """Llave con la que se firman los tokens nuevos"""
+        self._ensure_loaded()
+        self.maybe_rotate()
+        now = datetime.utcnow()
+        with self._lock:
+            keys = [k for k in self._sorted_keys() if k.algorithm == self.algorithm]
+            active = [k for k in keys if k.activates_at <= now]
+            return active[-1] if active else keys[0]
+
+    def published_keys(self):
+        """Llaves pendientes, activa y anteriores dentro de la ventana de solapamiento"""
+        now = datetime.utcnow()
+        with self._lock:
+            keys = self._sorted_keys()
+        published = []
+        for index, key in enumerate(keys):
+            successor = keys[index + 1] if index + 1 < len(keys) else None
+            if successor is None or successor.activates_at + self.overlap > now:
+                published.append(key)
+        return published
+
+    def get_key(self, kid):
+        """Buscar una llave publicada por su kid (recarga el directorio si no está)"""
+        self._ensure_loaded()
+        with self._lock:
+            key = self._keys.get(kid)
+        if key is None:
+            self.load()
+            with self._lock:
+                key = self._keys.get(kid)
+        if key is not None and key in self.published_keys():
+            return key
+        return None
+
+    def jwks(self):
+        """Documento JWKS con las llaves públicas publicadas"""
+        if not self.enabled:
+            return {'keys': []}
+        self._ensure_loaded()
+        self.maybe_rotate()
+        return {'keys': [key.to_jwk() for key in self.published_keys()]}
+
+
+# Instancia global
+key_ring = KeyRing()
+
+
+if __name__ == '__main__':
+    # Uso: python -m services.key_ring [rotate|rotate-if-due|prune|list]
+    # (rotate-if-due es el comando para el cron con JWT_KEY_AUTO_ROTATE=false)
+    from dotenv import load_dotenv
+
+    # La instancia global se creó al importar, antes de leer .env
+    load_dotenv()
+    key_ring = KeyRing()
+    command = sys.argv[1] if len(sys.argv) > 1 else 'list'
+    if not key_ring.enabled:
+        print(f'JWT_ALGORITHM={key_ring.algorithm}: la firma asimétrica no está habilitada')
+        sys.exit(1)
+    if command == 'rotate-if-due':
+        key_ring.rotate_if_due()
+    elif command in ('rotate', 'prune'):
+        with key_ring._rotation_lock():
+            key_ring.load()
+            if command == 'rotate':
+                key_ring.rotate(immediate=not key_ring.published_keys())
+            else:
+                key_ring.prune()
+    else:
+        key_ring.load()
+    for signing_key in key_ring.published_keys():
+        print(f'{signing_key.kid}  {signing_key.algorithm}  activa desde {signing_key.activates_at.isoformat()}')
@@ -0,0 +1,227 @@
+"""
+Throttle de intentos de login por email e IP (antes de tocar la BD o el hash)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+
+from models.login_throttle_state import LoginThrottleState
+
+
+class ThrottlePolicy:
+    """Token bucket: `capacity` fallos seguidos, recuperando uno cada `refill_seconds`"""
+
+    def __init__(self, capacity, refill_seconds):
+        self.capacity = capacity
+        self.refill_seconds = refill_seconds
+
+    def full_refill_seconds(self):
+        return self.capacity * self.refill_seconds
+
+
+class MemoryThrottleBackend:
+    """Estado en memoria del proceso (un worker)"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._states = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            state = self._states.get(key)
+            return dict(state) if state is not None else None
+
+    def update(self, key, fn, ttl_seconds):
+        """Aplicar fn(state) -> new_state de forma atómica"""
+        with self._lock:
+            new_state = fn(self._states.get(key))
+            self._states[key] = new_state
+            self._states.move_to_end(key)
+            while len(self._states) > self.max_keys:
+                self._states.popitem(last=False)
+            return dict(new_state)
+
+    def delete(self, key):
+        with self._lock:
+            self._states.pop(key, None)
+
+
+class MongoThrottleBackend:
+    """Estado compartido entre workers en Mongo (compare-and-set por versión)"""
+
+    def __init__(self, max_retries=5):
+        self.max_retries = max_retries
+
+    def get(self, key):
+        state, _ = LoginThrottleState.find(key)
+        return state
+
+    def update(self, key, fn, ttl_seconds):
+        new_state = None
+        for _ in range(self.max_retries):
+            state, version = LoginThrottleState.find(key)
+            new_state = fn(state)
+            expires_at = datetime.utcfromtimestamp(
+                max(new_state['locked_until'], new_state['updated_at']) + ttl_seconds
+            )
+            if LoginThrottleState.compare_and_set(key, version, new_state, expires_at):
+                return new_state
+        # Con mucha contención se acepta perder un fallo antes que bloquear el login
+        return new_state
+
+    def delete(self, key):
+        LoginThrottleState.delete(key)
+
+
+class LoginThrottledError(Exception):
+    """Demasiados intentos fallidos: reintentar pasado `retry_after` segundos"""
+
+    def __init__(self, retry_after):
+        self.retry_after = max(1, int(retry_after + 0.999))
+        super().__init__(f'Demasiados intentos de login. Reintenta en {self.retry_after} segundos')
+
+
+class LoginThrottle:
+    """
+    Limita los intentos fallidos de login por email normalizado y por IP.
+
+    - `check` se llama antes de buscar el usuario o verificar la contraseña y
+      solo lee el estado: si alguna clave está bloqueada se rechaza con 429.
+    - Cada fallo consume un token de las dos claves. Al vaciarse el bucket la
+      clave se bloquea; cada bloqueo consecutivo dura el doble (hasta
+      `lockout_max`). Los strikes se olvidan cuando el bucket se rellena.
+    - Un login correcto limpia el estado del email, pero no el de la IP, para
+      que un atacante no pueda intercalar su propia cuenta y resetearla.
+    """
+
+    def __init__(self, backend=None, email_policy=None, ip_policy=None, lockout_base=None, lockout_max=None,
+                 clock=time.time):
+        self.backend = backend or MemoryThrottleBackend()
+        self.email_policy = email_policy or ThrottlePolicy(
+            int(os.getenv('LOGIN_THROTTLE_EMAIL_CAPACITY', 5)),
+            float(os.getenv('LOGIN_THROTTLE_EMAIL_REFILL_SECONDS', 60))
+        )
+        self.ip_policy = ip_policy or ThrottlePolicy(
+            int(os.getenv('LOGIN_THROTTLE_IP_CAPACITY', 20)),
+            float(os.getenv('LOGIN_THROTTLE_IP_REFILL_SECONDS', 30))
+        )
+        self.lockout_base = lockout_base if lockout_base is not None else float(
+            os.getenv('LOGIN_LOCKOUT_BASE_SECONDS', 30)
+        )
+        self.lockout_max = lockout_max if lockout_max is not None else float(
+            os.getenv('LOGIN_LOCKOUT_MAX_SECONDS', 3600)
+        )
+        self.clock = clock
+        self._stats = {'checks': 0, 'rejected': 0, 'failures': 0, 'lockouts': 0, 'backend_errors': 0}
+
+    @staticmethod
+    def normalize_email(email):
+        return (email or '').strip().lower()
+
+    def _keys(self, email, client_ip):
+        keys = []
+        normalized = self.normalize_email(email)
+        if normalized:
+            keys.append((f'email:{normalized}', self.email_policy))
+        if client_ip:
+            keys.append((f'ip:{client_ip}', self.ip_policy))
+        return keys
+
+    def check(self, email, client_ip=None):
+        """
+        Rechazar el intento si el email o la IP están bloqueados
+
+        Raises:
+            LoginThrottledError: Si hay que esperar antes de reintentar
+        """
+        self._stats['checks'] += 1
+        now = self.clock()
+        retry_after = 0.0
+        for key, _ in self._keys(email, client_ip):
+            try:
+                state = self.backend.get(key)
+            except Exception as e:
+                # El throttle no debe tumbar el login si su backend falla
+                self._stats['backend_errors'] += 1
+                print(f'⚠️ Error consultando throttle de login: {e}')
+                continue
+            if state is not None and state['locked_until'] > now:
+                retry_after = max(retry_after, state['locked_until'] - now)
+
+        if retry_after > 0:
+            self._stats['rejected'] += 1
+            raise LoginThrottledError(retry_after)
+
+    def _consume(self, policy, now, outcome):
+        def apply(state):
+            outcome['locked'] = False
+            if state is None:
+                state = {'tokens': float(policy.capacity), 'updated_at': now, 'strikes': 0, 'locked_until': 0.0}
+            else:
+                state = dict(state)
+
+            elapsed = max(0.0, now - state['updated_at'])
+            state['tokens'] = min(float(policy.capacity), state['tokens'] + elapsed / policy.refill_seconds)
+            if state['tokens'] >= policy.capacity and state['locked_until'] <= now:
+                state['strikes'] = 0
+
+            state['tokens'] -= 1
+            state['updated_at'] = now
+            if state['tokens'] < 1:
+                state['strikes'] += 1
+                lockout = min(self.lockout_max, self.lockout_base * (2 ** (state['strikes'] - 1)))
+                state['locked_until'] = now + lockout
+                state['tokens'] = max(state['tokens'], 0.0)
+                outcome['locked'] = True
+            return state
+        return apply
+
+    def register_failure(self, email, client_ip=None):
+        """Contabilizar un intento fallido"""
+        self._stats['failures'] += 1
+        now = self.clock()
+        for key, policy in self._keys(email, client_ip):
+            outcome = {}
+            try:
+                state = self.backend.update(
+                    key,
+                    self._consume(policy, now, outcome),
+                    policy.full_refill_seconds() + self.lockout_max
+                )
+                if outcome.get('locked'):
+                    self._stats['lockouts'] += 1
+                    print(f'🚫 Login bloqueado para {key} durante {int(state["locked_until"] - now)}s')
+            except Exception as e:
+                self._stats['backend_errors'] += 1
+                print(f'⚠️ Error registrando fallo de login: {e}')
+
+    def register_success(self, email, client_ip=None):
+        """Limpiar el estado del email tras un login correcto"""
+        normalized = self.normalize_email(email)
+        if not normalized:
+            return
+        try:
+            self.backend.delete(f'email:{normalized}')
+        except Exception as e:
+            self._stats['backend_errors'] += 1
+            print(f'⚠️ Error limpiando throttle de login: {e}')
+
+    def get_metrics(self):
+        return dict(self._stats)
+
+
+def login_throttle_from_env():
+    """Crear el throttle según LOGIN_THROTTLE_BACKEND (memory | mongo)"""
+    backend_name = os.getenv('LOGIN_THROTTLE_BACKEND', 'memory').lower()
+    if backend_name == 'mongo':
+        return LoginThrottle(backend=MongoThrottleBackend())
+    if backend_name != 'memory':
+        raise ValueError(f'Backend de throttle desconocido: {backend_name}')
+    return LoginThrottle()
+
+
+# Instancia global
+login_throttle = login_throttle_from_env()
@@ -0,0 +1,263 @@
+"""
+Registro de algoritmos de hashing de contraseñas (bcrypt y argon2id)
+
+El costo se calibra una sola vez, fuera de la aplicación, y se guarda en la
+configuración que leen todos los workers (si cada worker calibrara al
+arrancar, elegirían costos distintos y needs_rehash alternaría el hash de
+cada usuario según el worker que atienda su login):
+
+    python -m services.password_hashers --calibrate              # Imprimir la config
+    python -m services.password_hashers --calibrate --write .env # Guardarla en .env
+
+Opciones: --target-ms (PASSWORD_HASH_TARGET_MS, 250) y --algorithm
+(PASSWORD_HASHER).
+"""
+import os
+import re
+import sys
+import time
+
+import bcrypt
+
+try:
+    from argon2 import PasswordHasher as _Argon2PasswordHasher
+    from argon2.exceptions import VerificationError, InvalidHashError
+    ARGON2_AVAILABLE = True
+except ImportError:
+    _Argon2PasswordHasher = None
+    ARGON2_AVAILABLE = False
+
+
+def _to_bytes(value):
+    """Convertir str a bytes UTF-8"""
+    if isinstance(value, bytes):
+        return value
+    return value.encode('utf-8')
+
+
+def _percentile(samples, p):
+    """Percentil simple (nearest-rank) de una lista de tiempos"""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class BcryptHasher:
+    """Hasher bcrypt con costo (rounds) configurable"""
+
+    name = 'bcrypt'
+    MIN_ROUNDS = 10
+    MAX_ROUNDS = 16
+
+    def __init__(self, rounds=12):
+        self.rounds = int(rounds)
+
+    def params(self):
+        """Parámetros serializables (se envían a los procesos del pool)"""
+        return {'rounds': self.rounds}
+
+    def hash(self, password):
+        return bcrypt.hashpw(_to_bytes(password), bcrypt.gensalt(self.rounds)).decode('utf-8')
+
+    def verify(self, password, hashed_password):
+        try:
+            return bcrypt.checkpw(_to_bytes(password), _to_bytes(hashed_password))
+        except ValueError:
+            # Hash con formato inválido
+            return False
+
+    @staticmethod
+    def identifies(hashed_password):
+        return hashed_password.startswith(('$2a$', '$2b$', '$2y$'))
+
+    def needs_rehash(self, hashed_password):
+        """El hash es de otro algoritmo o de otro costo"""
+        if not self.identifies(hashed_password):
+            return True
+        try:
+            return int(hashed_password.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
+
+    @classmethod
+    def calibrate(cls, target_ms, samples=5):
+        """Elegir el mayor costo cuyo p99 de verificación no supere target_ms"""
+        chosen = cls(cls.MIN_ROUNDS)
+        for rounds in range(cls.MIN_ROUNDS, cls.MAX_ROUNDS + 1):
+            candidate = cls(rounds)
+            hashed = candidate.hash('calibration-password')
+            timings = []
+            for _ in range(samples):
+                started = time.perf_counter()
+                candidate.verify('calibration-password', hashed)
+                timings.append((time.perf_counter() - started) * 1000)
+            if _percentile(timings, 99) > target_ms:
+                break
+            chosen = candidate
+        return chosen
+
+
+class Argon2idHasher:
+    """Hasher argon2id (requiere el paquete opcional argon2-cffi)"""
+
+    name = 'argon2id'
+    MAX_TIME_COST = 10
+
+    def __init__(self, time_cost=3, memory_cost=65536, parallelism=4):
+        if not ARGON2_AVAILABLE:
+            raise ImportError('argon2id requiere instalar argon2-cffi')
+        self.time_cost = int(time_cost)
+        self.memory_cost = int(memory_cost)
+        self.parallelism = int(parallelism)
+        self._hasher = _Argon2PasswordHasher(
+            time_cost=self.time_cost,
+            memory_cost=self.memory_cost,
+            parallelism=self.parallelism
+        )
+
+    def params(self):
+        return {
+            'time_cost': self.time_cost,
+            'memory_cost': self.memory_cost,
+            'parallelism': self.parallelism
+        }
+
+    def hash(self, password):
+        return self._hasher.hash(_to_bytes(password))
+
+    def verify(self, password, hashed_password):
+        try:
+            return self._hasher.verify(hashed_password, _to_bytes(password))
+        except (VerificationError, InvalidHashError):
+            return False
+
+    @staticmethod
+    def identifies(hashed_password):
+        return hashed_password.startswith('$argon2id$')
+
+    def needs_rehash(self, hashed_password):
+        if not self.identifies(hashed_password):
+            return True
+        try:
+            return self._hasher.check_needs_rehash(hashed_password)
+        except InvalidHashError:
+            return True
+
+    @classmethod
+    def calibrate(cls, target_ms, samples=5, memory_cost=65536, parallelism=4):
+        """Elegir el mayor time_cost cuyo p99 de verificación no supere target_ms"""
+        chosen = cls(1, memory_cost, parallelism)
+        for time_cost in range(1, cls.MAX_TIME_COST + 1):
+            candidate = cls(time_cost, memory_cost, parallelism)
+            hashed = candidate.hash('calibration-password')
+            timings = []
+            for _ in range(samples):
+                started = time.perf_counter()
+                candidate.verify('calibration-password', hashed)
+                timings.append((time.perf_counter() - started) * 1000)
+            if _percentile(timings, 99) > target_ms:
+                break
+            chosen = candidate
+        return chosen
+
+
+# Registro de algoritmos disponibles
+HASHERS = {
+    BcryptHasher.name: BcryptHasher,
+    Argon2idHasher.name: Argon2idHasher,
+}
+
+
+def build_hasher(name, params=None):
+    """Construir un hasher del registro a partir de su nombre y parámetros"""
+    if name not in HASHERS:
+        raise ValueError(f'Algoritmo de hashing no soportado: {name}')
+    return HASHERS[name](**(params or {}))
+
+
+def identify_hasher_class(hashed_password):
+    """Detectar el algoritmo de un hash almacenado (None si no se reconoce)"""
+    for hasher_class in HASHERS.values():
+        if hasher_class.identifies(hashed_password):
+            return hasher_class
+    return None
+
+
+# Variable de entorno de cada parámetro de hasher_from_env()
+ENV_VARIABLES = {
+    'bcrypt': {'rounds': 'BCRYPT_ROUNDS'},
+    'argon2id': {'time_cost': 'ARGON2_TIME_COST', 'memory_cost': 'ARGON2_MEMORY_COST',
+                 'parallelism': 'ARGON2_PARALLELISM'},
+}
+
+
+def env_settings(hasher):
+    """Variables de entorno que reproducen un hasher con hasher_from_env()"""
+    settings = {'PASSWORD_HASHER': hasher.name}
+    for param, value in hasher.params().items():
+        settings[ENV_VARIABLES[hasher.name][param]] = str(value)
+    return settings
+
+
+def write_env_file(path, settings):
+    """Reemplazar (o agregar al final) las variables en un archivo .env"""
+    lines = []
+    if os.path.exists(path):
+        with open(path, encoding='utf-8') as env_file:
+            lines = env_file.read().splitlines()
+    written = set()
+    for index, line in enumerate(lines):
+        match = re.match(r'\s*([A-Z0-9_]+)\s*=', line)
+        # Todas las apariciones: dotenv se queda con la última
+        if match and match.group(1) in settings:
+            lines[index] = f'{match.group(1)}={settings[match.group(1)]}'
+            written.add(match.group(1))
+    lines.extend(f'{key}={value}' for key, value in settings.items() if key not in written)
+    with open(path, 'w', encoding='utf-8') as env_file:
+        env_file.write('\n'.join(lines) + '\n')
+
+
+def _option(name, default=None):
+    if name in sys.argv:
+        index = sys.argv.index(name)
+        if index + 1 < len(sys.argv):
+            return sys.argv[index + 1]
+    return default
+
+
+def hasher_from_env():
+    """Construir el hasher configurado por variables de entorno"""
+    name = os.getenv('PASSWORD_HASHER', 'bcrypt')
+    if name == Argon2idHasher.name:
+        return Argon2idHasher(
+            time_cost=os.getenv('ARGON2_TIME_COST', 3),
+            memory_cost=os.getenv('ARGON2_MEMORY_COST', 65536),
+            parallelism=os.getenv('ARGON2_PARALLELISM', 4)
+        )
+    return BcryptHasher(rounds=os.getenv('BCRYPT_ROUNDS', 12))
+
+
+if __name__ == '__main__':
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    if '--calibrate' not in sys.argv:
+        print(__doc__)
+        sys.exit(1)
+
+    algorithm = _option('--algorithm', os.getenv('PASSWORD_HASHER', 'bcrypt'))
+    if algorithm not in HASHERS:
+        print(f'❌ Algoritmo de hashing no soportado: {algorithm}')
+        sys.exit(1)
+    target_ms = float(_option('--target-ms', os.getenv('PASSWORD_HASH_TARGET_MS', 250)))
+
+    calibrated = HASHERS[algorithm].calibrate(target_ms)
+    settings = env_settings(calibrated)
+    print(f'⚙️ Hasher calibrado: {calibrated.name} {calibrated.params()} (p99 <= {target_ms}ms)')
+    for key, value in settings.items():
+        print(f'{key}={value}')
+
+    env_path = _option('--write')
+    if env_path:
+        write_env_file(env_path, settings)
+        print(f'✅ Configuración guardada en {env_path}')
@@ -0,0 +1,297 @@
+"""
+Servicio compartido para hashing de contraseñas en un pool de procesos
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from services.password_hashers import build_hasher, identify_hasher_class, hasher_from_env
+
+
+def _to_bytes(value):
+    """Convertir str a bytes UTF-8 (las tareas del pool trabajan con bytes)"""
+    if isinstance(value, bytes):
+        return value
+    return value.encode('utf-8')
+
+
+def _hash_password_task(password_bytes, hasher_name, hasher_params):
+    """Tarea del pool: generar hash de una contraseña con el algoritmo indicado"""
+    return build_hasher(hasher_name, hasher_params).hash(password_bytes)
+
+
+def _verify_password_task(password_bytes, hashed_password):
+    """Tarea del pool: verificar una contraseña detectando el algoritmo del hash"""
+    hasher_class = identify_hasher_class(hashed_password)
+    if hasher_class is None:
+        return False
+    return hasher_class().verify(password_bytes, hashed_password)
+
+
+class HashingServiceBusyError(Exception):
+    """La cola del servicio de hashing está llena"""
+    pass
+
+
+class PasswordHashingService:
+    """
+    Ejecuta el hashing de contraseñas fuera del hilo del request.
+
+    Usa un ProcessPoolExecutor acotado (el hashing es CPU-bound y así escala
+    entre núcleos) y cae a un ThreadPoolExecutor si no se pueden crear
+    procesos. Expone APIs de submit (Future), bloqueantes y async.
+
+    Los hashes nuevos usan el hasher configurado (ver services.password_hashers);
+    la verificación detecta el algoritmo a partir del hash almacenado.
+    """
+
+    def __init__(self, max_workers=None, max_pending=None, mode=None, hasher=None,
+                 submit_timeout=None):
+        self.max_workers = max_workers or int(os.getenv('HASH_POOL_WORKERS', os.cpu_count() or 2))
+        self.max_pending = max_pending or int(os.getenv('HASH_POOL_MAX_PENDING', self.max_workers * 8))
+        self.mode = mode or os.getenv('HASH_POOL_MODE', 'process')  # 'process' o 'thread'
+        self.hasher = hasher or hasher_from_env()
+        self.submit_timeout = submit_timeout if submit_timeout is not None else float(
+            os.getenv('HASH_POOL_SUBMIT_TIMEOUT', 5)
+        )
+
+        self._lock = threading.Lock()
+        self._executor = None
+        self._executor_pid = None
+        self._active_mode = None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._pending = 0
+        self._latencies = deque(maxlen=1000)
+        self._counters = {'submitted': 0, 'completed': 0, 'failed': 0, 'cancelled': 0, 'rejected': 0}
+
+    # ------------------------------------------------------------------
+    # Gestión del pool
+    # ------------------------------------------------------------------
+    def _create_executor(self):
+        """Crear el pool de procesos, o de hilos si no es posible"""
+        if self.mode == 'process':
+            try:
+                methods = multiprocessing.get_all_start_methods()
+                start_method = 'forkserver' if 'forkserver' in methods else 'spawn'
+                context = multiprocessing.get_context(start_method)
+                executor = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+                return executor, 'process'
+            except (OSError, ValueError, NotImplementedError, ImportError) as e:
+                print(f'⚠️ Pool de procesos no disponible, usando hilos: {e}')
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='hashing')
+        return executor, 'thread'
+
+    def _get_executor(self):
+        """Obtener el pool del proceso actual (se recrea después de un fork)"""
+        pid = os.getpid()
+        if self._executor is None or self._executor_pid != pid:
+            with self._lock:
+                if self._executor is None or self._executor_pid != pid:
+                    self._executor, self._active_mode = self._create_executor()
+                    self._executor_pid = pid
+        return self._executor
+
+    def _fallback_to_threads(self):
+        """Reemplazar un pool de procesos roto por uno de hilos"""
+        with self._lock:
+            if self._active_mode != 'thread':
+                print('⚠️ Pool de procesos roto, cambiando a pool de hilos')
+                broken = self._executor
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='hashing')
+                self._active_mode = 'thread'
+                self._executor_pid = os.getpid()
+                if broken is not None:
+                    broken.shutdown(wait=False)
+        return self._executor
+
+    def shutdown(self, wait=True):
+        """Cerrar el pool (se volverá a crear en el siguiente submit)"""
+        with self._lock:
+            executor, executor_pid = self._executor, self._executor_pid
+            self._executor = None
+            self._executor_pid = None
+            self._active_mode = None
+        # Fuera del lock: las tareas que terminan llaman a _release, que lo necesita
+        if executor is not None and executor_pid == os.getpid():
+            executor.shutdown(wait=wait)
+
+    # ------------------------------------------------------------------
+    # Submit
+    # ------------------------------------------------------------------
+    def _reject(self):
+        with self._lock:
+            self._counters['rejected'] += 1
+        raise HashingServiceBusyError('El servicio de hashing está saturado, intenta nuevamente')
+
+    def _submit(self, fn, *args):
+        if not self._slots.acquire(timeout=self.submit_timeout):
+            self._reject()
+        return self._start(fn, *args)
+
+    async def _submit_async(self, fn, *args):
+        """Como _submit, pero esperar un cupo no bloquea el event loop"""
+        if not self._slots.acquire(blocking=False):
+            # Cola llena: la espera (hasta submit_timeout) se hace en un hilo
+            waiting = asyncio.get_running_loop().run_in_executor(
+                None, self._slots.acquire, True, self.submit_timeout
+            )
+            try:
+                acquired = await asyncio.shield(waiting)
+            except asyncio.CancelledError:
+                # El hilo puede tomar el cupo después de cancelar: devolverlo
+                waiting.add_done_callback(self._release_abandoned_slot)
+                raise
+            if not acquired:
+                self._reject()
+        return await asyncio.wrap_future(self._start(fn, *args))
+
+    def _release_abandoned_slot(self, waiting):
+        if not waiting.cancelled() and waiting.exception() is None and waiting.result():
+            self._slots.release()
+
+    def _start(self, fn, *args):
+        """Enviar la tarea al pool con un cupo ya tomado"""
+        with self._lock:
+            self._pending += 1
+            self._counters['submitted'] += 1
+
+        started = time.perf_counter()
+        try:
+            try:
+                future = self._get_executor().submit(fn, *args)
+            except BrokenProcessPool:
+                future = self._fallback_to_threads().submit(fn, *args)
+        except Exception:
+            self._release(started, 'failed')
+            raise
+
+        future.add_done_callback(lambda f: self._release(started, self._outcome(f)))
+        return future
+
+    @staticmethod
+    def _outcome(future):
+        # exception() lanza CancelledError en un future cancelado
+        if future.cancelled():
+            return 'cancelled'
+        return 'failed' if future.exception() is not None else 'completed'
+
+    def _release(self, started, outcome):
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self._pending -= 1
+            if outcome != 'cancelled':
+                # Un hash cancelado en cola no mide la latencia del pool
+                self._latencies.append(elapsed_ms)
+            self._counters[outcome] += 1
+        self._slots.release()
+
+    def submit_hash(self, password):
+        """Encolar el hash de una contraseña. Devuelve un Future[str]"""
+        hasher = self.hasher
+        return self._submit(_hash_password_task, _to_bytes(password), hasher.name, hasher.params())
+
+    def submit_verify(self, password, hashed_password):
+        """Encolar la verificación de una contraseña. Devuelve un Future[bool]"""
+        return self._submit(_verify_password_task, _to_bytes(password), hashed_password or '')
+
+    # ------------------------------------------------------------------
+    # APIs bloqueantes (controladores síncronos) y async
+    # ------------------------------------------------------------------
+    def hash_password(self, password, timeout=None):
+        """Generar hash esperando el resultado del pool"""
+        return self.submit_hash(password).result(timeout=timeout)
+
+    def verify_password(self, password, hashed_password, timeout=None):
+        """Verificar contraseña esperando el resultado del pool"""
+        return self.submit_verify(password, hashed_password).result(timeout=timeout)
+
+    async def hash_password_async(self, password):
+        """Generar hash sin bloquear el event loop (ni siquiera con la cola llena)"""
+        hasher = self.hasher
+        return await self._submit_async(_hash_password_task, _to_bytes(password), hasher.name, hasher.params())
+
+    async def verify_password_async(self, password, hashed_password):
+        """Verificar contraseña sin bloquear el event loop (ni siquiera con la cola llena)"""
+        return await self._submit_async(_verify_password_task, _to_bytes(password), hashed_password or '')
+
+    # ------------------------------------------------------------------
+    # Configuración del algoritmo y rehash
+    # ------------------------------------------------------------------
+    def configure(self, hasher):
+        """Cambiar el hasher usado para los hashes nuevos"""
+        self.hasher = hasher
+        return hasher
+
+    def needs_rehash(self, hashed_password):
+        """Indica si un hash almacenado no usa el algoritmo/costo actual"""
+        if not hashed_password:
+            return False
+        return self.hasher.needs_rehash(hashed_password)
+
+    def rehash_in_background(self, password, on_rehashed):
+        """
+        Generar un hash nuevo en el pool sin esperar el resultado
+
+        Args:
+            password (str): Contraseña en texto plano ya verificada
+            on_rehashed (callable): Recibe el hash nuevo cuando está listo
+        """
+        def _done(future):
+            if future.cancelled():
+                # P. ej. al cerrar el pool: se reintentará en el próximo login
+                return
+            if future.exception() is not None:
+                print(f'❌ Error en rehash en segundo plano: {future.exception()}')
+                return
+            try:
+                on_rehashed(future.result())
+            except Exception as e:
+                print(f'❌ Error guardando rehash: {e}')
+
+        try:
+            future = self.submit_hash(password)
+        except HashingServiceBusyError:
+            # El rehash es oportunista: se reintentará en el próximo login
+            return None
+        future.add_done_callback(_done)
+        return future
+
+    # ------------------------------------------------------------------
+    # Métricas
+    # ------------------------------------------------------------------
+    def get_metrics(self):
+        """Profundidad de cola, contadores y latencias (ms) del pool"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            metrics = dict(self._counters)
+            metrics.update({
+                'mode': self._active_mode or self.mode,
+                'max_workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'queue_depth': self._pending,
+                'hasher': {'name': self.hasher.name, 'params': self.hasher.params()},
+            })
+
+        def percentile(p):
+            if not latencies:
+                return 0.0
+            index = min(len(latencies) - 1, int(round(p / 100 * (len(latencies) - 1))))
+            return round(latencies[index], 2)
+
+        metrics['latency_ms'] = {
+            'avg': round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            'p50': percentile(50),
+            'p95': percentile(95),
+            'p99': percentile(99),
+        }
+        return metrics
+
+
+# Instancia global compartida por los controladores
+password_hasher = PasswordHashingService()
@@ -1,31 +1,33 @@
 """
 Servicio para crear la cadena de validación de perfil
 """
-from handlers.profile_validation_handler import (
-    full_nameValidationHandler,
-    EmailValidationHandler,
-    UsernameValidationHandler,
-    GenderValidationHandler,
-    PhoneValidationHandler,
-    AddressValidationHandler
-)
+import os
 
-def create_profile_validation_chain():
-    """Crear la cadena de validación para actualización de perfil"""
+from handlers.profile_validation_handler import UniqueFieldsValidationHandler
+from handlers.schema_validation_handler import SchemaValidationHandler
+from services.validation_schemas import validate_profile_update
+
+def build_profile_validation_chain():
+    """Construir la cadena de validación para actualización de perfil"""
     
-    # Crear instancias de cada handler
-    full_name_validator = full_nameValidationHandler()
-    email_validator = EmailValidationHandler()
-    username_validator = UsernameValidationHandler()
-    gender_validator = GenderValidationHandler()
-    phone_validator = PhoneValidationHandler()
-    address_validator = AddressValidationHandler()
+    # Todas las reglas de formato en una pasada, unicidad al final
+    schema_validator = SchemaValidationHandler(validate_profile_update, context_keys=('current_user_id',))
+    unique_fields = UniqueFieldsValidationHandler()
     
-    # Construir la cadena
-    full_name_validator.set_next(email_validator) \
-                     .set_next(username_validator) \
-                     .set_next(gender_validator) \
-                     .set_next(phone_validator) \
-                     .set_next(address_validator)
+    schema_validator.set_next(unique_fields)
     
-    return full_name_validator
+    return schema_validator.freeze()
+
+# Cómo detectar email/username en uso al actualizar el perfil:
+#   query  una consulta $or que además carga al usuario (por defecto)
+#   index  sin consulta previa: el índice único rechaza la escritura
+PROFILE_CONFLICT_CHECK = os.getenv('PROFILE_CONFLICT_CHECK', 'query').lower()
+if PROFILE_CONFLICT_CHECK not in ('query', 'index'):
+    raise ValueError(f'PROFILE_CONFLICT_CHECK desconocido: {PROFILE_CONFLICT_CHECK}')
+
+# Los handlers no tienen estado por request: una sola cadena por proceso
+_profile_validation_chain = build_profile_validation_chain()
+
+def create_profile_validation_chain():
+    """Obtener la cadena de validación de perfil (construida una sola vez)"""
+    return _profile_validation_chain
@@ -0,0 +1,74 @@
+"""
+Rate limiting de la API (Flask-Limiter) con políticas por endpoint y almacén compartido
+"""
+import math
+import os
+import time
+
+from flask_limiter import Limiter
+from flask_limiter.util import get_remote_address
+
+# Políticas por endpoint. Cada una es un scope compartido: las rutas legadas
+# (blueprints) y las de Swagger (flask_restx) que llaman al mismo controlador
+# consumen el mismo contador. Se pueden sobrescribir con RATE_LIMIT_<NOMBRE>.
+RATE_LIMIT_POLICIES = {
+    'register': '5 per minute;20 per hour',
+    'login': '20 per minute;200 per hour',
+    'google_login': '20 per minute;200 per hour',
+    'forgot_password': '3 per minute;10 per hour',
+    'verify_reset_token': '10 per minute;50 per hour',
+    'reset_password': '5 per minute;20 per hour',
+    'refresh_token': '30 per minute',
+    'logout': '30 per minute',
+    'profile_read': '120 per minute',
+    'profile_write': '30 per minute;300 per hour',
+    'change_password': '5 per minute;20 per hour',
+    'upload_picture': '5 per minute;30 per hour',
+}
+
+
+def rate_limit_policy(name):
+    """Límite configurado para una política (variable de entorno o valor por defecto)"""
+    return os.getenv(f'RATE_LIMIT_{name.upper()}', RATE_LIMIT_POLICIES[name])
+
+
+# El almacén se elige con RATE_LIMIT_STORAGE_URI: memory:// (por proceso),
+# redis://host:6379 o mongodb://host:27017 para compartir contadores entre workers.
+limiter = Limiter(
+    key_func=get_remote_address,
+    storage_uri=os.getenv('RATE_LIMIT_STORAGE_URI', 'memory://'),
+    strategy=os.getenv('RATE_LIMIT_STRATEGY', 'fixed-window'),
+    default_limits=[os.getenv('RATE_LIMIT_DEFAULT', '1000 per hour;100 per minute')],
+    in_memory_fallback_enabled=True,
+    headers_enabled=False,  # Los encabezados RateLimit-* se emiten en _inject_headers
+)
+
+
+def rate_limit(name):
+    """Decorador con la política `name`, compartida entre todas las rutas que la usan"""
+    return limiter.shared_limit(rate_limit_policy(name), scope=name)
+
+
+def _inject_headers(response):
+    """Encabezados RateLimit-* (draft IETF): límite, restantes y segundos hasta el reinicio"""
+    current = limiter.current_limit
+    if current is None:
+        return response
+
+    reset_in = max(0, math.ceil(current.reset_at - time.time()))
+    window = current.limit.get_expiry()
+    response.headers['RateLimit-Limit'] = str(current.limit.amount)
+    response.headers['RateLimit-Remaining'] = str(current.remaining)
+    response.headers['RateLimit-Reset'] = str(reset_in)
+    response.headers['RateLimit-Policy'] = f'{current.limit.amount};w={window}'
+    if response.status_code == 429 and 'Retry-After' not in response.headers:
+        response.headers['Retry-After'] = str(max(1, reset_in))
+    return response
+
+
+def init_rate_limiting(app):
+    """Aplicar el limiter a toda la aplicación (blueprints y namespaces de flask_restx)"""
+    app.config.setdefault('RATELIMIT_ENABLED', os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true')
+    limiter.init_app(app)
+    app.after_request(_inject_headers)
+    return limiter
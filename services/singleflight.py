@@ -0,0 +1,162 @@
+"""
+Coalescencia de lecturas idénticas concurrentes (singleflight)
+
+Si varios hilos (o tareas de asyncio) piden la misma lectura a la vez, solo
+el primero consulta MongoDB; los demás esperan y reciben el mismo resultado
+(o la misma excepción). No es una caché: en cuanto la consulta termina, la
+siguiente llamada vuelve a la BD.
+
+Solo se coalescen lecturas y se comparte el documento, no la instancia del
+modelo: cada llamador construye la suya con from_document, así un request no
+ve los cambios sin guardar de otro.
+
+Los modelos llaman a invalidate() después de cada escritura: una lectura que
+empieza después de escribir no se une a una que empezó antes (y que podría
+devolver el documento anterior a la escritura).
+"""
+import asyncio
+import os
+import threading
+
+
+class _Call:
+    """Consulta en curso compartida por los hilos que piden la misma clave"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Grupo de lecturas coalescidas por clave (hilos y asyncio)"""
+
+    def __init__(self, name, enabled=True):
+        self.name = name
+        self.enabled = enabled
+        self._calls = {}  # clave -> _Call
+        self._async_calls = {}  # (loop, clave) -> asyncio.Future
+        self._lock = threading.Lock()
+        self._generation = 0  # Avanza con cada escritura local (invalidate)
+        self._stats = {'calls': 0, 'executions': 0, 'shared': 0, 'errors': 0, 'invalidations': 0}
+
+    def _count(self, *stats):
+        with self._lock:
+            for stat in stats:
+                self._stats[stat] += 1
+
+    def invalidate(self):
+        """Las lecturas que empiecen desde ahora no se unen a las que están en curso"""
+        with self._lock:
+            self._generation += 1
+            self._stats['invalidations'] += 1
+
+    def do(self, key, fn):
+        """
+        Ejecutar fn() una sola vez para todos los hilos que piden `key` a la vez
+
+        Args:
+            key: Clave hashable que identifica la lectura (no la consulta
+                literal: las que incluyen la hora actual nunca coincidirían)
+            fn (callable): Lectura a ejecutar
+        """
+        if not self.enabled:
+            self._count('calls', 'executions')
+            return fn()
+
+        with self._lock:
+            self._stats['calls'] += 1
+            key = (self._generation, key)
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats['executions'] += 1
+            else:
+                self._stats['shared'] += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            self._count('errors')
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    async def do_async(self, key, fn):
+        """
+        Igual que do() para corrutinas: fn() devuelve un awaitable
+
+        Las tareas del mismo event loop que piden `key` mientras la primera
+        está en curso esperan su resultado.
+        """
+        if not self.enabled:
+            self._count('calls', 'executions')
+            return await fn()
+
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            async_key = (loop, self._generation, key)
+            self._stats['calls'] += 1
+            future = self._async_calls.get(async_key)
+            leader = future is None
+            if leader:
+                future = self._async_calls[async_key] = loop.create_future()
+                # Evitar "exception was never retrieved" si nadie más esperaba
+                future.add_done_callback(lambda f: f.cancelled() or f.exception())
+                self._stats['executions'] += 1
+            else:
+                self._stats['shared'] += 1
+
+        if not leader:
+            return await asyncio.shield(future)
+
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            self._count('errors')
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._async_calls[async_key]
+
+    def get_metrics(self):
+        """Llamadas, consultas ejecutadas y consultas ahorradas (shared)"""
+        with self._lock:
+            metrics = dict(self._stats)
+        metrics['saved_ratio'] = metrics['shared'] / metrics['calls'] if metrics['calls'] else 0.0
+        return metrics
+
+
+def singleflight_from_env(name):
+    """Crear un grupo; SINGLEFLIGHT_ENABLED=false ejecuta cada lectura por separado"""
+    return SingleFlight(name, enabled=os.getenv('SINGLEFLIGHT_ENABLED', 'true').lower() == 'true')
+
+
+# Instancias globales por colección
+user_flight = singleflight_from_env('users')
+reset_token_flight = singleflight_from_env('password_reset_tokens')
+
+
+def get_singleflight_metrics():
+    """Métricas de todos los grupos"""
+    return {flight.name: flight.get_metrics() for flight in (user_flight, reset_token_flight)}
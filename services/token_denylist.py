@@ -0,0 +1,245 @@
+"""
+Denylist de access tokens con un filtro de Bloom en memoria por worker
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import jwt
+
+from models.revoked_token import RevokedToken
+
+
+class BloomFilter:
+    """Filtro de Bloom simple sobre un bytearray (sin falsos negativos)"""
+
+    def __init__(self, capacity=100000, error_rate=0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(self.size / capacity * math.log(2))))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        # Double hashing: h1 + i*h2 a partir de un único SHA-256
+        digest = hashlib.sha256(key.encode('utf-8')).digest()
+        h1 = int.from_bytes(digest[:8], 'big')
+        h2 = int.from_bytes(digest[8:16], 'big') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class RevokedTokenError(jwt.InvalidTokenError):
+    """El token fue revocado (logout o revocación de sesiones)"""
+    pass
+
+
+class TokenDenylist:
+    """
+    Denylist respaldada en Mongo con un filtro de Bloom delante.
+
+    Comprobar un token cuesta una consulta al filtro en memoria; solo si el
+    filtro da positivo se consulta Mongo. El filtro se sincroniza de forma
+    incremental cada `sync_interval` segundos y se reconstruye completo cada
+    `rebuild_interval` segundos para descartar entradas ya expiradas.
+
+    La sync incremental vuelve a pedir los últimos `sync_overlap` segundos
+    antes de la marca: una revocación que se confirma tarde (o con un
+    revoked_at anterior al de otra ya leída) sigue entrando en la siguiente
+    sync en lugar de esperar a la reconstrucción completa.
+
+    Solo la carga inicial se hace en el hilo del request (sin ella el filtro
+    está vacío); las siguientes corren en un hilo en segundo plano y, si una
+    sigue en curso, los requests usan el filtro que ya hay.
+    """
+
+    def __init__(self, capacity=None, error_rate=0.01, sync_interval=None, rebuild_interval=None, sync_overlap=None):
+        self.capacity = capacity or int(os.getenv('DENYLIST_BLOOM_CAPACITY', 100000))
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval if sync_interval is not None else float(os.getenv('DENYLIST_SYNC_SECONDS', 5))
+        self.rebuild_interval = rebuild_interval if rebuild_interval is not None else float(
+            os.getenv('DENYLIST_REBUILD_SECONDS', 900)
+        )
+        self.sync_overlap = timedelta(seconds=sync_overlap if sync_overlap is not None else float(
+            os.getenv('DENYLIST_SYNC_OVERLAP_SECONDS', 30)
+        ))
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()  # Una sola sync a la vez
+        self._sync_thread = None
+        self._synced = False
+        self._bloom = BloomFilter(self.capacity, self.error_rate)
+        self._last_revoked_at = None
+        self._recent_keys = {}  # clave -> revoked_at dentro de la ventana de solapamiento
+        self._local_revocations = []  # (key, monotonic) revocadas en este worker
+        self._next_sync = 0.0
+        self._next_rebuild = 0.0
+        self._stats = {'checks': 0, 'bloom_positives': 0, 'db_lookups': 0, 'revoked': 0, 'syncs': 0}
+
+    # ------------------------------------------------------------------
+    # Sincronización del filtro
+    # ------------------------------------------------------------------
+    def sync(self, full=False):
+        """Cargar en el filtro las revocaciones nuevas (o todas si full=True)"""
+        since = None
+        if not full and self._last_revoked_at is not None:
+            since = self._last_revoked_at - self.sync_overlap
+        query_started = time.monotonic()
+        entries = RevokedToken.find_keys_since(since)
+
+        with self._lock:
+            bloom = BloomFilter(self.capacity, self.error_rate) if full else self._bloom
+            if full:
+                self._recent_keys = {}
+            for key, revoked_at in entries:
+                # Las entradas de la ventana de solapamiento ya cargadas se saltan
+                if self._recent_keys.get(key) != revoked_at:
+                    bloom.add(key)
+                    self._recent_keys[key] = revoked_at
+                if self._last_revoked_at is None or revoked_at > self._last_revoked_at:
+                    self._last_revoked_at = revoked_at
+            if self._last_revoked_at is not None:
+                window_start = self._last_revoked_at - self.sync_overlap
+                self._recent_keys = {
+                    key: revoked_at for key, revoked_at in self._recent_keys.items() if revoked_at >= window_start
+                }
+            if full:
+                # Conservar revocaciones locales ocurridas durante la consulta
+                self._local_revocations = [
+                    (key, revoked) for key, revoked in self._local_revocations if revoked >= query_started - 1
+                ]
+                for key, _ in self._local_revocations:
+                    bloom.add(key)
+            self._bloom = bloom
+            self._stats['syncs'] += 1
+            self._synced = True
+
+    def _maybe_sync(self):
+        if time.monotonic() < self._next_sync:
+            return
+        # Sin carga inicial hay que esperarla; después, si otro hilo ya sincroniza, seguir
+        if not self._sync_lock.acquire(blocking=not self._synced):
+            return
+        try:
+            now = time.monotonic()
+            if now < self._next_sync:
+                self._sync_lock.release()
+                return
+            full = now >= self._next_rebuild
+            self._next_sync = now + self.sync_interval
+            if full:
+                self._next_rebuild = now + self.rebuild_interval
+            if not self._synced:
+                self._run_sync(full)
+                return
+            self._sync_thread = threading.Thread(target=self._run_sync, args=(full,),
+                                                 name='denylist-sync', daemon=True)
+            self._sync_thread.start()
+        except BaseException:
+            self._sync_lock.release()
+            raise
+
+    def _run_sync(self, full):
+        # Libera el _sync_lock que tomó _maybe_sync
+        try:
+            self.sync(full=full)
+        except Exception as e:
+            print(f'⚠️ Error sincronizando denylist: {e}')
+        finally:
+            self._sync_lock.release()
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    # ------------------------------------------------------------------
+    # Consulta
+    # ------------------------------------------------------------------
+    def is_revoked(self, claims):
+        """Indica si un access token (sus claims) está revocado"""
+        self._maybe_sync()
+        self._count('checks')
+
+        jti = claims.get('jti')
+        user_key = RevokedToken.user_key(claims.get('userId'))
+
+        try:
+            if jti and jti in self._bloom:
+                self._count('bloom_positives')
+                if self._lookup(jti) is not None:
+                    return True
+
+            if user_key in self._bloom:
+                self._count('bloom_positives')
+                entry = self._lookup(user_key)
+                if entry is not None and entry.get('revoked_before'):
+                    # revoked_before es la hora del servidor (UTC sin zona horaria)
+                    revoked_before = entry['revoked_before'].replace(tzinfo=timezone.utc).timestamp()
+                    issued_at = claims.get('iat')
+                    if issued_at is None or issued_at < revoked_before:
+                        return True
+        except Exception as e:
+            # Ante un positivo que no se puede confirmar, se rechaza el token
+            print(f'⚠️ Error consultando denylist, se rechaza el token: {e}')
+            return True
+
+        return False
+
+    def _lookup(self, key):
+        self._count('db_lookups')
+        return RevokedToken.find_by_key(key)
+
+    # ------------------------------------------------------------------
+    # Revocación
+    # ------------------------------------------------------------------
+    def revoke_token(self, claims):
+        """Revocar un access token hasta su expiración"""
+        jti = claims.get('jti')
+        if not jti:
+            return False
+        expires_at = datetime.utcfromtimestamp(claims['exp']) if claims.get('exp') else (
+            datetime.utcnow() + timedelta(minutes=15)
+        )
+        RevokedToken.revoke(jti, claims['userId'], expires_at)
+        self._add_local(jti)
+        return True
+
+    def revoke_user(self, user_id, max_token_lifetime):
+        """
+        Revocar todas las sesiones de un usuario
+
+        Args:
+            user_id (str): ID del usuario
+            max_token_lifetime (timedelta): Vida máxima de un access token;
+                pasado ese tiempo ningún token anterior sigue vigente
+        """
+        key = RevokedToken.user_key(user_id)
+        RevokedToken.revoke_user(user_id, datetime.utcnow() + max_token_lifetime)
+        self._add_local(key)
+
+    def _add_local(self, key):
+        with self._lock:
+            self._bloom.add(key)
+            self._local_revocations.append((key, time.monotonic()))
+            self._stats['revoked'] += 1
+
+    def get_metrics(self):
+        with self._lock:
+            metrics = dict(self._stats)
+            metrics['bloom_entries'] = self._bloom.count
+            metrics['bloom_bits'] = self._bloom.size
+        return metrics
+
+
+# Instancia global (una por worker)
+token_denylist = TokenDenylist()
@@ -0,0 +1,293 @@
+"""
+Servicio de tokens JWT: emisión, refresh tokens y caché de claims verificados
+"""
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import jwt
+
+from models.refresh_token import RefreshToken
+from services.token_denylist import token_denylist, RevokedTokenError
+from services.key_ring import key_ring as default_key_ring
+
+
+class InvalidRefreshTokenError(Exception):
+    """Refresh token inexistente, expirado, revocado o reutilizado"""
+    pass
+
+
+class VerifiedTokenCache:
+    """
+    Caché LRU acotada de claims ya verificados.
+
+    La clave es el SHA-256 del token (el token nunca se guarda en claro) y
+    cada entrada expira en el `exp` del propio token.
+    """
+
+    def __init__(self, max_size=10000):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # digest -> (claims, expires_at)
+        self._by_user = {}  # user_id -> set(digest)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    @staticmethod
+    def digest(token):
+        """Huella del token usada como clave de la caché"""
+        if isinstance(token, str):
+            token = token.encode('utf-8')
+        return hashlib.sha256(token).hexdigest()
+
+    def get(self, token):
+        """Obtener claims de un token verificado (None si no está o expiró)"""
+        key = self.digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            claims, expires_at = entry
+            if expires_at is not None and time.time() >= expires_at:
+                self._remove(key)
+                self._stats['misses'] += 1
+                self._stats['evictions'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return dict(claims)
+
+    def put(self, token, claims):
+        """Guardar claims verificados hasta el `exp` del token"""
+        key = self.digest(token)
+        expires_at = claims.get('exp')
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (dict(claims), expires_at)
+            user_id = claims.get('userId')
+            if user_id is not None:
+                self._by_user.setdefault(user_id, set()).add(key)
+
+            while len(self._entries) > self.max_size:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, token):
+        """Eliminar un token de la caché (p.ej. al revocarlo)"""
+        with self._lock:
+            if self._remove(self.digest(token)):
+                self._stats['invalidations'] += 1
+
+    def invalidate_user(self, user_id):
+        """Eliminar todos los tokens cacheados de un usuario"""
+        with self._lock:
+            for key in list(self._by_user.get(user_id, ())):
+                if self._remove(key):
+                    self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def stats(self):
+        """Contadores de aciertos/fallos y tamaño actual"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['size'] = len(self._entries)
+            stats['max_size'] = self.max_size
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def _remove(self, key):
+        """Eliminar una entrada (requiere tener el lock)"""
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        user_id = entry[0].get('userId')
+        keys = self._by_user.get(user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[user_id]
+        return True
+
+
+class TokenService:
+    """
+    Emisión y verificación de JWT compartida por los blueprints y la API Swagger.
+
+    Los access tokens son de vida corta y se verifican solo en memoria; la
+    sesión larga se mantiene con refresh tokens opacos rotados en Mongo.
+
+    Con JWT_ALGORITHM=RS256/EdDSA los tokens se firman con la llave activa del
+    KeyRing (header `kid`) y otros servicios pueden verificarlos con el JWKS.
+    """
+
+    ALGORITHM = 'HS256'
+    MIN_ACCESS_TOKEN_MINUTES = 5
+    MAX_ACCESS_TOKEN_MINUTES = 15
+
+    def __init__(self, secret_key=None, cache_size=None, access_token_minutes=None, denylist=None, key_ring=None):
+        self._secret_key = secret_key
+        self.denylist = denylist
+        self.key_ring = key_ring
+        self.cache = VerifiedTokenCache(max_size=cache_size or int(os.getenv('JWT_CACHE_SIZE', 10000)))
+        minutes = access_token_minutes or int(os.getenv('ACCESS_TOKEN_TTL_MINUTES', 15))
+        self.access_token_minutes = max(self.MIN_ACCESS_TOKEN_MINUTES, min(self.MAX_ACCESS_TOKEN_MINUTES, minutes))
+
+    def init_app(self, app):
+        """Tomar el secreto de la configuración de la app (una sola vez)"""
+        self._secret_key = app.config['SECRET_KEY']
+
+    @property
+    def secret_key(self):
+        if self._secret_key is None:
+            self._secret_key = os.getenv('JWT_SECRET', 'mascotas_secret_key')
+        return self._secret_key
+
+    def issue_access_token(self, user_id):
+        """Crear un access token de vida corta"""
+        now = datetime.utcnow()
+        payload = {
+            'userId': str(user_id),
+            'type': 'access',
+            'jti': uuid.uuid4().hex,
+            'iat': time.time(),  # Con fracción de segundo para comparar con revocaciones por usuario
+            'exp': now + timedelta(minutes=self.access_token_minutes)
+        }
+        if self.key_ring is not None and self.key_ring.enabled:
+            signing_key = self.key_ring.active_key()
+            return jwt.encode(payload, signing_key.private_key, algorithm=signing_key.algorithm,
+                              headers={'kid': signing_key.kid})
+        return jwt.encode(payload, self.secret_key, algorithm=self.ALGORITHM)
+
+    def issue_token_pair(self, user_id, family_id=None):
+        """
+        Crear access token + refresh token (el refresh se guarda hasheado)
+
+        Returns:
+            dict: token, refreshToken y expiresIn (segundos del access token)
+        """
+        raw_refresh, refresh_hash = RefreshToken.generate_token()
+        RefreshToken(user_id=str(user_id), token=refresh_hash, family_id=family_id).save()
+
+        return {
+            'token': self.issue_access_token(user_id),
+            'refreshToken': raw_refresh,
+            'expiresIn': self.access_token_minutes * 60
+        }
+
+    def rotate_refresh_token(self, raw_refresh_token):
+        """
+        Consumir un refresh token y emitir un par nuevo de la misma familia
+
+        Si se presenta un refresh token ya usado se asume robo y se revoca
+        toda la familia.
+
+        Raises:
+            InvalidRefreshTokenError: Si el refresh token no es válido
+        """
+        token_hash = RefreshToken.hash_token(raw_refresh_token)
+        current = RefreshToken.consume(token_hash)
+
+        if current is None:
+            existing = RefreshToken.find_by_token(token_hash)
+            if existing is not None and existing.used:
+                RefreshToken.revoke_family(existing.family_id)
+            raise InvalidRefreshTokenError('Refresh token inválido o expirado')
+
+        return self.issue_token_pair(current.user_id, family_id=current.family_id)
+
+    def verify_token(self, token):
+        """
+        Verificar un JWT usando la caché de claims y la denylist
+
+        Returns:
+            dict: Claims del token
+
+        Raises:
+            jwt.ExpiredSignatureError: Si el token expiró
+            RevokedTokenError: Si el token fue revocado
+            jwt.InvalidTokenError: Si el token no es válido
+        """
+        claims = self.cache.get(token)
+        if claims is None:
+            claims = self._decode(token)
+            self.cache.put(token, claims)
+
+        if self.denylist is not None and self.denylist.is_revoked(claims):
+            self.cache.invalidate(token)
+            raise RevokedTokenError('Token revocado')
+        return claims
+
+    def _decode(self, token):
+        """Verificar firma y expiración (HS256 o llave del KeyRing según `kid`)"""
+        if self.key_ring is None or not self.key_ring.enabled:
+            return jwt.decode(token, self.secret_key, algorithms=[self.ALGORITHM])
+
+        kid = jwt.get_unverified_header(token).get('kid')
+        signing_key = self.key_ring.get_key(kid) if kid else None
+        if signing_key is None:
+            raise jwt.InvalidTokenError('Llave de firma desconocida o retirada')
+        return jwt.decode(token, signing_key.public_key, algorithms=[signing_key.algorithm])
+
+    def revoke_access_token(self, token, claims):
+        """Revocar el access token actual (logout)"""
+        if self.denylist is not None:
+            self.denylist.revoke_token(claims)
+        self.cache.invalidate(token)
+
+    def revoke_refresh_token(self, raw_refresh_token, user_id):
+        """Revocar la sesión (familia) de un refresh token del usuario"""
+        existing = RefreshToken.find_by_token(RefreshToken.hash_token(raw_refresh_token))
+        if existing is None or existing.user_id != str(user_id):
+            return False
+        RefreshToken.revoke_family(existing.family_id)
+        return True
+
+    def revoke_all_sessions(self, user_id):
+        """Revocar todos los access y refresh tokens de un usuario"""
+        if self.denylist is not None:
+            self.denylist.revoke_user(user_id, timedelta(minutes=self.MAX_ACCESS_TOKEN_MINUTES))
+        RefreshToken.revoke_user_tokens(user_id)
+        self.cache.invalidate_user(str(user_id))
+
+    def invalidate_token(self, token):
+        """Sacar un token revocado de la caché"""
+        self.cache.invalidate(token)
+
+    def invalidate_user_tokens(self, user_id):
+        """Sacar de la caché todos los tokens de un usuario"""
+        self.cache.invalidate_user(user_id)
+
+    def get_metrics(self):
+        return self.cache.stats()
+
+
+def extract_bearer_token(auth_header):
+    """
+    Extraer el token de un header "Authorization: Bearer <token>"
+
+    Returns:
+        str or None: Token, o None si no se envió
+
+    Raises:
+        IndexError: Si el header no tiene el formato esperado
+    """
+    if not auth_header:
+        return None
+    return auth_header.split(" ")[1]
+
+
+# Instancia global compartida
+token_service = TokenService(denylist=token_denylist, key_ring=default_key_ring)
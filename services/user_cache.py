@@ -0,0 +1,271 @@
+"""
+Caché read-through de documentos de usuario por id, email y username
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Valor que invalidate() deja en `id:<id>` durante unos segundos: bloquea que
+# una lectura iniciada antes de la escritura vuelva a guardar el documento viejo
+TOMBSTONE = '__invalidated__'
+
+
+def _version(user_data):
+    return user_data.get('version') or 0
+
+
+class MemoryUserCacheBackend:
+    """LRU acotada con TTL en memoria del proceso (un worker)"""
+
+    def __init__(self, max_size=10000, clock=time.monotonic):
+        self.max_size = max_size
+        self.clock = clock
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if self.clock() >= expires_at:
+                del self._entries[key]
+                self.evictions += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl_seconds):
+        with self._lock:
+            self._entries[key] = (value, self.clock() + ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def put_document(self, key, value, ttl_seconds):
+        """
+        Guardar un documento salvo que haya un tombstone o una versión más nueva
+
+        Returns:
+            bool: False si no se guardó
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.clock() < entry[1]:
+                current = entry[0]
+                if current == TOMBSTONE or (isinstance(current, dict) and _version(current) > _version(value)):
+                    return False
+            self._entries[key] = (value, self.clock() + ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'evictions': self.evictions}
+
+
+class RedisUserCacheBackend:
+    """
+    Caché compartida entre workers en Redis
+
+    Un save() en cualquier worker borra la entrada para todos. Requiere el
+    paquete opcional `redis`.
+    """
+
+    def __init__(self, url, prefix='user-cache:'):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError('USER_CACHE_BACKEND=redis requiere instalar redis')
+        import bson
+
+        self._bson = bson
+        self._client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self._client.get(self.prefix + key)
+        if value is None:
+            return None
+        if value == TOMBSTONE.encode('utf-8'):
+            return TOMBSTONE
+        # Los documentos se guardan en BSON para conservar ObjectId y datetime
+        return self._bson.decode(value) if key.startswith('id:') else value.decode('utf-8')
+
+    def set(self, key, value, ttl_seconds):
+        data = self._bson.encode(value) if isinstance(value, dict) else value
+        self._client.set(self.prefix + key, data, ex=max(1, int(ttl_seconds)))
+
+    def put_document(self, key, value, ttl_seconds):
+        """
+        Guardar un documento solo si la clave está libre (SET NX)
+
+        Redis no compara versiones: una entrada existente (documento o
+        tombstone) nunca se reemplaza; un documento desactualizado lo borra
+        la escritura que lo cambió.
+        """
+        return bool(self._client.set(self.prefix + key, self._bson.encode(value), ex=max(1, int(ttl_seconds)), nx=True))
+
+    def delete(self, key):
+        self._client.delete(self.prefix + key)
+
+    def clear(self):
+        for key in self._client.scan_iter(self.prefix + '*'):
+            self._client.delete(key)
+
+    def stats(self):
+        return {}
+
+
+class UserCache:
+    """
+    Caché read-through de documentos de la colección users.
+
+    El documento se guarda bajo su id; email y username son alias que apuntan
+    al id, así que invalidar un usuario solo requiere borrar `id:<id>`. Un
+    alias viejo (p. ej. tras cambiar el email) se detecta comparando el campo
+    del documento y cuenta como miss. Los errores del backend no rompen la
+    lectura: se va directo a la BD.
+
+    invalidate() deja un tombstone de `tombstone_seconds` en lugar de solo
+    borrar: si una lectura cargó el documento antes de la escritura, su put()
+    posterior no lo vuelve a guardar por todo el TTL. put() tampoco reemplaza
+    un documento con una `version` más nueva.
+    """
+
+    KEY_FIELDS = ('email', 'username')
+
+    def __init__(self, backend=None, ttl_seconds=30, enabled=True, tombstone_seconds=5):
+        self.backend = backend or MemoryUserCacheBackend()
+        self.ttl_seconds = ttl_seconds
+        self.tombstone_seconds = tombstone_seconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0, 'stale_puts': 0, 'backend_errors': 0}
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _lookup(self, field, value):
+        user_id = value if field == '_id' else self.backend.get(f'{field}:{value}')
+        if user_id is None:
+            return None
+        user_data = self.backend.get(f'id:{user_id}')
+        if user_data is None or user_data == TOMBSTONE or (field != '_id' and user_data.get(field) != value):
+            return None
+        return user_data
+
+    def _cached(self, field, value):
+        """Documento en caché o None (cuenta hit/miss; None también si el backend falla)"""
+        try:
+            user_data = self._lookup(field, value)
+        except Exception as e:
+            print(f'⚠️ Error leyendo caché de usuarios: {e}')
+            self._count('backend_errors')
+            return None
+        self._count('hits' if user_data is not None else 'misses')
+        return user_data
+
+    def get(self, field, value, loader):
+        """
+        Obtener un documento por '_id', 'email' o 'username'
+
+        Args:
+            field (str): Campo por el que se busca
+            value (str): Valor buscado (id como string)
+            loader (callable): Lee el documento de la BD en caso de miss
+        """
+        if not self.enabled:
+            return loader()
+
+        user_data = self._cached(field, value)
+        if user_data is None:
+            user_data = loader()
+            if user_data is not None:
+                self.put(user_data)
+        return user_data
+
+    async def get_async(self, field, value, loader):
+        """Igual que get() pero con un loader que devuelve un awaitable"""
+        if not self.enabled:
+            return await loader()
+
+        user_data = self._cached(field, value)
+        if user_data is None:
+            user_data = await loader()
+            if user_data is not None:
+                self.put(user_data)
+        return user_data
+
+    def put(self, user_data):
+        """Guardar un documento completo y sus alias (no si fue invalidado hace poco)"""
+        user_id = str(user_data['_id'])
+        try:
+            if not self.backend.put_document(f'id:{user_id}', user_data, self.ttl_seconds):
+                self._count('stale_puts')
+                return
+            for field in self.KEY_FIELDS:
+                if user_data.get(field):
+                    self.backend.set(f'{field}:{user_data[field]}', user_id, self.ttl_seconds)
+        except Exception as e:
+            print(f'⚠️ Error escribiendo caché de usuarios: {e}')
+            self._count('backend_errors')
+
+    def invalidate(self, user_id):
+        """Descartar el documento de un usuario (tras cualquier escritura)"""
+        if not self.enabled or user_id is None:
+            return
+        try:
+            self.backend.set(f'id:{user_id}', TOMBSTONE, self.tombstone_seconds)
+            self._count('invalidations')
+        except Exception as e:
+            print(f'⚠️ Error invalidando caché de usuarios: {e}')
+            self._count('backend_errors')
+
+    def clear(self):
+        self.backend.clear()
+
+    def get_metrics(self):
+        with self._lock:
+            metrics = dict(self._stats)
+        lookups = metrics['hits'] + metrics['misses']
+        metrics['hit_rate'] = metrics['hits'] / lookups if lookups else 0.0
+        metrics.update(self.backend.stats())
+        return metrics
+
+
+def user_cache_from_env():
+    """Crear la caché según USER_CACHE_BACKEND (memory | redis | disabled)"""
+    backend_name = os.getenv('USER_CACHE_BACKEND', 'memory').lower()
+    ttl_seconds = float(os.getenv('USER_CACHE_TTL_SECONDS', '30'))
+    tombstone_seconds = float(os.getenv('USER_CACHE_TOMBSTONE_SECONDS', '5'))
+    if backend_name == 'disabled':
+        return UserCache(enabled=False)
+    if backend_name == 'redis':
+        backend = RedisUserCacheBackend(os.getenv('USER_CACHE_REDIS_URL', 'redis://localhost:6379/0'))
+        return UserCache(backend=backend, ttl_seconds=ttl_seconds, tombstone_seconds=tombstone_seconds)
+    if backend_name != 'memory':
+        raise ValueError(f'Backend de caché de usuarios desconocido: {backend_name}')
+    max_size = int(os.getenv('USER_CACHE_MAX_SIZE', '10000'))
+    return UserCache(backend=MemoryUserCacheBackend(max_size=max_size), ttl_seconds=ttl_seconds,
+                     tombstone_seconds=tombstone_seconds)
+
+
+# Instancia global
+user_cache = user_cache_from_env()
@@ -1,31 +1,29 @@
 """
 Servicio para crear la cadena de validación de usuarios
 """
-from handlers.user_creation_handler import (
-    RequiredFieldsHandler,
-    full_nameHandler,
-    ValidEmailHandler,
-    PasswordLengthHandler,
-    StrongPasswordHandler,
-    ExistingUserHandler
-)
+import os
 
-def create_user_validation_chain():
-    """Crear la cadena de validación para registro de usuarios"""
+from handlers.schema_validation_handler import SchemaValidationHandler
+from handlers.user_creation_handler import ExistingUserHandler
+from services.validation_schemas import validate_registration
+
+def build_user_validation_chain():
+    """Construir la cadena de validación para registro de usuarios"""
     
-    # Crear instancias de cada handler
-    required_fields = RequiredFieldsHandler()
-    full_name_validator = full_nameHandler()
-    email_validator = ValidEmailHandler()
-    password_length = PasswordLengthHandler()
-    password_strength = StrongPasswordHandler()
+    # Todas las reglas de formato en una pasada, consulta a la BD al final
+    schema_validator = SchemaValidationHandler(validate_registration)
     existing_user = ExistingUserHandler()
     
-    # Construir la cadena
-    required_fields.set_next(full_name_validator) \
-                  .set_next(email_validator) \
-                  .set_next(password_length) \
-                  .set_next(password_strength) \
-                  .set_next(existing_user)
+    schema_validator.set_next(existing_user)
     
-    return required_fields
+    return schema_validator.freeze()
+
+# Reportar todos los errores de validación en lugar de solo el primero
+COLLECT_VALIDATION_ERRORS = os.getenv('VALIDATION_COLLECT_ERRORS', 'false').lower() == 'true'
+
+# Los handlers no tienen estado por request: una sola cadena por proceso
+_user_validation_chain = build_user_validation_chain()
+
+def create_user_validation_chain():
+    """Obtener la cadena de validación de registro (construida una sola vez)"""
+    return _user_validation_chain
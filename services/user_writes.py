@@ -0,0 +1,46 @@
+"""
+Escrituras de usuario con concurrencia optimista
+
+User.save() solo aplica un update si el documento sigue en la versión leída;
+si otro request lo guardó antes, lanza UserVersionConflictError. Aquí se
+reintenta: se recarga el usuario y se vuelven a aplicar los cambios sobre la
+versión actual, sin locks ni transacciones.
+"""
+import os
+
+from models.user import UserVersionConflictError
+
+# Reintentos después del primer intento (0 = fallar en el primer conflicto)
+USER_WRITE_RETRIES = int(os.getenv('USER_WRITE_RETRIES', '3'))
+
+
+def save_with_retry(user, apply, retries=None):
+    """
+    Aplicar cambios a un usuario y guardarlo, reintentando ante conflictos
+
+    Args:
+        user (User): Usuario cargado de la BD
+        apply (callable): apply(user) hace los cambios; se vuelve a llamar tras
+            cada recarga, y puede lanzar UserVersionConflictError para abortar
+            si la nueva versión invalida la operación
+        retries (int): Reintentos máximos (por defecto USER_WRITE_RETRIES)
+
+    Returns:
+        El resultado de user.save()
+
+    Raises:
+        UserVersionConflictError: Si se agotan los reintentos
+    """
+    if retries is None:
+        retries = USER_WRITE_RETRIES
+
+    attempt = 0
+    while True:
+        apply(user)
+        try:
+            return user.save()
+        except UserVersionConflictError:
+            if attempt >= retries or not user.refresh():
+                raise
+            attempt += 1
+            print(f'🔁 Conflicto de versión guardando usuario {user._id}, reintento {attempt}/{retries}')
@@ -0,0 +1,91 @@
+"""
+Schemas de los payloads de usuario (registro, perfil y contraseñas)
+
+Única fuente de las reglas de validación: los handlers, los controladores y
+User.validate_* usan estos validadores y patrones, compilados una sola vez.
+"""
+import re
+
+from utils.schema import Field, Schema
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+USERNAME_PATTERN = re.compile(r'^[a-zA-Z0-9_]{3,20}$')
+PHONE_PATTERN = re.compile(r'^[\+]?[\d\s\-\(\)]{7,20}$')
+# Mayúscula, minúscula y número
+STRONG_PASSWORD_PATTERN = re.compile(r'(?=.*[a-z])(?=.*[A-Z])(?=.*\d)')
+GENDERS = ('male', 'female', 'other', 'prefer_not_to_say')
+
+EMAIL_FORMAT_MESSAGE = 'El formato del correo electrónico no es válido'
+# Mensaje que siempre devolvió PUT /profile (la cadena de validación usa el anterior)
+PROFILE_EMAIL_FORMAT_MESSAGE = 'Formato de correo inválido'
+FULL_NAME_MESSAGE = 'El nombre debe tener al menos 2 caracteres'
+# Email o username que ya usa otro usuario al actualizar el perfil
+UNIQUE_FIELD_MESSAGES = {
+    'email': 'El correo ya está en uso por otro usuario',
+    'username': 'El nombre de usuario ya está en uso'
+}
+
+
+def password_field(subject='La contraseña', required_message=None):
+    """Nueva contraseña: al menos 6 caracteres con mayúscula, minúscula y número"""
+    return Field(required=True, strip=False, min_length=6, pattern=STRONG_PASSWORD_PATTERN, messages={
+        'required': required_message,
+        'type': f'{subject} debe tener al menos 6 caracteres',
+        'min_length': f'{subject} debe tener al menos 6 caracteres',
+        'pattern': f'{subject} debe contener al menos una mayúscula, una minúscula y un número',
+    })
+
+
+REGISTRATION_SCHEMA = Schema({
+    'full_name': Field(required=True, min_length=2, message=FULL_NAME_MESSAGE),
+    'email': Field(required=True, lower=True, pattern=EMAIL_PATTERN, message=EMAIL_FORMAT_MESSAGE),
+    'password': password_field(),
+}, required_message='Todos los campos son obligatorios (nombre, email, contraseña)')
+
+
+def profile_update_schema(email_message=EMAIL_FORMAT_MESSAGE):
+    """Campos actualizables del perfil (todos opcionales, al menos uno)"""
+    return Schema({
+        'full_name': Field(min_length=2, message=FULL_NAME_MESSAGE),
+        'email': Field(lower=True, pattern=EMAIL_PATTERN, message=email_message),
+        'username': Field(nullable=True, pattern=USERNAME_PATTERN,
+                          message='Username inválido. Debe tener 3-20 caracteres y solo letras, números y guiones bajos'),
+        'profilePicture': Field(nullable=True, string=False),
+        'gender': Field(nullable=True, lower=True, choices=GENDERS,
+                        message='Género inválido. Opciones: male, female, other, prefer_not_to_say'),
+        'address': Field(nullable=True, min_length=5, max_length=200,
+                         message='Dirección inválida. Debe tener entre 5 y 200 caracteres'),
+        'phoneNumber': Field(nullable=True, pattern=PHONE_PATTERN, message='Número de teléfono inválido'),
+    }, unknown_message='Campos no permitidos: {fields}',
+       empty_message='Debe proporcionar al menos un campo para actualizar')
+
+
+PROFILE_UPDATE_SCHEMA = profile_update_schema()
+# Mismo schema con el mensaje de email de ProfileController.update_profile
+PROFILE_REQUEST_SCHEMA = profile_update_schema(PROFILE_EMAIL_FORMAT_MESSAGE)
+
+PASSWORD_CHANGE_SCHEMA = Schema({
+    'currentPassword': Field(required=True, strip=False, message='Contraseña actual y nueva son obligatorias'),
+    'newPassword': password_field('La nueva contraseña'),
+}, required_message='Contraseña actual y nueva son obligatorias')
+
+PASSWORD_RESET_REQUEST_SCHEMA = Schema({
+    'email': Field(required=True, lower=True, pattern=EMAIL_PATTERN, messages={
+        'required': 'El correo electrónico es obligatorio',
+        'type': 'Formato de email inválido en la solicitud.',
+        'pattern': EMAIL_FORMAT_MESSAGE,
+    }),
+})
+
+PASSWORD_RESET_SCHEMA = Schema({
+    'token': Field(required=True, message='Token requerido'),
+    'newPassword': password_field(required_message='La nueva contraseña es obligatoria'),
+})
+
+# Validadores compilados: validate(data) -> (datos normalizados, [(campo, mensaje)])
+validate_registration = REGISTRATION_SCHEMA.compile()
+validate_profile_update = PROFILE_UPDATE_SCHEMA.compile()
+validate_profile_request = PROFILE_REQUEST_SCHEMA.compile()
+validate_password_change = PASSWORD_CHANGE_SCHEMA.compile()
+validate_password_reset_request = PASSWORD_RESET_REQUEST_SCHEMA.compile()
+validate_password_reset = PASSWORD_RESET_SCHEMA.compile()
@@ -0,0 +1,221 @@
+"""
+Tests para los repositorios asíncronos de User y PasswordResetToken
+"""
+import pytest
+import sys
+import os
+import asyncio
+import time
+from datetime import datetime
+from unittest.mock import patch
+
+import bson
+from flask import Flask
+from pymongo.errors import DuplicateKeyError
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.async_repository import (
+    MotorPasswordResetTokenRepository,
+    MotorUserRepository,
+    ThreadUserRepository,
+    create_repositories,
+)
+from models.user import DuplicateUserFieldError, User, UserVersionConflictError
+from services.identity_map import request_metrics
+from services.user_cache import UserCache
+
+USER_DOCUMENT = {
+    '_id': bson.ObjectId('507f1f77bcf86cd799439011'),
+    'full_name': 'Test User',
+    'email': 'test@example.com',
+    'password': '$2b$12$' + 'x' * 53,
+    'username': 'testuser',
+    'createdAt': datetime(2024, 1, 1),
+    'updatedAt': datetime(2024, 1, 1),
+}
+LATENCY = 0.1
+
+
+class SlowCollection:
+    """Colección síncrona con latencia de red simulada"""
+
+    def find_one(self, query, projection=None, **kwargs):
+        time.sleep(LATENCY)
+        return dict(USER_DOCUMENT)
+
+
+class AsyncCollection:
+    """Colección al estilo Motor: cada operación es una corrutina"""
+
+    def __init__(self, document=None, matched_count=1, insert_error=None):
+        self.document = document
+        self.matched_count = matched_count
+        self.insert_error = insert_error
+        self.calls = []
+
+    async def find_one(self, query, projection=None, **kwargs):
+        self.calls.append(('find_one', query))
+        await asyncio.sleep(LATENCY)
+        return dict(self.document) if self.document else None
+
+    async def update_one(self, query, update):
+        self.calls.append(('update_one', update))
+        return type('UpdateResult', (), {'matched_count': self.matched_count, 'modified_count': self.matched_count})()
+
+    async def insert_one(self, document):
+        self.calls.append(('insert_one', document))
+        if self.insert_error is not None:
+            raise self.insert_error
+        return type('InsertResult', (), {'inserted_id': bson.ObjectId()})()
+
+    async def find_one_and_update(self, query, update, return_document=None):
+        self.calls.append(('find_one_and_update', query))
+        return dict(self.document, used=True) if self.document else None
+
+
+class FakeMotorDatabase:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def get_db(self):
+        return type('Database', (), {'users': self.collection, 'password_reset_tokens': self.collection})()
+
+
+class TestAsyncRepositories:
+    """Tests para los drivers thread y motor"""
+
+    @pytest.mark.asyncio
+    async def test_thread_driver_overlaps_lookups(self):
+        """Test que dos consultas con asyncio.gather no se serializan"""
+        repository = ThreadUserRepository()
+        with patch('models.user.user_cache', UserCache(enabled=False)), \
+             patch.object(User, 'get_collection', return_value=SlowCollection()):
+            started = time.perf_counter()
+            by_email, by_username = await asyncio.gather(
+                repository.find_by_email('test@example.com'),
+                repository.find_by_username('testuser'),
+            )
+            elapsed = time.perf_counter() - started
+
+        assert by_email._id == by_username._id == str(USER_DOCUMENT['_id'])
+        assert elapsed < LATENCY * 1.8
+
+    @pytest.mark.asyncio
+    async def test_motor_driver_overlaps_lookups_and_uses_cache(self):
+        """Test que el driver motor no bloquea el loop y pasa por la caché"""
+        collection = AsyncCollection(USER_DOCUMENT)
+        repository = MotorUserRepository(FakeMotorDatabase(collection))
+        cache = UserCache()
+        with patch('models.async_repository.user_cache', cache):
+            started = time.perf_counter()
+            await asyncio.gather(repository.find_by_id(str(USER_DOCUMENT['_id'])),
+                                 repository.find_by_username('testuser'))
+            assert time.perf_counter() - started < LATENCY * 1.8
+
+            user = await repository.find_by_email('test@example.com')
+
+        assert user.full_name == 'Test User'
+        assert len(collection.calls) == 2
+        assert cache.get_metrics()['hits'] == 1
+
+    @pytest.mark.asyncio
+    async def test_motor_save_sends_only_changed_fields(self):
+        """Test que save() del driver motor respeta el dirty tracking de User"""
+        collection = AsyncCollection()
+        repository = MotorUserRepository(FakeMotorDatabase(collection))
+        user = User.from_document(USER_DOCUMENT)
+        user.full_name = 'Otro Nombre'
+
+        with patch('models.async_repository.user_cache', UserCache()):
+            await repository.save(user)
+            await repository.save(user)
+
+        assert len(collection.calls) == 1
+        _, update = collection.calls[0]
+        assert set(update['$set']) == {'full_name', 'updatedAt'}
+
+    @pytest.mark.asyncio
+    async def test_motor_consume_is_single_round_trip(self):
+        """Test que consume() usa un solo find_one_and_update"""
+        collection = AsyncCollection({
+            '_id': bson.ObjectId(), 'user_id': USER_DOCUMENT['_id'], 'token': 'hash',
+            'expires_at': datetime(2100, 1, 1), 'used': False,
+        })
+        repository = MotorPasswordResetTokenRepository(FakeMotorDatabase(collection))
+
+        token = await repository.consume('hash')
+
+        assert token.used is True
+        assert [name for name, _ in collection.calls] == ['find_one_and_update']
+
+    @pytest.mark.asyncio
+    async def test_motor_reads_use_the_request_identity_map(self):
+        """Test que el driver motor reutiliza la instancia del request y cuenta sus consultas"""
+        collection = AsyncCollection(USER_DOCUMENT)
+        repository = MotorUserRepository(FakeMotorDatabase(collection))
+
+        with Flask(__name__).test_request_context(), \
+             patch('models.async_repository.user_cache', UserCache(enabled=False)):
+            user = await repository.find_by_id(str(USER_DOCUMENT['_id']))
+
+            assert await repository.find_by_email('Test@Example.com') is user
+            assert await repository.find_credentials_by_email('test@example.com') is user
+            assert len(collection.calls) == 1
+            assert request_metrics()['queries'] == {'find_one': 1}
+
+    @pytest.mark.asyncio
+    async def test_motor_writes_share_the_model_bookkeeping(self):
+        """Test que save() de motor aplica conflicto de versión, identity map y errores de User"""
+        stale = AsyncCollection(matched_count=0)
+        user = User.from_document(dict(USER_DOCUMENT, version=3))
+        user.full_name = 'Otro Nombre'
+
+        with Flask(__name__).test_request_context():
+            with pytest.raises(UserVersionConflictError):
+                await MotorUserRepository(FakeMotorDatabase(stale)).save(user)
+
+            new_user = User(full_name='Nuevo', email='nuevo@example.com', password='hash')
+            await MotorUserRepository(FakeMotorDatabase(AsyncCollection())).save(new_user)
+            assert await MotorUserRepository(FakeMotorDatabase(AsyncCollection())).find_by_id(
+                str(new_user._id)) is new_user
+            assert request_metrics()['queries'] == {'update_one': 1, 'insert_one': 1}
+
+        duplicate = AsyncCollection(insert_error=DuplicateKeyError(
+            'E11000', details={'keyPattern': {'email': 1}}))
+        with pytest.raises(DuplicateUserFieldError) as error:
+            await MotorUserRepository(FakeMotorDatabase(duplicate)).save(
+                User(full_name='Nuevo', email='nuevo@example.com', password='hash'))
+        assert error.value.field == 'email'
+
+    def test_driver_selection(self):
+        """Test que thread no necesita Motor y motor exige tenerlo instalado"""
+        users, tokens = create_repositories('thread')
+        assert isinstance(users, ThreadUserRepository)
+
+        with pytest.raises(ValueError):
+            create_repositories('gevent')
+
+        try:
+            import motor  # noqa: F401
+        except ImportError:
+            with pytest.raises(ImportError):
+                create_repositories('motor')
+
+    @pytest.mark.asyncio
+    async def test_existing_user_handler_uses_repository(self):
+        """Test que la cadena de registro consulta la BD vía el repositorio async"""
+        from handlers.user_creation_handler import ExistingUserHandler
+
+        responses = []
+        with patch('handlers.user_creation_handler.user_repository') as mock_repository:
+            async def find_conflicts(email=None, username=None, exclude_id=None):
+                return ['email']
+            mock_repository.find_conflicts = find_conflicts
+
+            passed = await ExistingUserHandler().handle({'email': 'test@example.com'},
+                                                       lambda data, status: responses.append(status))
+
+        assert passed is False
+        assert responses == [400]
@@ -0,0 +1,110 @@
+"""
+Tests para el event loop persistente de los controladores async
+"""
+import pytest
+import sys
+import os
+import asyncio
+import threading
+
+from flask import Flask, current_app
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.async_runner import AsyncRunner
+
+
+async def running_loop():
+    return asyncio.get_running_loop()
+
+
+class TestAsyncRunner:
+    """Tests para AsyncRunner"""
+
+    def test_reuses_one_loop_across_calls(self):
+        """Test que todas las llamadas comparten el mismo loop"""
+        runner = AsyncRunner()
+        try:
+            loops = {runner.run(running_loop()) for _ in range(5)}
+            assert len(loops) == 1
+            assert runner.get_metrics() == {'runs': 5, 'errors': 0, 'loop_starts': 1}
+        finally:
+            runner.stop(timeout=1)
+
+    def test_concurrent_callers_share_the_loop(self):
+        """Test que requests en hilos distintos usan el mismo loop"""
+        runner = AsyncRunner()
+        results = []
+
+        async def slow():
+            await asyncio.sleep(0.05)
+            return asyncio.get_running_loop()
+
+        threads = [threading.Thread(target=lambda: results.append(runner.run(slow()))) for _ in range(4)]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert len(results) == 4 and len(set(results)) == 1
+        finally:
+            runner.stop(timeout=1)
+
+    def test_full_hash_queue_does_not_stall_other_requests(self):
+        """Test que un request esperando cupo de hashing no detiene el loop compartido"""
+        from services.password_hashers import BcryptHasher
+        from services.password_hashing_service import PasswordHashingService
+
+        runner = AsyncRunner()
+        service = PasswordHashingService(max_workers=1, max_pending=1, mode='thread', hasher=BcryptHasher(rounds=4))
+        release = threading.Event()
+        waiting = []
+        try:
+            service._submit(release.wait)  # Cola llena
+            hashing = threading.Thread(
+                target=lambda: waiting.append(runner.run(service.hash_password_async('Password123')))
+            )
+            hashing.start()
+
+            # Otro request en el mismo loop responde mientras el primero espera
+            assert runner.run(running_loop(), timeout=1) is not None
+            assert waiting == []
+
+            release.set()
+            hashing.join(timeout=10)
+            assert waiting[0].startswith('$2b$04$')
+        finally:
+            release.set()
+            runner.stop(timeout=1)
+            service.shutdown()
+
+    def test_propagates_exceptions(self):
+        """Test que los errores de la corrutina llegan a quien llama"""
+        runner = AsyncRunner()
+
+        async def failing():
+            raise ValueError('El correo ya está registrado')
+
+        try:
+            with pytest.raises(ValueError):
+                runner.run(failing())
+            assert runner.run(running_loop()) is not None
+            assert runner.get_metrics()['errors'] == 1
+        finally:
+            runner.stop(timeout=1)
+
+    def test_flask_context_is_visible_in_coroutine(self):
+        """Test que current_app funciona dentro de la corrutina"""
+        app = Flask('test_async_runner')
+        app.config['GOOGLE_CLIENT_ID'] = 'client-id'
+        runner = AsyncRunner()
+
+        async def read_config():
+            return current_app.config['GOOGLE_CLIENT_ID']
+
+        try:
+            with app.app_context():
+                assert runner.run(read_config()) == 'client-id'
+        finally:
+            runner.stop(timeout=1)
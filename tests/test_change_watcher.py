@@ -0,0 +1,249 @@
+"""
+Tests para el watcher de cambios (change streams y polling)
+"""
+import pytest
+import sys
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import bson
+from flask import Flask
+from pymongo.errors import OperationFailure
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.change_watcher import ChangeWatcher, INVALIDATE_ALL, init_change_watcher
+from models.change_stream_token import ChangeStreamToken
+from services.user_cache import TOMBSTONE, UserCache
+
+USER_ID = bson.ObjectId('507f1f77bcf86cd799439011')
+
+
+class MemoryTokenStore:
+    def __init__(self, token=None):
+        self.tokens = {'test': token} if token else {}
+        self.saves = 0
+
+    def load(self, name):
+        return self.tokens.get(name)
+
+    def save(self, name, token):
+        self.saves += 1
+        self.tokens[name] = token
+
+    def delete(self, name):
+        self.tokens.pop(name, None)
+
+
+class FakeStream:
+    """Change stream que entrega `changes` y luego se cierra"""
+
+    def __init__(self, changes, start=0):
+        self.changes = list(changes)
+        self.position = start
+        self.alive = True
+
+    @property
+    def resume_token(self):
+        return {'_data': self.position}
+
+    def try_next(self):
+        if self.position >= len(self.changes):
+            self.alive = False
+            return None
+        change = self.changes[self.position]
+        self.position += 1
+        return change
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+
+class FakeDatabase:
+    def __init__(self, changes=(), error=None, documents=None):
+        self.changes = changes
+        self.error = error
+        self.documents = documents or {}
+        self.watch_calls = []
+
+    def watch(self, pipeline, resume_after=None, max_await_time_ms=None):
+        self.watch_calls.append(resume_after)
+        if self.error is not None and (resume_after is not None or self.error.code == 40573):
+            raise self.error
+        return FakeStream(self.changes, start=resume_after['_data'] if resume_after else 0)
+
+    def __getitem__(self, collection):
+        database = self
+
+        class Collection:
+            def find(self, query, projection):
+                return database.documents.get(collection, [])
+        return Collection()
+
+
+def user_change(operation='update'):
+    return {'ns': {'db': 'mascotas-app', 'coll': 'users'}, 'operationType': operation,
+            'documentKey': {'_id': USER_ID}}
+
+
+class TestChangeWatcher:
+    """Tests para ChangeWatcher"""
+
+    def test_publishes_events_and_resumes_from_saved_token(self):
+        """Test que tras reiniciar se retoma desde el último resume token"""
+        store = MemoryTokenStore()
+        db = FakeDatabase(changes=[user_change(), user_change('delete')])
+        events = []
+        watcher = ChangeWatcher(db, name='test', token_store=store)
+        watcher.subscribe('users', events.append)
+
+        watcher.watch()
+
+        assert [event['operation'] for event in events] == ['update', 'delete']
+        assert events[0]['document_id'] == USER_ID
+        assert store.tokens['test'] == {'_data': 2}
+
+        db.changes = db.changes + [user_change()]
+        ChangeWatcher(db, name='test', token_store=store).watch()
+        assert db.watch_calls[-1] == {'_data': 2}
+
+    def test_checkpoints_are_batched(self):
+        """Test que el token no se guarda en cada evento durante una ráfaga"""
+        store = MemoryTokenStore()
+        watcher = ChangeWatcher(FakeDatabase(changes=[user_change()] * 50), name='test', token_store=store)
+
+        watcher.watch()
+
+        assert store.saves <= 2
+        assert store.tokens['test'] == {'_data': 50}
+
+    def test_lost_resume_token_resets_subscribers(self):
+        """Test que un token fuera del oplog reinicia el stream y avisa"""
+        store = MemoryTokenStore(token={'_data': 99})
+        db = FakeDatabase(changes=[user_change()], error=OperationFailure('history lost', code=286))
+        events = []
+        watcher = ChangeWatcher(db, name='test', token_store=store)
+        watcher.subscribe('users', events.append)
+
+        watcher.watch()
+
+        assert events[0]['operation'] == INVALIDATE_ALL
+        assert events[1]['operation'] == 'update'
+        assert watcher.get_metrics()['resets'] == 1
+
+    def test_falls_back_to_polling_without_replica_set(self):
+        """Test que en un standalone se usa polling por fecha de modificación"""
+        db = FakeDatabase(error=OperationFailure('only replica sets', code=40573),
+                          documents={'users': [{'_id': USER_ID}]})
+        events = []
+        watcher = ChangeWatcher(db, name='test', token_store=MemoryTokenStore(), poll_interval=0.01)
+        watcher.subscribe('users', events.append)
+
+        watcher.start()
+        deadline = time.time() + 2
+        while not events and time.time() < deadline:
+            time.sleep(0.01)
+        watcher.stop(timeout=1)
+
+        assert watcher.mode == 'polling'
+        assert events[0] == {'collection': 'users', 'operation': 'update', 'document_id': USER_ID}
+
+    def test_subscriber_errors_are_isolated(self):
+        """Test que un suscriptor que falla no impide notificar a los demás"""
+        watcher = ChangeWatcher(FakeDatabase(changes=[user_change()]), name='test', token_store=MemoryTokenStore())
+        events = []
+        watcher.subscribe('users', lambda event: 1 / 0)
+        watcher.subscribe('*', events.append)
+
+        watcher.watch()
+
+        assert len(events) == 1
+        assert watcher.get_metrics()['subscriber_errors'] == 1
+
+    def test_init_change_watcher_invalidates_user_cache(self):
+        """Test que el watcher arranca en el primer request e invalida la caché de usuarios"""
+        cache = UserCache()
+        cache.put({'_id': USER_ID, 'email': 'test@example.com'})
+        db = FakeDatabase(changes=[user_change()])
+        app = Flask(__name__)
+        app.route('/')(lambda: 'ok')
+
+        with patch.dict(os.environ, {'CHANGE_WATCHER_ENABLED': 'true', 'CHANGE_WATCHER_NAME': 'test'}), \
+             patch('services.change_watcher.ChangeStreamToken', MemoryTokenStore()), \
+             patch('services.change_watcher.get_db', return_value=db):
+            current_watcher = init_change_watcher(app, cache)
+            assert cache.get_metrics()['invalidations'] == 0  # Nada arranca en el proceso maestro
+
+            app.test_client().get('/')
+            app.test_client().get('/')
+            watcher = current_watcher()
+            deadline = time.time() + 2
+            while not cache.get_metrics()['invalidations'] and time.time() < deadline:
+                time.sleep(0.01)
+            watcher.stop(timeout=1)
+
+        assert watcher.name == 'test'
+        assert cache.backend.get(f'id:{USER_ID}') == TOMBSTONE
+        assert cache.get_metrics()['invalidations'] == 1
+
+    def test_forked_worker_starts_its_own_watcher(self):
+        """Test que un worker (otro pid) no reutiliza el watcher del padre"""
+        app = Flask(__name__)
+
+        with patch.dict(os.environ, {'CHANGE_WATCHER_ENABLED': 'true'}), \
+             patch.object(ChangeWatcher, 'start', lambda self: self):
+            current_watcher = init_change_watcher(app, UserCache())
+            parent = current_watcher()
+            with patch('services.change_watcher.os.getpid', return_value=os.getpid() + 1):
+                child = current_watcher()
+
+        assert child is not parent
+        assert child.name.endswith(f'-{os.getpid() + 1}')
+
+    def test_token_is_persisted_only_with_a_stable_name(self):
+        """Test que con hostname-pid el resume token no se escribe en MongoDB"""
+        with patch.dict(os.environ, {}, clear=False) as environ:
+            environ.pop('CHANGE_WATCHER_NAME', None)
+            anonymous = ChangeWatcher(FakeDatabase(changes=[user_change()]))
+            with patch('services.change_watcher.ChangeStreamToken') as mongo_store:
+                anonymous.watch()
+                mongo_store.save.assert_not_called()
+            assert anonymous.token_store.load(anonymous.name) is not None  # Para reconectar
+
+            environ['CHANGE_WATCHER_NAME'] = 'api-1'
+            assert ChangeWatcher(FakeDatabase()).token_store is ChangeStreamToken
+            assert ChangeWatcher(FakeDatabase()).name == 'api-1'
+
+
+@pytest.mark.skipif(not os.getenv('MONGO_REPLICA_SET_URI'),
+                    reason='Requiere un replica set local (MONGO_REPLICA_SET_URI)')
+class TestChangeWatcherReplicaSet:
+    """Test de integración contra un replica set de un nodo"""
+
+    def test_receives_user_updates(self):
+        from pymongo import MongoClient
+
+        client = MongoClient(os.environ['MONGO_REPLICA_SET_URI'])
+        db = client['mascotas-test-change-watcher']
+        events = []
+        received = threading.Event()
+        watcher = ChangeWatcher(db, name='test', token_store=MemoryTokenStore(), max_await_ms=100)
+        watcher.subscribe('users', lambda event: (events.append(event), received.set()))
+        try:
+            watcher.start()
+            while watcher.mode != 'change_stream':
+                time.sleep(0.05)
+            result = db.users.insert_one({'email': 'watch@example.com', 'updatedAt': datetime.utcnow()})
+
+            assert received.wait(5)
+            assert events[0]['document_id'] == result.inserted_id
+        finally:
+            watcher.stop(timeout=2)
+            client.drop_database('mascotas-test-change-watcher')
@@ -0,0 +1,115 @@
+"""
+Tests para el ConnectionManager de MongoDB
+"""
+import pytest
+import sys
+import os
+import threading
+from unittest.mock import patch, MagicMock
+
+from pymongo import monitoring
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.database import ConnectionManager, PoolMetricsListener, init_db, pool_options_from_env, short_lived_db
+
+
+class TestConnectionManager:
+    """Tests para la creación perezosa y fork-safe del cliente"""
+
+    def test_client_is_created_lazily_once(self):
+        """Test que configure() no conecta y get_db() crea un único cliente"""
+        manager = ConnectionManager()
+        with patch('config.database.MongoClient') as mock_client:
+            manager.configure('mongodb://db:27017', 'mascotas-test')
+            mock_client.assert_not_called()
+
+            threads = [threading.Thread(target=manager.get_db) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+            mock_client.assert_called_once()
+            mock_client.return_value.__getitem__.assert_called_once_with('mascotas-test')
+
+    def test_pool_options_come_from_env(self):
+        """Test que el pool se configura con variables de entorno"""
+        env = {
+            'MONGO_MAX_POOL_SIZE': '50', 'MONGO_MIN_POOL_SIZE': '5',
+            'MONGO_WAIT_QUEUE_TIMEOUT_MS': '2000', 'MONGO_SERVER_SELECTION_TIMEOUT_MS': '3000',
+        }
+        manager = ConnectionManager()
+        with patch.dict(os.environ, env), patch('config.database.MongoClient') as mock_client:
+            manager.configure('mongodb://db:27017')
+            manager.get_client()
+
+        _, options = mock_client.call_args
+        assert options['maxPoolSize'] == 50
+        assert options['minPoolSize'] == 5
+        assert options['waitQueueTimeoutMS'] == 2000
+        assert options['serverSelectionTimeoutMS'] == 3000
+        assert manager.metrics in options['event_listeners']
+        assert 'waitQueueTimeoutMS' not in pool_options_from_env()
+
+    def test_child_process_gets_its_own_client(self):
+        """Test que tras un fork el hijo no reutiliza el cliente del padre"""
+        manager = ConnectionManager()
+        with patch('config.database.MongoClient', side_effect=lambda *a, **k: MagicMock()):
+            manager.configure('mongodb://db:27017')
+            parent_client = manager.get_client()
+
+            manager._after_fork()  # Lo que ejecuta os.register_at_fork en el hijo
+            child_client = manager.get_client()
+
+        assert child_client is not parent_client
+        parent_client.close.assert_not_called()
+
+    def test_init_db_does_not_create_the_process_client(self):
+        """Test que init_db solo configura y el ping de arranque usa un cliente que se cierra"""
+        manager = ConnectionManager()
+        clients = []
+        with patch('config.database.connection_manager', manager), \
+             patch.dict(os.environ, {'MONGO_PING_ON_START': 'true'}), \
+             patch('config.database.MongoClient', side_effect=lambda *a, **k: clients.append(MagicMock()) or clients[-1]):
+            init_db()
+
+        assert len(clients) == 1
+        clients[0].close.assert_called_once()
+        assert manager._client is None
+
+    def test_short_lived_db_closes_its_client(self):
+        """Test que short_lived_db cierra su cliente y no crea el del proceso"""
+        manager = ConnectionManager()
+        clients = []
+        with patch('config.database.connection_manager', manager), \
+             patch('config.database.MongoClient', side_effect=lambda *a, **k: clients.append(MagicMock()) or clients[-1]):
+            manager.configure('mongodb://db:27017', 'mascotas-test')
+            with short_lived_db():
+                clients[0].close.assert_not_called()
+
+        clients[0].close.assert_called_once()
+        clients[0].__getitem__.assert_called_once_with('mascotas-test')
+        assert manager._client is None
+
+
+class TestPoolMetricsListener:
+    """Tests para las métricas de espera del pool"""
+
+    def test_records_checkout_waits_and_timeouts(self):
+        """Test que se mide la espera por conexión y los timeouts del pool"""
+        listener = PoolMetricsListener()
+        address = ('db', 27017)
+
+        for _ in range(3):
+            listener.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(address))
+            listener.connection_checked_out(monitoring.ConnectionCheckedOutEvent(address, 1))
+        listener.connection_check_out_started(monitoring.ConnectionCheckOutStartedEvent(address))
+        listener.connection_check_out_failed(monitoring.ConnectionCheckOutFailedEvent(
+            address, monitoring.ConnectionCheckOutFailedReason.TIMEOUT))
+
+        metrics = listener.get_metrics()
+        assert metrics['checkouts'] == 3
+        assert metrics['checkout_timeouts'] == 1
+        assert 0 <= metrics['p50_wait_ms'] <= metrics['max_wait_ms']
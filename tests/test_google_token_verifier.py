@@ -0,0 +1,142 @@
+"""
+Tests para la verificación de ID tokens de Google con certificados cacheados
+"""
+import pytest
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from google.auth import crypt
+from google.auth import jwt as google_jwt
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.google_token_verifier import CachedCertStore, GoogleTokenVerifier, StaticCertSource
+
+CLIENT_ID = 'test-client.apps.googleusercontent.com'
+
+
+class LocalIssuer:
+    """Emisor local que firma ID tokens con un certificado autofirmado"""
+
+    def __init__(self, kid='local-kid'):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, 'local-issuer')])
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(datetime.utcnow() - timedelta(days=1))
+            .not_valid_after(datetime.utcnow() + timedelta(days=1))
+            .sign(key, hashes.SHA256())
+        )
+        private_pem = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.PKCS8,
+            serialization.NoEncryption()
+        )
+        self.kid = kid
+        self.cert_pem = cert.public_bytes(serialization.Encoding.PEM).decode('utf-8')
+        self.signer = crypt.RSASigner.from_string(private_pem, key_id=kid)
+
+    def issue(self, **overrides):
+        now = int(time.time())
+        payload = {
+            'iss': 'https://accounts.google.com',
+            'aud': CLIENT_ID,
+            'sub': '1234567890',
+            'email': 'usuario@gmail.com',
+            'name': 'Usuario Google',
+            'iat': now,
+            'exp': now + 3600
+        }
+        payload.update(overrides)
+        return google_jwt.encode(self.signer, payload).decode('utf-8')
+
+
+class TestGoogleTokenVerifier:
+    """Tests para GoogleTokenVerifier y CachedCertStore"""
+
+    @pytest.fixture
+    def issuer(self):
+        return LocalIssuer()
+
+    def test_certs_fetched_once_for_many_verifications(self, issuer):
+        """Test que los certificados se descargan una vez y se reutilizan"""
+        source = StaticCertSource({issuer.kid: issuer.cert_pem}, max_age=3600)
+        store = CachedCertStore(source)
+        verifier = GoogleTokenVerifier(store)
+
+        try:
+            for _ in range(5):
+                idinfo = verifier.verify(issuer.issue(), CLIENT_ID)
+                assert idinfo['email'] == 'usuario@gmail.com'
+            assert source.fetch_count == 1
+            assert store.get_metrics()['hits'] == 4
+        finally:
+            store.close()
+
+    def test_wrong_audience_or_issuer_is_rejected(self, issuer):
+        """Test que se valida audiencia y emisor"""
+        store = CachedCertStore(StaticCertSource({issuer.kid: issuer.cert_pem}))
+        verifier = GoogleTokenVerifier(store)
+
+        try:
+            with pytest.raises(ValueError):
+                verifier.verify(issuer.issue(aud='otro-cliente'), CLIENT_ID)
+            with pytest.raises(ValueError):
+                verifier.verify(issuer.issue(iss='https://evil.example.com'), CLIENT_ID)
+        finally:
+            store.close()
+
+    def test_unknown_kid_forces_refetch(self, issuer):
+        """Test que un kid desconocido fuerza una nueva descarga (rotación de Google)"""
+        rotated = LocalIssuer(kid='rotated-kid')
+        source = StaticCertSource({issuer.kid: issuer.cert_pem})
+        store = CachedCertStore(source, min_refetch_interval=0)
+        verifier = GoogleTokenVerifier(store)
+
+        try:
+            verifier.verify(issuer.issue(), CLIENT_ID)
+            source.certs[rotated.kid] = rotated.cert_pem
+            assert verifier.verify(rotated.issue(), CLIENT_ID)['sub'] == '1234567890'
+            assert source.fetch_count == 2
+        finally:
+            store.close()
+
+    def test_background_refresh_before_expiry(self, issuer):
+        """Test que los certificados se renuevan en segundo plano antes de expirar"""
+        source = StaticCertSource({issuer.kid: issuer.cert_pem}, max_age=2)
+        store = CachedCertStore(source, refresh_margin=1.5)
+
+        try:
+            store.get_certs()
+            deadline = time.time() + 3
+            while store.get_metrics()['background_refreshes'] < 1 and time.time() < deadline:
+                time.sleep(0.05)
+            assert source.fetch_count >= 2
+            assert store.get_metrics()['background_refreshes'] >= 1
+        finally:
+            store.close()
+
+    def test_stale_certs_used_when_refresh_fails(self, issuer):
+        """Test que si la fuente falla se siguen usando los certificados en caché"""
+        source = StaticCertSource({issuer.kid: issuer.cert_pem}, max_age=0)
+        store = CachedCertStore(source, refresh_margin=0, retry_interval=60)
+
+        try:
+            store.get_certs()
+            with patch.object(source, 'fetch', side_effect=ConnectionError('sin red')):
+                assert issuer.kid in store.get_certs()
+            assert store.get_metrics()['fetch_errors'] >= 1
+        finally:
+            store.close()
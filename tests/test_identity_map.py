@@ -0,0 +1,116 @@
+"""
+Tests para el identity map por request de User
+"""
+import pytest
+import sys
+import os
+from datetime import datetime
+from unittest.mock import patch
+
+import bson
+from flask import Flask
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.user import User
+from services.identity_map import IdentityMap, init_identity_map, request_metrics
+from services.user_cache import UserCache
+
+USER_ID = '507f1f77bcf86cd799439011'
+USER_DOCUMENT = {
+    '_id': bson.ObjectId(USER_ID),
+    'full_name': 'Test User',
+    'email': 'test@example.com',
+    'password': 'hash',
+    'username': 'testuser',
+    'createdAt': datetime(2024, 1, 1),
+    'updatedAt': datetime(2024, 1, 1),
+}
+
+
+@pytest.fixture
+def collection():
+    with patch('models.user.user_cache', UserCache(enabled=False)), \
+         patch.object(User, 'get_collection') as mock_collection:
+        mock_collection.return_value.find_one.side_effect = lambda *args, **kwargs: dict(USER_DOCUMENT)
+        yield mock_collection.return_value
+
+
+@pytest.fixture
+def flask_app():
+    return Flask(__name__)
+
+
+class TestIdentityMap:
+    """Tests para la carga de usuarios una sola vez por request"""
+
+    def test_same_instance_within_request(self, flask_app, collection):
+        """Test que las búsquedas repetidas reutilizan la instancia cargada"""
+        with flask_app.test_request_context():
+            user = User.find_by_id(USER_ID)
+
+            assert User.find_by_id(USER_ID) is user
+            assert User.find_by_email('Test@Example.com') is user
+            assert User.find_by_username('testuser') is user
+            assert collection.find_one.call_count == 1
+
+            metrics = request_metrics()
+            assert metrics['hits'] == 3
+            assert metrics['queries'] == {'find_one': 1}
+
+    def test_each_request_has_its_own_map(self, flask_app, collection):
+        """Test que el mapa no sobrevive al request"""
+        with flask_app.test_request_context():
+            first = User.find_by_id(USER_ID)
+        with flask_app.test_request_context():
+            second = User.find_by_id(USER_ID)
+
+        assert first is not second
+        assert collection.find_one.call_count == 2
+
+    def test_no_map_outside_flask(self, collection):
+        """Test que fuera de un contexto de Flask cada búsqueda consulta la BD"""
+        User.find_by_id(USER_ID)
+        User.find_by_id(USER_ID)
+
+        assert collection.find_one.call_count == 2
+        assert request_metrics() is None
+
+    def test_changed_email_alias_is_a_miss(self):
+        """Test que un alias deja de valer si la instancia cambió ese campo"""
+        identity_map = IdentityMap()
+        user = User.from_document(USER_DOCUMENT)
+        identity_map.add(user)
+        user.email = 'nuevo@example.com'
+
+        assert identity_map.get('email', 'test@example.com') is None
+        assert identity_map.get('_id', USER_ID) is user
+
+    def test_conflict_check_reuses_loaded_user(self, flask_app, collection):
+        """Test que find_with_conflicts no vuelve a leer un usuario ya cargado"""
+        collection.find.return_value.limit.return_value = []
+        with flask_app.test_request_context():
+            user = User.find_by_id(USER_ID)
+            loaded, conflicts = User.find_with_conflicts(USER_ID, email='otro@example.com')
+
+            query = collection.find.call_args[0][0]
+            assert loaded is user
+            assert conflicts == []
+            assert query['_id'] == {'$ne': bson.ObjectId(USER_ID)}
+            assert request_metrics()['total_queries'] == 2
+
+    def test_debug_headers(self, flask_app, collection):
+        """Test que las consultas del request se exponen en encabezados"""
+        @flask_app.route('/perfil')
+        def perfil():
+            User.find_by_id(USER_ID)
+            User.find_by_id(USER_ID)
+            return 'ok'
+
+        with patch.dict(os.environ, {'IDENTITY_MAP_DEBUG_HEADERS': 'true'}):
+            init_identity_map(flask_app)
+        response = flask_app.test_client().get('/perfil')
+
+        assert response.headers['X-User-Queries'] == '1'
+        assert response.headers['X-Identity-Map-Hits'] == '1'
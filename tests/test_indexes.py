@@ -0,0 +1,134 @@
+"""
+Tests para el bootstrap de índices de MongoDB
+"""
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+from datetime import datetime
+
+from pymongo import IndexModel
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.indexes import INDEXES, ensure_indexes, index_drift
+
+
+class FakeCollection:
+    """Colección en memoria que solo entiende de índices"""
+
+    def __init__(self):
+        self.indexes = {'_id_': {'key': [('_id', 1)], 'v': 2}}
+        self.create_calls = 0
+
+    def index_information(self):
+        return {name: dict(info) for name, info in self.indexes.items()}
+
+    def create_indexes(self, models):
+        self.create_calls += 1
+        for model in models:
+            document = dict(model.document)
+            name = document.pop('name')
+            document['key'] = list(document['key'].items())
+            document['v'] = 2
+            self.indexes[name] = document
+
+    def drop_index(self, name):
+        del self.indexes[name]
+
+
+class FakeDatabase(dict):
+    def __missing__(self, name):
+        self[name] = FakeCollection()
+        return self[name]
+
+
+USER_ID = '507f1f77bcf86cd799439011'
+
+
+def _model_writes():
+    """(modelo, colección, escrituras) de los modelos que antes creaban índices al guardar"""
+    from models.login_throttle_state import LoginThrottleState
+    from models.password_reset_token import PasswordResetToken
+    from models.refresh_token import RefreshToken
+    from models.revoked_token import RevokedToken
+
+    return [
+        (RefreshToken, 'refresh_tokens', lambda: (
+            RefreshToken(user_id=USER_ID, token='hash').save(),
+            RefreshToken.consume('hash'),
+            RefreshToken.revoke_family('family'),
+        )),
+        (RevokedToken, 'revoked_tokens', lambda: (
+            RevokedToken.revoke('jti-1', USER_ID, datetime.utcnow()),
+            RevokedToken.revoke_user(USER_ID, datetime.utcnow()),
+        )),
+        (LoginThrottleState, 'login_throttle', lambda: (
+            LoginThrottleState.compare_and_set('email:a@b.co', None, {'tokens': 1.0}, None),
+            LoginThrottleState.compare_and_set('email:a@b.co', 1, {'tokens': 0.0}, None),
+        )),
+        (PasswordResetToken, 'password_reset_tokens', lambda: (
+            PasswordResetToken(user_id=USER_ID, token='hash').save(),
+        )),
+    ]
+
+
+class TestIndexBootstrap:
+    """Tests para ensure_indexes e index_drift"""
+
+    def test_creates_missing_indexes_once(self):
+        """Test que el bootstrap es idempotente"""
+        db = FakeDatabase()
+
+        assert ensure_indexes(db) == {}
+        calls = {name: collection.create_calls for name, collection in db.items()}
+        assert ensure_indexes(db) == {}
+
+        assert calls == {name: collection.create_calls for name, collection in db.items()}
+        assert set(db['users'].indexes) == {'_id_', 'email_1', 'username_1'}
+        assert db['password_reset_tokens'].indexes['expires_at_1']['expireAfterSeconds'] == 0
+
+    def test_reports_changed_and_extra_indexes(self):
+        """Test que se reporta drift sin tocar índices con opciones distintas"""
+        db = FakeDatabase()
+        db['users'].indexes['email_1'] = {'key': [('email', 1)], 'v': 2}  # Sin unique
+        db['users'].indexes['legacy_1'] = {'key': [('legacy', 1)], 'v': 2}
+
+        drift = ensure_indexes(db)
+
+        assert drift['users'] == {'missing': [], 'changed': ['email_1'], 'extra': ['legacy_1']}
+        assert 'unique' not in db['users'].indexes['email_1']
+
+    def test_fix_recreates_changed_indexes(self):
+        """Test que --fix recrea los índices con opciones distintas"""
+        db = FakeDatabase()
+        db['users'].indexes['email_1'] = {'key': [('email', 1)], 'v': 2}
+
+        drift = ensure_indexes(db, fix=True)
+
+        assert 'users' not in drift
+        assert db['users'].indexes['email_1']['unique'] is True
+
+    def test_user_save_does_not_create_indexes(self):
+        """Test que guardar un usuario va directo al insert"""
+        from models.user import User
+
+        with patch.object(User, 'get_collection') as mock_collection:
+            User(full_name='Test', email='test@example.com', password='hash', username='test').save()
+
+            mock_collection.return_value.create_index.assert_not_called()
+            mock_collection.return_value.insert_one.assert_called_once()
+
+    @pytest.mark.parametrize('model, collection_name, write', _model_writes(),
+                             ids=lambda value: value if isinstance(value, str) else None)
+    def test_model_writes_do_not_create_indexes(self, model, collection_name, write):
+        """Test que las escrituras de los modelos no crean índices: los declara INDEXES"""
+        with patch.object(model, 'get_collection') as mock_collection:
+            mock_collection.return_value.find_one_and_update.return_value = None
+            write()
+
+        mock_collection.return_value.create_index.assert_not_called()
+        mock_collection.return_value.create_indexes.assert_not_called()
+        assert collection_name in INDEXES
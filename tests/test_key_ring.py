@@ -0,0 +1,171 @@
+"""
+Tests para el anillo de llaves de firma y el endpoint JWKS
+"""
+import pytest
+import sys
+import os
+import subprocess
+import threading
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+import jwt
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.key_ring import KeyRing
+from services.token_service import TokenService
+
+
+class TestKeyRing:
+    """Tests para KeyRing"""
+
+    @pytest.mark.parametrize('algorithm', ['RS256', 'EdDSA'])
+    def test_sign_with_kid_and_verify_with_jwks(self, tmp_path, algorithm):
+        """Test que un servicio externo puede verificar con el JWKS publicado"""
+        ring = KeyRing(algorithm=algorithm, keys_dir=str(tmp_path))
+        service = TokenService(key_ring=ring)
+
+        token = service.issue_access_token('user_1')
+        header = jwt.get_unverified_header(token)
+        jwk = next(k for k in ring.jwks()['keys'] if k['kid'] == header['kid'])
+
+        # Verificación local, como la haría otro servicio
+        public_key = jwt.PyJWK(jwk).key
+        claims = jwt.decode(token, public_key, algorithms=[algorithm])
+        assert claims['userId'] == 'user_1'
+        assert service.verify_token(token)['userId'] == 'user_1'
+
+    def test_rotation_publishes_ahead_and_keeps_overlap(self, tmp_path):
+        """Test que la llave nueva se publica antes de usarse y la anterior sigue publicada"""
+        ring = KeyRing(algorithm='EdDSA', keys_dir=str(tmp_path), publish_ahead=timedelta(hours=1),
+                       overlap=timedelta(days=1))
+        first = ring.active_key()
+        pending = ring.rotate()
+
+        published = [k['kid'] for k in ring.jwks()['keys']]
+        assert first.kid in published and pending.kid in published
+        assert ring.active_key().kid == first.kid
+
+        # Una hora después la nueva llave está activa y la anterior sigue publicada
+        later = datetime.utcnow() + timedelta(hours=2)
+        with patch('services.key_ring.datetime') as mock_datetime:
+            mock_datetime.utcnow.return_value = later
+            assert ring.active_key().kid == pending.kid
+            assert first.kid in [k.kid for k in ring.published_keys()]
+
+        # Pasada la ventana de solapamiento la llave anterior se retira
+        much_later = datetime.utcnow() + timedelta(days=3)
+        with patch('services.key_ring.datetime') as mock_datetime:
+            mock_datetime.utcnow.return_value = much_later
+            assert [k.kid for k in ring.published_keys()] == [pending.kid]
+            assert ring.get_key(first.kid) is None
+
+    def test_keys_are_shared_through_directory(self, tmp_path):
+        """Test que otro worker lee las mismas llaves del directorio"""
+        ring = KeyRing(algorithm='RS256', keys_dir=str(tmp_path))
+        token = TokenService(key_ring=ring).issue_access_token('user_1')
+
+        other_worker = KeyRing(algorithm='RS256', keys_dir=str(tmp_path))
+        assert TokenService(key_ring=other_worker).verify_token(token)['userId'] == 'user_1'
+
+    def test_concurrent_workers_create_a_single_first_key(self, tmp_path):
+        """Test que varios workers arrancando a la vez crean una sola llave"""
+        workers = [KeyRing(algorithm='EdDSA', keys_dir=str(tmp_path)) for _ in range(6)]
+        barrier = threading.Barrier(len(workers))
+
+        def start(ring):
+            barrier.wait()
+            ring.active_key()
+
+        threads = [threading.Thread(target=start, args=(ring,)) for ring in workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(list(tmp_path.glob('*.json'))) == 1
+        assert len({ring.active_key().kid for ring in workers}) == 1
+
+    def test_rotation_rechecks_inside_lock(self, tmp_path):
+        """Test que un worker con la vista vieja no rota si otro ya lo hizo"""
+        interval = timedelta(microseconds=1)
+        KeyRing(algorithm='EdDSA', keys_dir=str(tmp_path)).rotate(immediate=True)
+        first, second = (KeyRing(algorithm='EdDSA', keys_dir=str(tmp_path), rotation_interval=interval)
+                         for _ in range(2))
+        first.load()
+        second.load()
+
+        assert first.maybe_rotate() is not None
+        assert second.maybe_rotate() is None  # Recarga bajo el lock y ve la llave pendiente
+        assert len(list(tmp_path.glob('*.json'))) == 2
+
+    def test_workers_only_reload_without_auto_rotate(self, tmp_path):
+        """Test que sin auto_rotate los workers no rotan y el CLI sí"""
+        ring = KeyRing(algorithm='EdDSA', keys_dir=str(tmp_path), rotation_interval=timedelta(microseconds=1),
+                       auto_rotate=False)
+        first = ring.active_key()  # Sin llaves se crea la primera igualmente
+
+        assert ring.maybe_rotate() is None
+        assert ring.rotate_if_due() is not None
+        assert ring.active_key().kid == first.kid  # La nueva se publica antes de activarse
+
+    def test_rotation_lock_without_fcntl_uses_msvcrt(self, tmp_path):
+        """Test que en Windows (sin fcntl) el lock de rotación usa msvcrt.locking"""
+        modes = []
+        fake_msvcrt = Mock(LK_LOCK='lock', LK_UNLCK='unlock',
+                           locking=lambda fd, mode, size: modes.append(mode))
+
+        with patch('services.key_ring.fcntl', None), \
+             patch('services.key_ring.msvcrt', fake_msvcrt, create=True):
+            assert KeyRing(algorithm='EdDSA', keys_dir=str(tmp_path)).rotate_if_due() is not None
+
+        assert modes == ['lock', 'unlock']
+
+    def test_app_loads_dotenv_before_singletons(self):
+        """Test que el JWT_ALGORITHM de .env llega a la instancia global del KeyRing"""
+        script = (
+            "import os, dotenv\n"
+            "dotenv.load_dotenv = lambda *a, **k: os.environ.update(JWT_ALGORITHM='EdDSA')\n"
+            "import app\n"
+            "from services.key_ring import key_ring\n"
+            "print(key_ring.algorithm)\n"
+        )
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        env = {key: value for key, value in os.environ.items() if key != 'JWT_ALGORITHM'}
+
+        result = subprocess.run([sys.executable, '-c', script], cwd=root, env=env,
+                                capture_output=True, text=True, timeout=60)
+
+        assert result.stdout.strip().splitlines()[-1] == 'EdDSA', result.stderr
+
+    def test_unknown_kid_is_rejected(self, tmp_path):
+        """Test que un token con kid desconocido es inválido"""
+        ring = KeyRing(algorithm='EdDSA', keys_dir=str(tmp_path))
+        foreign_ring = KeyRing(algorithm='EdDSA', keys_dir=str(tmp_path / 'otro'))
+        token = TokenService(key_ring=foreign_ring).issue_access_token('user_1')
+
+        with pytest.raises(jwt.InvalidTokenError):
+            TokenService(key_ring=ring).verify_token(token)
+
+    def test_jwks_endpoint_is_cacheable(self, tmp_path):
+        """Test del endpoint /.well-known/jwks.json"""
+        from flask import Flask
+        from routes.jwks_routes import jwks_bp
+
+        app = Flask(__name__)
+        app.register_blueprint(jwks_bp)
+        ring = KeyRing(algorithm='EdDSA', keys_dir=str(tmp_path))
+
+        with patch('routes.jwks_routes.key_ring', ring):
+            client = app.test_client()
+            response = client.get('/.well-known/jwks.json')
+
+            assert response.status_code == 200
+            assert 'public' in response.headers['Cache-Control']
+            assert 'max-age=' in response.headers['Cache-Control']
+            assert len(response.get_json()['keys']) == 1
+
+            cached = client.get('/.well-known/jwks.json', headers={'If-None-Match': response.headers['ETag']})
+            assert cached.status_code == 304
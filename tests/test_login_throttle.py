@@ -0,0 +1,124 @@
+"""
+Tests para el throttle de login por email e IP
+"""
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.login_throttle import (
+    LoginThrottle, LoginThrottledError, MemoryThrottleBackend, MongoThrottleBackend, ThrottlePolicy
+)
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestLoginThrottle:
+    """Tests para LoginThrottle"""
+
+    def make_throttle(self, clock, backend=None):
+        return LoginThrottle(
+            backend=backend or MemoryThrottleBackend(),
+            email_policy=ThrottlePolicy(capacity=3, refill_seconds=60),
+            ip_policy=ThrottlePolicy(capacity=10, refill_seconds=30),
+            lockout_base=30,
+            lockout_max=300,
+            clock=clock
+        )
+
+    def test_lockout_after_capacity_failures(self):
+        """Test que se bloquea al agotar los intentos del email"""
+        clock = FakeClock()
+        throttle = self.make_throttle(clock)
+
+        for _ in range(3):
+            throttle.check('User@Example.com ', '10.0.0.1')
+            throttle.register_failure('User@Example.com ', '10.0.0.1')
+
+        with pytest.raises(LoginThrottledError) as excinfo:
+            throttle.check('user@example.com', '10.0.0.2')
+        assert excinfo.value.retry_after == 30
+
+    def test_lockout_is_progressive(self):
+        """Test que cada bloqueo consecutivo dura el doble"""
+        clock = FakeClock()
+        throttle = self.make_throttle(clock)
+
+        for _ in range(3):
+            throttle.register_failure('user@example.com')
+        clock.now += 31
+        throttle.check('user@example.com')
+
+        throttle.register_failure('user@example.com')
+        with pytest.raises(LoginThrottledError) as excinfo:
+            throttle.check('user@example.com')
+        assert excinfo.value.retry_after == 60
+
+    def test_success_resets_email_but_not_ip(self):
+        """Test que un login correcto limpia el email pero no la IP"""
+        clock = FakeClock()
+        throttle = self.make_throttle(clock)
+
+        for _ in range(2):
+            throttle.register_failure('user@example.com', '10.0.0.1')
+        throttle.register_success('user@example.com', '10.0.0.1')
+        throttle.register_failure('user@example.com', '10.0.0.1')
+        throttle.check('user@example.com', '10.0.0.1')
+
+        for i in range(10):
+            throttle.register_failure(f'otro{i}@example.com', '10.0.0.1')
+        with pytest.raises(LoginThrottledError):
+            throttle.check('user@example.com', '10.0.0.1')
+
+    def test_backend_errors_fail_open(self):
+        """Test que un fallo del backend no impide el login"""
+        throttle = self.make_throttle(FakeClock(), backend=MongoThrottleBackend())
+
+        with patch('services.login_throttle.LoginThrottleState') as mock_state:
+            mock_state.find.side_effect = Exception('Mongo caído')
+            throttle.check('user@example.com', '10.0.0.1')
+            throttle.register_failure('user@example.com', '10.0.0.1')
+
+        assert throttle.get_metrics()['backend_errors'] == 4
+
+    def test_mongo_backend_retries_on_conflict(self):
+        """Test que el backend Mongo reintenta el compare-and-set"""
+        backend = MongoThrottleBackend()
+
+        with patch('services.login_throttle.LoginThrottleState') as mock_state:
+            mock_state.find.return_value = (None, None)
+            mock_state.compare_and_set.side_effect = [False, True]
+
+            state = backend.update('email:user@example.com', lambda s: {'locked_until': 0.0, 'updated_at': 1.0}, 60)
+
+            assert state['updated_at'] == 1.0
+            assert mock_state.compare_and_set.call_count == 2
+
+    def test_login_user_rejects_before_db_lookup(self):
+        """Test que login_user responde 429 sin consultar la BD ni el hash"""
+        from controllers.user_controller import UserController
+
+        throttle = self.make_throttle(FakeClock())
+        for _ in range(3):
+            throttle.register_failure('user@example.com')
+
+        with patch('controllers.user_controller.login_throttle', throttle), \
+             patch('controllers.user_controller.User') as mock_user_class, \
+             patch('controllers.user_controller.password_hasher') as mock_hasher:
+            result, status_code = UserController.login_user(
+                {'email': 'user@example.com', 'password': 'Password123'}, '10.0.0.1'
+            )
+
+            assert status_code == 429
+            assert result['retryAfter'] == 30
+            mock_user_class.find_credentials_by_email.assert_not_called()
+            mock_hasher.verify_password.assert_not_called()
@@ -0,0 +1,169 @@
+"""
+Tests para la concurrencia optimista (campo version) en las escrituras de User
+"""
+import pytest
+import sys
+import os
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+import bson
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from controllers.profile_controller import ProfileController
+from models.user import User, UserVersionConflictError
+from services.user_cache import UserCache
+from services.user_writes import save_with_retry
+
+USER_ID = '507f1f77bcf86cd799439011'
+USER_DOCUMENT = {
+    '_id': bson.ObjectId(USER_ID),
+    'full_name': 'Test User',
+    'email': 'test@example.com',
+    'password': 'hash',
+    'createdAt': datetime(2024, 1, 1),
+    'updatedAt': datetime(2024, 1, 1),
+    'version': 4,
+}
+
+
+def update_result(matched):
+    return Mock(matched_count=matched)
+
+
+@pytest.fixture
+def collection():
+    with patch('models.user.user_cache', UserCache(enabled=False)), \
+         patch.object(User, 'get_collection') as mock_collection:
+        mock_collection.return_value.find_one.side_effect = lambda *args, **kwargs: dict(USER_DOCUMENT)
+        mock_collection.return_value.update_one.return_value = update_result(1)
+        yield mock_collection.return_value
+
+
+class TestVersionedSave:
+    """Tests para el update condicional de User.save()"""
+
+    def test_update_matches_read_version_and_increments(self, collection):
+        """Test que el update filtra por la versión leída y la incrementa"""
+        user = User.find_by_id(USER_ID)
+        user.full_name = 'Otro Nombre'
+
+        user.save()
+
+        query, update = collection.update_one.call_args[0]
+        assert query == {'_id': bson.ObjectId(USER_ID), 'version': 4}
+        assert update['$inc'] == {'version': 1}
+        assert 'version' not in update['$set']
+        assert user.version == 5
+        assert user.dirty_fields() == []
+
+    def test_stale_version_raises_conflict(self, collection):
+        """Test que si otro request guardó antes no se pisa su escritura"""
+        collection.update_one.return_value = update_result(0)
+        user = User.find_by_id(USER_ID)
+        user.full_name = 'Otro Nombre'
+
+        with pytest.raises(UserVersionConflictError):
+            user.save()
+
+        assert user.version == 4
+
+    def test_legacy_document_matches_missing_version(self, collection):
+        """Test que un documento sin version se actualiza con {'version': None}"""
+        collection.find_one.side_effect = lambda *args, **kwargs: {
+            key: value for key, value in USER_DOCUMENT.items() if key != 'version'
+        }
+        user = User.find_by_id(USER_ID)
+        user.full_name = 'Otro Nombre'
+
+        user.save()
+
+        query, _ = collection.update_one.call_args[0]
+        assert query['version'] is None
+        assert user.version == 1
+
+    def test_new_user_starts_at_version_one(self, collection):
+        """Test que un usuario nuevo se inserta con version 1"""
+        User(full_name='Nuevo', email='nuevo@example.com', password='hash').save()
+
+        assert collection.insert_one.call_args[0][0]['version'] == 1
+
+
+class TestSaveWithRetry:
+    """Tests para el reintento sobre la versión actual"""
+
+    def test_conflict_reloads_and_reapplies(self, collection):
+        """Test que tras un conflicto se recarga el usuario y se reaplican los cambios"""
+        collection.update_one.side_effect = [update_result(0), update_result(1)]
+        user = User.find_by_id(USER_ID)
+        concurrent = dict(USER_DOCUMENT, version=5, address='Calle 1 # 2-3')
+        collection.find_one.side_effect = lambda *args, **kwargs: dict(concurrent)
+
+        save_with_retry(user, lambda user: setattr(user, 'full_name', 'Otro Nombre'))
+
+        first, second = (call[0][0] for call in collection.update_one.call_args_list)
+        assert first['version'] == 4
+        assert second['version'] == 5
+        assert user.full_name == 'Otro Nombre'
+        assert user.address == 'Calle 1 # 2-3'
+        assert user.version == 6
+
+    def test_retries_are_bounded(self, collection):
+        """Test que se deja de reintentar al agotar los reintentos"""
+        collection.update_one.return_value = update_result(0)
+        user = User.find_by_id(USER_ID)
+
+        with pytest.raises(UserVersionConflictError):
+            save_with_retry(user, lambda user: setattr(user, 'full_name', 'Otro Nombre'), retries=2)
+
+        assert collection.update_one.call_count == 3
+
+
+class TestProfileIfMatch:
+    """Tests para ETag/If-Match en la actualización de perfil"""
+
+    def update(self, if_match):
+        return ProfileController.update_profile(USER_ID, {'full_name': 'Otro Nombre'}, if_match=if_match)
+
+    def test_etag_header_from_profile_version(self, collection):
+        """Test que el perfil expone su versión como ETag"""
+        response_data, status_code = ProfileController.get_profile(USER_ID)
+
+        assert status_code == 200
+        assert ProfileController.etag_headers(response_data) == {'ETag': '"4"'}
+
+    def test_stale_if_match_is_rejected_without_writing(self, collection):
+        """Test que un If-Match de otra versión responde 412 sin escribir"""
+        _, status_code = self.update('"3"')
+
+        assert status_code == 412
+        collection.update_one.assert_not_called()
+
+    def test_matching_if_match_saves(self, collection):
+        """Test que con el ETag actual se guarda y se devuelve la versión nueva"""
+        response_data, status_code = self.update('"4"')
+
+        assert status_code == 200
+        assert response_data['profile']['version'] == 5
+        assert ProfileController.etag_headers(response_data) == {'ETag': '"5"'}
+
+    def test_if_match_conflict_is_not_retried(self, collection):
+        """Test que con If-Match un conflicto al guardar responde 412"""
+        collection.update_one.return_value = update_result(0)
+
+        _, status_code = self.update('*')
+
+        assert status_code == 412
+        assert collection.update_one.call_count == 1
+
+    def test_without_if_match_exhausted_retries_conflict(self, collection):
+        """Test que sin If-Match se reintenta y, agotados los reintentos, responde 409"""
+        collection.update_one.return_value = update_result(0)
+
+        with patch('services.user_writes.USER_WRITE_RETRIES', 1):
+            _, status_code = self.update(None)
+
+        assert status_code == 409
+        assert collection.update_one.call_count == 2
@@ -0,0 +1,226 @@
+"""
+Tests para el servicio de hashing de contraseñas
+"""
+import asyncio
+import pytest
+import sys
+import os
+import threading
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.password_hashing_service import PasswordHashingService, HashingServiceBusyError
+from services.password_hashers import BcryptHasher, identify_hasher_class, build_hasher, env_settings, write_env_file
+
+
+class TestPasswordHashingService:
+    """Tests para PasswordHashingService"""
+
+    def test_hash_and_verify_thread_pool(self):
+        """Test hash y verificación usando el pool de hilos"""
+        service = PasswordHashingService(max_workers=2, mode='thread', hasher=BcryptHasher(rounds=4))
+        try:
+            hashed = service.hash_password('Password123')
+
+            assert hashed.startswith('$2b$04$')
+            assert service.verify_password('Password123', hashed) is True
+            assert service.verify_password('WrongPassword', hashed) is False
+        finally:
+            service.shutdown()
+
+    def test_hash_and_verify_process_pool(self):
+        """Test hash y verificación usando el pool de procesos"""
+        service = PasswordHashingService(max_workers=2, mode='process', hasher=BcryptHasher(rounds=4))
+        try:
+            hashed = service.hash_password('Password123', timeout=60)
+
+            assert service.verify_password('Password123', hashed, timeout=60) is True
+            assert service.get_metrics()['mode'] in ('process', 'thread')
+        finally:
+            service.shutdown()
+
+    def test_async_api(self):
+        """Test de las APIs async (no bloquean el event loop)"""
+        service = PasswordHashingService(max_workers=2, mode='thread', hasher=BcryptHasher(rounds=4))
+
+        async def run():
+            hashed = await service.hash_password_async('Password123')
+            return await service.verify_password_async('Password123', hashed)
+
+        try:
+            assert asyncio.run(run()) is True
+        finally:
+            service.shutdown()
+
+    def test_async_wait_for_slot_does_not_block_loop(self):
+        """Test que con la cola llena la espera async deja correr al event loop"""
+        service = PasswordHashingService(max_workers=1, max_pending=1, mode='thread', hasher=BcryptHasher(rounds=4))
+        release = threading.Event()
+
+        async def run():
+            blocked = service._submit(release.wait)
+            waiting = asyncio.ensure_future(service.hash_password_async('Password123'))
+            await asyncio.sleep(0.05)  # El loop sigue atendiendo otras tareas
+            assert not waiting.done()
+            release.set()
+            blocked.result()
+            return await waiting
+
+        try:
+            assert asyncio.run(run()).startswith('$2b$04$')
+        finally:
+            release.set()
+            service.shutdown()
+
+    def test_async_rejects_when_queue_stays_full(self):
+        """Test que la API async también rechaza al agotar submit_timeout"""
+        service = PasswordHashingService(max_workers=1, max_pending=1, mode='thread', submit_timeout=0.01)
+        release = threading.Event()
+        try:
+            service._submit(release.wait)
+
+            with pytest.raises(HashingServiceBusyError):
+                asyncio.run(service.verify_password_async('Password123', ''))
+            assert service.get_metrics()['rejected'] == 1
+        finally:
+            release.set()
+            service.shutdown()
+
+    def test_shutdown_waits_for_running_jobs(self):
+        """Test que shutdown(wait=True) no se bloquea con trabajos en curso"""
+        service = PasswordHashingService(max_workers=1, mode='thread', hasher=BcryptHasher(rounds=4))
+        release = threading.Event()
+        running = service._submit(release.wait)
+        threading.Timer(0.05, release.set).start()
+
+        stopper = threading.Thread(target=service.shutdown)
+        stopper.start()
+        stopper.join(timeout=10)
+
+        assert not stopper.is_alive()
+        assert running.done()
+        assert service.get_metrics()['queue_depth'] == 0
+
+    def test_metrics(self):
+        """Test de contadores, profundidad de cola y latencias"""
+        service = PasswordHashingService(max_workers=2, mode='thread', hasher=BcryptHasher(rounds=4))
+        try:
+            futures = [service.submit_hash('Password123') for _ in range(4)]
+            for future in futures:
+                future.result()
+
+            metrics = service.get_metrics()
+            assert metrics['submitted'] == 4
+            assert metrics['completed'] == 4
+            assert metrics['queue_depth'] == 0
+            assert metrics['latency_ms']['p99'] >= metrics['latency_ms']['p50'] > 0
+        finally:
+            service.shutdown()
+
+    def test_rejects_when_queue_is_full(self):
+        """Test que la cola acotada rechaza trabajos cuando está llena"""
+        service = PasswordHashingService(max_workers=1, max_pending=1, mode='thread', submit_timeout=0.01)
+        release = threading.Event()
+        try:
+            blocked = service._submit(release.wait)
+
+            with pytest.raises(HashingServiceBusyError):
+                service.submit_hash('Password123')
+
+            release.set()
+            blocked.result()
+            assert service.get_metrics()['rejected'] == 1
+        finally:
+            release.set()
+            service.shutdown()
+
+    def test_needs_rehash_and_background_rehash(self):
+        """Test rehash transparente cuando cambia el costo"""
+        old_service = PasswordHashingService(max_workers=1, mode='thread', hasher=BcryptHasher(rounds=4))
+        service = PasswordHashingService(max_workers=1, mode='thread', hasher=BcryptHasher(rounds=5))
+        try:
+            old_hash = old_service.hash_password('Password123')
+            assert service.needs_rehash(old_hash) is True
+
+            rehashed = []
+            done = threading.Event()
+
+            def on_rehashed(new_hash):
+                rehashed.append(new_hash)
+                done.set()
+
+            service.rehash_in_background('Password123', on_rehashed)
+
+            assert done.wait(timeout=10)
+            assert rehashed[0].startswith('$2b$05$')
+            assert service.needs_rehash(rehashed[0]) is False
+            assert service.verify_password('Password123', rehashed[0]) is True
+        finally:
+            old_service.shutdown()
+            service.shutdown()
+
+    def test_cancelled_job_is_its_own_outcome(self):
+        """Test que un hash cancelado en cola cuenta como cancelado y libera su lugar"""
+        service = PasswordHashingService(max_workers=1, max_pending=2, mode='thread', hasher=BcryptHasher(rounds=4))
+        release = threading.Event()
+        try:
+            blocked = service._submit(release.wait)
+            queued = service.rehash_in_background('Password123', lambda new_hash: None)
+
+            assert queued.cancel() is True
+            release.set()
+            blocked.result()
+
+            metrics = service.get_metrics()
+            assert metrics['cancelled'] == 1
+            assert metrics['failed'] == 0
+            assert metrics['queue_depth'] == 0
+        finally:
+            release.set()
+            service.shutdown()
+
+
+class TestPasswordHashers:
+    """Tests para el registro de hashers"""
+
+    def test_registry_and_identification(self):
+        """Test construcción por nombre y detección del algoritmo"""
+        hasher = build_hasher('bcrypt', {'rounds': 4})
+        hashed = hasher.hash('Password123')
+
+        assert identify_hasher_class(hashed) is BcryptHasher
+        assert identify_hasher_class('texto-plano') is None
+        with pytest.raises(ValueError):
+            build_hasher('md5')
+
+    def test_invalid_hash_does_not_raise(self):
+        """Test que un hash con formato inválido no verifica"""
+        service = PasswordHashingService(max_workers=1, mode='thread', hasher=BcryptHasher(rounds=4))
+        try:
+            assert service.verify_password('Password123', 'no-es-un-hash') is False
+        finally:
+            service.shutdown()
+
+    def test_calibrate_respects_minimum_cost(self):
+        """Test que la calibración nunca baja del costo mínimo"""
+        hasher = BcryptHasher.calibrate(target_ms=0.001, samples=1)
+        assert hasher.rounds == BcryptHasher.MIN_ROUNDS
+
+    def test_calibrated_settings_are_written_once_for_all_workers(self, tmp_path):
+        """Test que la calibración offline se guarda como config compartida en el .env"""
+        env_path = tmp_path / '.env'
+        env_path.write_text('JWT_SECRET=x\nBCRYPT_ROUNDS=10\n')
+
+        write_env_file(str(env_path), env_settings(BcryptHasher(rounds=13)))
+
+        assert env_path.read_text() == 'JWT_SECRET=x\nBCRYPT_ROUNDS=13\nPASSWORD_HASHER=bcrypt\n'
+
+    def test_calibration_overwrites_repeated_variables(self, tmp_path):
+        """Test que se reemplazan todas las apariciones (dotenv usa la última)"""
+        env_path = tmp_path / '.env'
+        env_path.write_text('BCRYPT_ROUNDS=12\nPASSWORD_HASHER=bcrypt\nBCRYPT_ROUNDS=12\n')
+
+        write_env_file(str(env_path), env_settings(BcryptHasher(rounds=13)))
+
+        assert env_path.read_text() == 'BCRYPT_ROUNDS=13\nPASSWORD_HASHER=bcrypt\nBCRYPT_ROUNDS=13\n'
@@ -182,7 +182,7 @@ class TestPasswordResetController:
         with patch('controllers.password_reset_controller.PasswordResetToken') as mock_token_class, \
              patch('controllers.password_reset_controller.User') as mock_user_class, \
              patch('controllers.password_reset_controller.hashlib') as mock_hashlib, \
-             patch('controllers.password_reset_controller.bcrypt') as mock_bcrypt:
+             patch('controllers.password_reset_controller.password_hasher') as mock_hasher:
             
             # Mock hashlib
             mock_hashlib.sha256.return_value.hexdigest.return_value = 'hashed_token'
@@ -201,9 +201,8 @@ class TestPasswordResetController:
             mock_user.save.return_value = 'user_id'
             mock_user_class.find_by_id.return_value = mock_user
             
-            # Mock bcrypt
-            mock_bcrypt.gensalt.return_value = b'salt'
-            mock_bcrypt.hashpw.return_value = b'hashed_password'
+            # Mock del servicio de hashing
+            mock_hasher.hash_password.return_value = 'hashed_password'
             
             # Ejecutar
             result, status_code = PasswordResetController.reset_password(request_data)
@@ -227,6 +226,58 @@ class TestPasswordResetController:
         assert status_code == 400
         assert '6 caracteres' in result['message']
     
+    @pytest.mark.skipif(not IMPORT_SUCCESS, reason="No se pudo importar PasswordResetController")
+    def test_reset_password_consumes_token_atomically(self):
+        """Test que el token se valida y marca como usado en una sola operación"""
+        request_data = {
+            'token': '123456',
+            'newPassword': 'NewPassword123'
+        }
+        
+        with patch('controllers.password_reset_controller.PasswordResetToken') as mock_token_class, \
+             patch('controllers.password_reset_controller.User') as mock_user_class, \
+             patch('controllers.password_reset_controller.password_hasher') as mock_hasher:
+            
+            mock_token = Mock()
+            mock_token.user_id = 'user_id'
+            mock_token_class.consume.return_value = mock_token
+            mock_user_class.find_by_id.return_value = Mock(_id='user_id', email='test@example.com')
+            mock_hasher.hash_password.return_value = 'hashed_password'
+            
+            result, status_code = PasswordResetController.reset_password(request_data)
+            
+            assert status_code == 200
+            mock_token_class.consume.assert_called_once()
+            mock_token_class.find_by_token.assert_not_called()
+            mock_token.mark_as_used.assert_not_called()
+            
+            # Un segundo intento con el mismo código ya no lo encuentra
+            mock_token_class.consume.return_value = None
+            result, status_code = PasswordResetController.reset_password(request_data)
+            assert status_code == 400
+    
+    @pytest.mark.skipif(not IMPORT_SUCCESS, reason="No se pudo importar PasswordResetController")
+    def test_consume_uses_single_find_one_and_update(self):
+        """Test que PasswordResetToken.consume hace un único round trip"""
+        token_data = {
+            '_id': '507f1f77bcf86cd799439012',
+            'user_id': '507f1f77bcf86cd799439011',
+            'token': 'hash',
+            'expires_at': datetime.utcnow() + timedelta(hours=1),
+            'used': True
+        }
+        
+        with patch.object(PasswordResetToken, 'get_collection') as mock_collection:
+            mock_collection.return_value.find_one_and_update.return_value = token_data
+            
+            token = PasswordResetToken.consume('hash')
+            
+            assert token.used is True
+            query, update = mock_collection.return_value.find_one_and_update.call_args[0]
+            assert query['used'] is False and '$gt' in query['expires_at']
+            assert update['$set']['used'] is True
+            mock_collection.return_value.find_one.assert_not_called()
+    
     def test_basic_import(self):
         """Test básico para verificar que al menos podemos hacer tests"""
         assert True
@@ -108,11 +108,8 @@ class TestProfileController:
             }
             mock_user_class.find_by_id.return_value = mock_user
             
-            # Mock validaciones
-            mock_user_class.validate_email.return_value = True
-            mock_user_class.validate_username.return_value = True
-            mock_user_class.find_by_email.return_value = None  # Email disponible
-            mock_user_class.find_by_username.return_value = None  # Username disponible
+            # Usuario y unicidad en una sola consulta: email y username disponibles
+            mock_user_class.find_with_conflicts.return_value = (mock_user, [])
             
             # Ejecutar
             result, status_code = ProfileController.update_profile(user_id, request_data)
@@ -138,11 +135,8 @@ class TestProfileController:
             mock_user._id = user_id
             mock_user_class.find_by_id.return_value = mock_user
             
-            # Mock usuario existente con el mismo email
-            mock_existing_user = Mock()
-            mock_existing_user._id = 'other_user_id'
-            mock_user_class.find_by_email.return_value = mock_existing_user
-            mock_user_class.validate_email.return_value = True
+            # Otro usuario ya usa el email
+            mock_user_class.find_with_conflicts.return_value = (mock_user, ['email'])
             
             # Ejecutar
             result, status_code = ProfileController.update_profile(user_id, request_data)
@@ -151,6 +145,43 @@ class TestProfileController:
             assert status_code == 400
             assert 'ya está en uso' in result['message']
     
+    @pytest.mark.skipif(not IMPORT_SUCCESS, reason="No se pudo importar ProfileController")
+    def test_update_profile_single_lookup(self):
+        """Test que el usuario y la unicidad se resuelven sin find_by_* adicionales"""
+        request_data = {'email': 'nuevo@example.com', 'username': 'nuevo_username'}
+        
+        with patch('controllers.profile_controller.User') as mock_user_class:
+            mock_user = Mock()
+            mock_user_class.find_with_conflicts.return_value = (mock_user, [])
+            
+            result, status_code = ProfileController.update_profile('mock_user_id', request_data)
+            
+            assert status_code == 200
+            mock_user_class.find_with_conflicts.assert_called_once_with(
+                'mock_user_id', email='nuevo@example.com', username='nuevo_username'
+            )
+            mock_user_class.find_by_id.assert_not_called()
+            mock_user_class.find_by_email.assert_not_called()
+            mock_user_class.find_by_username.assert_not_called()
+            mock_user.save.assert_called_once()
+    
+    @pytest.mark.skipif(not IMPORT_SUCCESS, reason="No se pudo importar ProfileController")
+    def test_update_profile_unique_index_mode(self):
+        """Test que con PROFILE_CONFLICT_CHECK=index el índice único rechaza el duplicado"""
+        from models.user import DuplicateUserFieldError
+        
+        with patch('controllers.profile_controller.User') as mock_user_class, \
+             patch('services.profile_validation.PROFILE_CONFLICT_CHECK', 'index'):
+            mock_user = Mock()
+            mock_user.save.side_effect = DuplicateUserFieldError('username')
+            mock_user_class.find_by_id.return_value = mock_user
+            
+            result, status_code = ProfileController.update_profile('mock_user_id', {'username': 'tomado'})
+            
+            assert status_code == 400
+            assert result['message'] == 'El nombre de usuario ya está en uso'
+            mock_user_class.find_with_conflicts.assert_not_called()
+    
     @pytest.mark.skipif(not IMPORT_SUCCESS, reason="No se pudo importar ProfileController")
     def test_change_password_success(self):
         """Test cambio exitoso de contraseña"""
@@ -160,9 +191,9 @@ class TestProfileController:
             'newPassword': 'NewPassword456'
         }
         
-        # Mock del modelo User y bcrypt
+        # Mock del modelo User y del servicio de hashing
         with patch('controllers.profile_controller.User') as mock_user_class, \
-             patch('controllers.profile_controller.bcrypt') as mock_bcrypt:
+             patch('controllers.profile_controller.password_hasher') as mock_hasher:
             
             # Mock usuario existente
             mock_user = Mock()
@@ -172,10 +203,12 @@ class TestProfileController:
             mock_user.save.return_value = user_id
             mock_user_class.find_by_id.return_value = mock_user
             
-            # Mock bcrypt para verificar contraseña actual
-            mock_bcrypt.checkpw.side_effect = [True, False]  # Primera llamada: verificar actual, Segunda: verificar que es diferente
-            mock_bcrypt.gensalt.return_value = b'salt'
-            mock_bcrypt.hashpw.return_value = b'new_hashed_password'
+            # Mock del pool para verificar contraseña actual
+            mock_hasher.submit_verify.side_effect = [
+                Mock(result=Mock(return_value=True)),  # Primera llamada: verificar actual
+                Mock(result=Mock(return_value=False))  # Segunda: verificar que es diferente
+            ]
+            mock_hasher.hash_password.return_value = 'new_hashed_password'
             
             # Ejecutar
             result, status_code = ProfileController.change_password(user_id, request_data)
@@ -193,9 +226,9 @@ class TestProfileController:
             'newPassword': 'NewPassword456'
         }
         
-        # Mock del modelo User y bcrypt
+        # Mock del modelo User y del servicio de hashing
         with patch('controllers.profile_controller.User') as mock_user_class, \
-             patch('controllers.profile_controller.bcrypt') as mock_bcrypt:
+             patch('controllers.profile_controller.password_hasher') as mock_hasher:
             
             # Mock usuario existente
             mock_user = Mock()
@@ -203,14 +236,16 @@ class TestProfileController:
             mock_user.password = 'hashed_password'
             mock_user_class.find_by_id.return_value = mock_user
             
-            # Mock bcrypt para fallar verificación
-            mock_bcrypt.checkpw.return_value = False
+            # Mock del pool para fallar verificación
+            mock_hasher.submit_verify.return_value = Mock(result=Mock(return_value=False))
               # Ejecutar
             result, status_code = ProfileController.change_password(user_id, request_data)
             
             # Verificar
             assert status_code == 400
             assert 'actual incorrecta' in result['message']
+            # Con la actual incorrecta no se verifica la nueva
+            assert mock_hasher.submit_verify.call_count == 1
     
     @pytest.mark.skipif(not IMPORT_SUCCESS, reason="No se pudo importar ProfileController")
     def test_change_password_weak_new_password(self):
@@ -221,9 +256,9 @@ class TestProfileController:
             'newPassword': 'weak'  # Muy corta y sin requisitos
         }
         
-        # Mock del modelo User y bcrypt
+        # Mock del modelo User y del servicio de hashing
         with patch('controllers.profile_controller.User') as mock_user_class, \
-             patch('controllers.profile_controller.bcrypt') as mock_bcrypt:
+             patch('controllers.profile_controller.password_hasher') as mock_hasher:
             
             # Mock usuario existente
             mock_user = Mock()
@@ -231,8 +266,8 @@ class TestProfileController:
             mock_user.password = 'hashed_password'
             mock_user_class.find_by_id.return_value = mock_user
             
-            # Mock bcrypt para pasar verificación de contraseña actual
-            mock_bcrypt.checkpw.return_value = True
+            # Mock del pool para pasar verificación de contraseña actual
+            mock_hasher.submit_verify.return_value = Mock(result=Mock(return_value=True))
             
             # Ejecutar
             result, status_code = ProfileController.change_password(user_id, request_data)
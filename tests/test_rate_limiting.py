@@ -0,0 +1,76 @@
+"""
+Tests para el rate limiting por endpoint
+"""
+import pytest
+import sys
+import os
+from unittest.mock import patch
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.rate_limiting import RATE_LIMIT_POLICIES, rate_limit_policy
+
+
+@pytest.fixture(scope='module')
+def app():
+    with patch('app.init_db'), patch('app.bootstrap_indexes'), patch('services.token_service.TokenService.init_app'):
+        from app import create_app
+        return create_app()
+
+
+class TestRateLimiting:
+    """Tests para el limiter aplicado a blueprints y namespaces de flask_restx"""
+
+    def test_policy_can_be_overridden_from_env(self):
+        """Test que RATE_LIMIT_<NOMBRE> sobrescribe la política por defecto"""
+        assert rate_limit_policy('register') == RATE_LIMIT_POLICIES['register']
+        with patch.dict(os.environ, {'RATE_LIMIT_REGISTER': '1 per second'}):
+            assert rate_limit_policy('register') == '1 per second'
+
+    def test_sensitive_endpoints_are_stricter_than_profile_reads(self):
+        """Test que forgot-password, register y upload son más estrictos que GET perfil"""
+        from limits import parse_many
+
+        def per_minute(name):
+            return min(item.amount * 60 / item.get_expiry() for item in parse_many(RATE_LIMIT_POLICIES[name]))
+
+        for name in ('forgot_password', 'register', 'upload_picture'):
+            assert per_minute(name) < per_minute('profile_read')
+
+    def test_blueprint_and_swagger_routes_share_counter(self, app):
+        """Test que la ruta legada y la de Swagger consumen el mismo límite"""
+        client = app.test_client()
+        environ = {'REMOTE_ADDR': '10.1.0.1'}
+        swagger_rule = next(
+            rule.rule for rule in app.url_map.iter_rules() if rule.endpoint == 'auth_forgot_password_resource'
+        )
+
+        with patch('controllers.password_reset_controller.PasswordResetController.request_password_reset',
+                   return_value=({'message': 'ok'}, 200)):
+            first = client.post('/api/auth/forgot-password', json={'email': 'a@b.com'}, environ_base=environ)
+            assert first.status_code == 200
+            assert first.headers['RateLimit-Limit'] == '3'
+            assert first.headers['RateLimit-Remaining'] == '2'
+            assert int(first.headers['RateLimit-Reset']) <= 61
+
+            client.post(swagger_rule, json={'email': 'a@b.com'}, environ_base=environ)
+            client.post('/api/auth/forgot-password', json={'email': 'a@b.com'}, environ_base=environ)
+            blocked = client.post(swagger_rule, json={'email': 'a@b.com'}, environ_base=environ)
+
+            assert blocked.status_code == 429
+            assert 'Retry-After' in blocked.headers
+
+    def test_limits_are_per_client(self, app):
+        """Test que el límite de un cliente no afecta a otro"""
+        client = app.test_client()
+
+        with patch('controllers.password_reset_controller.PasswordResetController.request_password_reset',
+                   return_value=({'message': 'ok'}, 200)):
+            for _ in range(3):
+                client.post('/api/auth/forgot-password', json={'email': 'a@b.com'},
+                            environ_base={'REMOTE_ADDR': '10.2.0.1'})
+            other = client.post('/api/auth/forgot-password', json={'email': 'a@b.com'},
+                                environ_base={'REMOTE_ADDR': '10.2.0.2'})
+
+            assert other.status_code == 200
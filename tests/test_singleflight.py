@@ -0,0 +1,189 @@
+"""
+Tests para la coalescencia de lecturas concurrentes (singleflight)
+"""
+import asyncio
+import pytest
+import sys
+import os
+import threading
+import time
+from unittest.mock import patch
+
+import bson
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.user import User
+from services.singleflight import SingleFlight
+from services.user_cache import UserCache
+
+USER_ID = '507f1f77bcf86cd799439011'
+
+
+def wait_for(condition, timeout=2):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, 'timeout esperando la condición'
+        time.sleep(0.001)
+
+
+def run_concurrently(flight, key, fn, count):
+    """Lanzar `count` hilos con la misma clave mientras fn() está bloqueada"""
+    release = threading.Event()
+    results, errors = [], []
+
+    def blocked():
+        release.wait(2)
+        return fn()
+
+    def worker():
+        try:
+            results.append(flight.do(key, blocked))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    wait_for(lambda: flight.get_metrics()['calls'] == count)
+    release.set()
+    for thread in threads:
+        thread.join(2)
+    return results, errors
+
+
+class TestSingleFlight:
+    """Tests para SingleFlight con hilos y con asyncio"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Test que los hilos con la misma clave comparten una consulta"""
+        flight = SingleFlight('test')
+        executions = []
+
+        results, errors = run_concurrently(flight, 'k', lambda: executions.append(1) or {'ok': True}, 8)
+
+        assert errors == []
+        assert len(executions) == 1
+        assert results == [{'ok': True}] * 8
+        metrics = flight.get_metrics()
+        assert metrics['executions'] == 1
+        assert metrics['shared'] == 7
+
+    def test_errors_reach_every_caller(self):
+        """Test que la excepción de la consulta llega a todos los que esperaban"""
+        flight = SingleFlight('test')
+
+        def fail():
+            raise RuntimeError('mongo caído')
+
+        results, errors = run_concurrently(flight, 'k', fail, 4)
+
+        assert results == []
+        assert len(errors) == 4
+        assert flight.get_metrics()['errors'] == 1
+
+    def test_sequential_calls_are_not_cached(self):
+        """Test que terminada la consulta la siguiente llamada vuelve a ejecutarse"""
+        flight = SingleFlight('test')
+        executions = []
+
+        flight.do('k', lambda: executions.append(1))
+        flight.do('k', lambda: executions.append(1))
+
+        assert len(executions) == 2
+        assert flight.get_metrics()['shared'] == 0
+
+    def test_disabled_runs_every_call(self):
+        """Test que deshabilitado cada llamada ejecuta su propia consulta"""
+        flight = SingleFlight('test', enabled=False)
+        executions = []
+
+        run_concurrently(flight, 'k', lambda: executions.append(1), 3)
+
+        assert len(executions) == 3
+
+    @pytest.mark.asyncio
+    async def test_async_tasks_share_one_execution(self):
+        """Test que las tareas del mismo loop comparten la corrutina en curso"""
+        flight = SingleFlight('test')
+        executions = []
+
+        async def load():
+            executions.append(1)
+            await asyncio.sleep(0.01)
+            return 'documento'
+
+        results = await asyncio.gather(*(flight.do_async('k', load) for _ in range(5)))
+
+        assert results == ['documento'] * 5
+        assert len(executions) == 1
+        assert flight.get_metrics()['shared'] == 4
+
+    def test_user_lookups_share_document_not_instance(self):
+        """Test que find_by_id concurrente hace una consulta y cada hilo recibe su User"""
+        flight = SingleFlight('users')
+        document = {'_id': bson.ObjectId(USER_ID), 'full_name': 'Test', 'email': 'test@example.com'}
+        release = threading.Event()
+        users = []
+
+        def find_one(*args, **kwargs):
+            release.wait(2)
+            return document
+
+        with patch('models.user.user_cache', UserCache(enabled=False)), \
+             patch('models.user.user_flight', flight), \
+             patch.object(User, 'get_collection') as mock_collection:
+            mock_collection.return_value.find_one.side_effect = find_one
+            threads = [threading.Thread(target=lambda: users.append(User.find_by_id(USER_ID))) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            wait_for(lambda: flight.get_metrics()['calls'] == 4)
+            release.set()
+            for thread in threads:
+                thread.join(2)
+
+            assert mock_collection.return_value.find_one.call_count == 1
+
+        assert len({id(user) for user in users}) == 4
+        assert all(user.email == 'test@example.com' for user in users)
+
+    def test_read_after_write_does_not_join_earlier_read(self):
+        """Test que una lectura que empieza después de escribir no recibe el documento anterior"""
+        flight = SingleFlight('users')
+        release = threading.Event()
+        started = threading.Event()
+        results = []
+
+        def stale_read():
+            started.set()
+            release.wait(2)
+            return {'version': 1}
+
+        reader = threading.Thread(target=lambda: results.append(flight.do('k', stale_read)))
+        reader.start()
+        started.wait(2)
+
+        flight.invalidate()  # Lo que hace User.save() tras escribir
+        fresh = flight.do('k', lambda: {'version': 2})
+        release.set()
+        reader.join(2)
+
+        assert fresh == {'version': 2}
+        assert results == [{'version': 1}]
+        assert flight.get_metrics()['shared'] == 0
+
+    def test_user_save_invalidates_flight(self):
+        """Test que guardar un usuario avanza la generación de user_flight"""
+        flight = SingleFlight('users')
+        document = {'_id': bson.ObjectId(USER_ID), 'full_name': 'Test', 'email': 'test@example.com', 'version': 1}
+
+        with patch('models.user.user_cache', UserCache(enabled=False)), \
+             patch('models.user.user_flight', flight), \
+             patch.object(User, 'get_collection') as mock_collection:
+            mock_collection.return_value.find_one.return_value = dict(document)
+            user = User.find_by_id(USER_ID)
+            user.full_name = 'Otro'
+            user.save()
+
+        assert flight.get_metrics()['invalidations'] == 1
@@ -0,0 +1,200 @@
+"""
+Tests para la denylist de tokens con filtro de Bloom
+"""
+import pytest
+import sys
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.token_denylist import BloomFilter, TokenDenylist, RevokedTokenError
+from services.token_service import TokenService
+
+
+class TestBloomFilter:
+    """Tests para BloomFilter"""
+
+    def test_no_false_negatives(self):
+        """Test que toda clave agregada se encuentra"""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        keys = [f'jti-{i}' for i in range(1000)]
+        for key in keys:
+            bloom.add(key)
+
+        assert all(key in bloom for key in keys)
+
+    def test_false_positive_rate(self):
+        """Test que la tasa de falsos positivos es cercana a la configurada"""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+
+        false_positives = sum(1 for i in range(10000) if f'otro-{i}' in bloom)
+        assert false_positives < 300
+
+
+class TestTokenDenylist:
+    """Tests para TokenDenylist"""
+
+    def claims(self, jti='jti-1', user_id='507f1f77bcf86cd799439011', iat=None):
+        return {
+            'userId': user_id,
+            'jti': jti,
+            'iat': iat if iat is not None else time.time(),
+            'exp': (datetime.utcnow() + timedelta(minutes=15)).timestamp()
+        }
+
+    def test_clean_token_does_not_hit_mongo(self):
+        """Test que un token no revocado solo cuesta la consulta al filtro"""
+        denylist = TokenDenylist(capacity=1000, sync_interval=60)
+
+        with patch('services.token_denylist.RevokedToken') as mock_revoked:
+            mock_revoked.user_key.side_effect = lambda user_id: f'user:{user_id}'
+            mock_revoked.find_keys_since.return_value = []
+
+            assert denylist.is_revoked(self.claims()) is False
+            assert denylist.is_revoked(self.claims()) is False
+
+            mock_revoked.find_by_key.assert_not_called()
+            assert mock_revoked.find_keys_since.call_count == 1  # Solo la sync inicial
+
+    def test_revoked_token_is_confirmed_in_mongo(self):
+        """Test que un positivo del filtro se confirma en Mongo"""
+        denylist = TokenDenylist(capacity=1000, sync_interval=60)
+
+        with patch('services.token_denylist.RevokedToken') as mock_revoked:
+            mock_revoked.user_key.side_effect = lambda user_id: f'user:{user_id}'
+            mock_revoked.find_keys_since.return_value = []
+            mock_revoked.find_by_key.return_value = {'key': 'jti-1'}
+
+            denylist.revoke_token(self.claims())
+
+            assert denylist.is_revoked(self.claims()) is True
+            mock_revoked.revoke.assert_called_once()
+            mock_revoked.find_by_key.assert_called_once_with('jti-1')
+
+    def test_incremental_sync_loads_other_workers_revocations(self):
+        """Test que la sync incremental incorpora revocaciones de otros workers"""
+        denylist = TokenDenylist(capacity=1000, sync_interval=0)
+
+        with patch('services.token_denylist.RevokedToken') as mock_revoked:
+            mock_revoked.user_key.side_effect = lambda user_id: f'user:{user_id}'
+            mock_revoked.find_keys_since.side_effect = [[], [('jti-2', datetime.utcnow())], [], []]
+            mock_revoked.find_by_key.return_value = {'key': 'jti-2'}
+
+            assert denylist.is_revoked(self.claims(jti='jti-2')) is False  # Carga inicial
+            denylist.is_revoked(self.claims(jti='jti-2'))  # Lanza la sync en segundo plano
+            denylist._sync_thread.join(timeout=2)
+
+            assert denylist.is_revoked(self.claims(jti='jti-2')) is True
+            denylist._sync_thread.join(timeout=2)
+
+    def test_background_sync_does_not_block_requests(self):
+        """Test que tras la carga inicial una sync lenta no frena los requests"""
+        denylist = TokenDenylist(capacity=1000, sync_interval=0)
+        release = threading.Event()
+        calls = []
+
+        def find_keys_since(since):
+            calls.append(since)
+            if len(calls) > 1:
+                release.wait(2)
+            return []
+
+        with patch('services.token_denylist.RevokedToken') as mock_revoked:
+            mock_revoked.user_key.side_effect = lambda user_id: f'user:{user_id}'
+            mock_revoked.find_keys_since.side_effect = find_keys_since
+
+            denylist.is_revoked(self.claims())
+            started = time.monotonic()
+            for _ in range(5):
+                assert denylist.is_revoked(self.claims()) is False
+            elapsed = time.monotonic() - started
+            release.set()
+            denylist._sync_thread.join(timeout=2)
+
+        assert elapsed < 1
+        assert len(calls) == 2  # Mientras una sync sigue en curso no se lanza otra
+        assert denylist.get_metrics()['checks'] == 6
+
+    def test_revoke_all_sessions_only_affects_older_tokens(self):
+        """Test que revocar por usuario rechaza solo tokens emitidos antes"""
+        denylist = TokenDenylist(capacity=1000, sync_interval=60)
+        revoked_before = datetime.utcnow()
+
+        with patch('services.token_denylist.RevokedToken') as mock_revoked:
+            mock_revoked.user_key.side_effect = lambda user_id: f'user:{user_id}'
+            mock_revoked.find_keys_since.return_value = []
+            mock_revoked.find_by_key.side_effect = lambda key: (
+                {'key': key, 'revoked_before': revoked_before} if key.startswith('user:') else None
+            )
+
+            denylist.revoke_user('507f1f77bcf86cd799439011', timedelta(minutes=15))
+
+            old_iat = revoked_before.replace(tzinfo=timezone.utc).timestamp() - 30
+            new_iat = time.time() + 30
+            assert denylist.is_revoked(self.claims(jti='old', iat=old_iat)) is True
+            assert denylist.is_revoked(self.claims(jti='new', iat=new_iat)) is False
+
+    def test_token_service_rejects_revoked_token(self):
+        """Test que TokenService rechaza (y saca de la caché) un token revocado"""
+        denylist = TokenDenylist(capacity=1000, sync_interval=60)
+        service = TokenService(secret_key='test-secret', denylist=denylist)
+
+        with patch('services.token_denylist.RevokedToken') as mock_revoked:
+            mock_revoked.user_key.side_effect = lambda user_id: f'user:{user_id}'
+            mock_revoked.find_keys_since.return_value = []
+            mock_revoked.find_by_key.return_value = {'key': 'any'}
+
+            token = service.issue_access_token('507f1f77bcf86cd799439011')
+            claims = service.verify_token(token)
+            service.revoke_access_token(token, claims)
+
+            with pytest.raises(RevokedTokenError):
+                service.verify_token(token)
+
+    def test_late_revocation_with_older_revoked_at_is_not_skipped(self):
+        """Test que una revocación confirmada tarde, con revoked_at anterior a la marca, entra en la sync"""
+        denylist = TokenDenylist(capacity=1000, sync_interval=0, sync_overlap=30)
+        watermark = datetime.utcnow()
+        late = watermark - timedelta(seconds=5)
+
+        with patch('services.token_denylist.RevokedToken') as mock_revoked:
+            mock_revoked.user_key.side_effect = lambda user_id: f'user:{user_id}'
+            mock_revoked.find_keys_since.side_effect = [
+                [('jti-1', watermark)],
+                [('jti-1', watermark), ('jti-late', late)],
+                [('jti-1', watermark), ('jti-late', late)],
+            ]
+            mock_revoked.find_by_key.return_value = {'key': 'jti-late'}
+
+            denylist.sync(full=True)
+            denylist.sync()
+            denylist._next_rebuild = float('inf')
+
+            since = mock_revoked.find_keys_since.call_args[0][0]
+            assert since == watermark - timedelta(seconds=30)
+            assert denylist.is_revoked(self.claims(jti='jti-late')) is True
+            # La entrada repetida de la ventana no se vuelve a agregar
+            assert denylist.get_metrics()['bloom_entries'] == 2
+            denylist._sync_thread.join(timeout=2)
+
+    def test_revoked_at_is_set_by_the_server(self):
+        """Test que revoked_at se fija con $currentDate y no con el reloj del worker"""
+        from models.revoked_token import RevokedToken
+
+        with patch.object(RevokedToken, 'get_collection') as mock_collection:
+            RevokedToken.revoke('jti-1', '507f1f77bcf86cd799439011', datetime.utcnow())
+            RevokedToken.revoke_user('507f1f77bcf86cd799439011', datetime.utcnow())
+
+        token_update, user_update = (call[0][1] for call in mock_collection.return_value.update_one.call_args_list)
+        assert token_update['$currentDate'] == {'revoked_at': True}
+        # revoked_before usa el mismo reloj que revoked_at
+        assert user_update['$currentDate'] == {'revoked_at': True, 'revoked_before': True}
+        for update in (token_update, user_update):
+            assert not {'revoked_at', 'revoked_before'} & set(update['$set'])
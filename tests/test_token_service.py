@@ -0,0 +1,136 @@
+"""
+Tests para el servicio de tokens JWT
+"""
+import pytest
+import sys
+import os
+import time
+from datetime import datetime, timedelta
+from unittest.mock import Mock, patch
+
+import jwt
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.token_service import TokenService, VerifiedTokenCache, InvalidRefreshTokenError
+
+SECRET = 'test-secret'
+
+
+def make_token(user_id='user_1', expires_in=timedelta(minutes=5)):
+    """Crear un JWT de prueba"""
+    payload = {'userId': user_id, 'exp': datetime.utcnow() + expires_in}
+    return jwt.encode(payload, SECRET, algorithm='HS256')
+
+
+class TestTokenService:
+    """Tests para TokenService y VerifiedTokenCache"""
+
+    def test_cache_hit_and_miss_counters(self):
+        """Test que la segunda verificación sale de la caché"""
+        service = TokenService(secret_key=SECRET)
+        token = make_token()
+
+        assert service.verify_token(token)['userId'] == 'user_1'
+        assert service.verify_token(token)['userId'] == 'user_1'
+
+        stats = service.get_metrics()
+        assert stats['misses'] == 1
+        assert stats['hits'] == 1
+        assert stats['size'] == 1
+
+    def test_invalid_token_is_not_cached(self):
+        """Test que un token inválido no entra a la caché"""
+        service = TokenService(secret_key=SECRET)
+        bad_token = jwt.encode({'userId': 'user_1'}, 'otro-secreto', algorithm='HS256')
+
+        with pytest.raises(jwt.InvalidTokenError):
+            service.verify_token(bad_token)
+        assert service.get_metrics()['size'] == 0
+
+    def test_entry_expires_at_token_exp(self):
+        """Test que la entrada se descarta en el exp del token"""
+        cache = VerifiedTokenCache()
+        cache.put('token', {'userId': 'user_1', 'exp': time.time() - 1})
+
+        assert cache.get('token') is None
+        assert cache.stats()['evictions'] == 1
+
+    def test_lru_eviction(self):
+        """Test que la caché respeta su tamaño máximo"""
+        cache = VerifiedTokenCache(max_size=2)
+        cache.put('a', {'userId': 'u'})
+        cache.put('b', {'userId': 'u'})
+        cache.get('a')
+        cache.put('c', {'userId': 'u'})
+
+        assert cache.get('b') is None
+        assert cache.get('a') is not None
+        assert cache.get('c') is not None
+
+    def test_invalidation(self):
+        """Test invalidación por token y por usuario"""
+        service = TokenService(secret_key=SECRET)
+        token_a = make_token('user_1')
+        token_b = make_token('user_1', timedelta(minutes=6))
+        token_c = make_token('user_2')
+        for token in (token_a, token_b, token_c):
+            service.verify_token(token)
+
+        service.invalidate_token(token_a)
+        assert service.cache.get(token_a) is None
+
+        service.invalidate_user_tokens('user_1')
+        assert service.cache.get(token_b) is None
+        assert service.cache.get(token_c) is not None
+
+    def test_access_token_lifetime_is_clamped(self):
+        """Test que el access token dura entre 5 y 15 minutos"""
+        assert TokenService(secret_key=SECRET, access_token_minutes=60).access_token_minutes == 15
+        assert TokenService(secret_key=SECRET, access_token_minutes=1).access_token_minutes == 5
+
+    def test_issue_token_pair(self):
+        """Test emisión de access + refresh token"""
+        service = TokenService(secret_key=SECRET)
+
+        with patch('services.token_service.RefreshToken') as mock_refresh_class:
+            mock_refresh_class.generate_token.return_value = ('raw_refresh', 'hashed_refresh')
+            tokens = service.issue_token_pair('user_1')
+
+            mock_refresh_class.assert_called_once_with(user_id='user_1', token='hashed_refresh', family_id=None)
+            mock_refresh_class.return_value.save.assert_called_once()
+
+        assert tokens['refreshToken'] == 'raw_refresh'
+        assert tokens['expiresIn'] == 15 * 60
+        claims = service.verify_token(tokens['token'])
+        assert claims['userId'] == 'user_1'
+        assert claims['type'] == 'access'
+
+    def test_rotate_refresh_token(self):
+        """Test rotación: el par nuevo pertenece a la misma familia"""
+        service = TokenService(secret_key=SECRET)
+
+        with patch('services.token_service.RefreshToken') as mock_refresh_class:
+            mock_refresh_class.hash_token.return_value = 'hashed_refresh'
+            mock_refresh_class.generate_token.return_value = ('new_raw', 'new_hashed')
+            mock_refresh_class.consume.return_value = Mock(user_id='user_1', family_id='family_1')
+
+            tokens = service.rotate_refresh_token('raw_refresh')
+
+            mock_refresh_class.consume.assert_called_once_with('hashed_refresh')
+            mock_refresh_class.assert_called_once_with(user_id='user_1', token='new_hashed', family_id='family_1')
+        assert tokens['refreshToken'] == 'new_raw'
+
+    def test_reused_refresh_token_revokes_family(self):
+        """Test que reutilizar un refresh token revoca toda la familia"""
+        service = TokenService(secret_key=SECRET)
+
+        with patch('services.token_service.RefreshToken') as mock_refresh_class:
+            mock_refresh_class.consume.return_value = None
+            mock_refresh_class.find_by_token.return_value = Mock(used=True, family_id='family_1')
+
+            with pytest.raises(InvalidRefreshTokenError):
+                service.rotate_refresh_token('raw_refresh')
+
+            mock_refresh_class.revoke_family.assert_called_once_with('family_1')
@@ -0,0 +1,158 @@
+"""
+Tests para la caché read-through de usuarios
+"""
+import pytest
+import sys
+import os
+from datetime import datetime
+from unittest.mock import patch
+
+import bson
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.user import User
+from services.user_cache import MemoryUserCacheBackend, UserCache
+
+USER_ID = bson.ObjectId('507f1f77bcf86cd799439011')
+USER_DOCUMENT = {
+    '_id': USER_ID,
+    'full_name': 'Test User',
+    'email': 'test@example.com',
+    'password': '$2b$12$' + 'x' * 53,
+    'username': 'testuser',
+    'createdAt': datetime(2024, 1, 1),
+    'updatedAt': datetime(2024, 1, 1),
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class BrokenBackend(MemoryUserCacheBackend):
+    def get(self, key):
+        raise ConnectionError('backend caído')
+
+
+class TestUserCache:
+    """Tests para UserCache y su backend en memoria"""
+
+    def test_read_through_by_id_email_and_username(self):
+        """Test que tras un miss las tres claves se sirven desde la caché"""
+        cache = UserCache()
+        loads = []
+
+        def loader():
+            loads.append(1)
+            return dict(USER_DOCUMENT)
+
+        cache.get('_id', str(USER_ID), loader)
+        assert cache.get('_id', str(USER_ID), loader)['email'] == 'test@example.com'
+        assert cache.get('email', 'test@example.com', loader)['_id'] == USER_ID
+        assert cache.get('username', 'testuser', loader)['_id'] == USER_ID
+
+        assert len(loads) == 1
+        metrics = cache.get_metrics()
+        assert metrics['hits'] == 3 and metrics['misses'] == 1
+        assert metrics['hit_rate'] == 0.75
+
+    def test_stale_alias_is_a_miss(self):
+        """Test que un email viejo no devuelve al usuario que lo cambió"""
+        cache = UserCache()
+        cache.put(dict(USER_DOCUMENT, email='nuevo@example.com'))
+        cache.backend.set('email:test@example.com', str(USER_ID), 30)
+
+        assert cache.get('email', 'test@example.com', lambda: None) is None
+        assert cache.get_metrics()['misses'] == 1
+
+    def test_ttl_and_lru_eviction(self):
+        """Test que las entradas expiran y que el tamaño está acotado"""
+        clock = FakeClock()
+        backend = MemoryUserCacheBackend(max_size=2, clock=clock)
+        backend.set('a', 1, 10)
+        backend.set('b', 2, 10)
+        backend.get('a')
+        backend.set('c', 3, 10)
+
+        assert backend.get('b') is None  # La menos usada
+        assert backend.get('a') == 1
+        clock.now = 10
+        assert backend.get('a') is None
+        assert backend.stats()['evictions'] == 2
+
+    def test_backend_errors_fall_back_to_loader(self):
+        """Test que un backend caído no rompe la lectura"""
+        cache = UserCache(backend=BrokenBackend())
+
+        assert cache.get('_id', str(USER_ID), lambda: dict(USER_DOCUMENT))['email'] == 'test@example.com'
+        assert cache.get_metrics()['backend_errors'] == 1
+
+    def test_load_started_before_invalidate_is_not_cached(self):
+        """Test que una lectura que cargó el documento antes de una escritura no lo vuelve a cachear"""
+        clock = FakeClock()
+        cache = UserCache(backend=MemoryUserCacheBackend(clock=clock), tombstone_seconds=5)
+        loads = []
+
+        def loader():
+            # Lee el documento viejo y, antes de guardarlo en la caché, otro
+            # request escribe al usuario e invalida
+            loads.append(1)
+            stale = dict(USER_DOCUMENT, version=1)
+            if len(loads) == 1:
+                cache.invalidate(str(USER_ID))
+            return stale
+
+        assert cache.get('_id', str(USER_ID), loader)['version'] == 1
+        assert cache.get('_id', str(USER_ID), loader) is not None
+        assert len(loads) == 2  # El documento viejo no quedó en caché
+        assert cache.get_metrics()['stale_puts'] == 2
+
+        clock.now = 5
+        cache.get('_id', str(USER_ID), loader)
+        cache.get('_id', str(USER_ID), loader)
+        assert len(loads) == 3  # Pasado el tombstone se vuelve a cachear
+
+    def test_put_never_replaces_a_newer_version(self):
+        """Test que put() no reemplaza un documento con una versión más nueva"""
+        cache = UserCache()
+        cache.put(dict(USER_DOCUMENT, version=3, full_name='Nuevo'))
+        cache.put(dict(USER_DOCUMENT, version=2, full_name='Viejo'))
+
+        assert cache.get('_id', str(USER_ID), lambda: None)['full_name'] == 'Nuevo'
+
+
+class TestUserModelCaching:
+    """Tests para la integración de la caché con User"""
+
+    def test_save_invalidates_cached_user(self):
+        """Test que User.save() descarta el documento en caché"""
+        cache = UserCache()
+        with patch('models.user.user_cache', cache), patch.object(User, 'get_collection') as mock_collection:
+            mock_collection.return_value.find_one.return_value = dict(USER_DOCUMENT)
+            user = User.find_by_id(str(USER_ID))
+            User.find_by_email('test@example.com')
+            assert mock_collection.return_value.find_one.call_count == 1
+
+            user.full_name = 'Otro Nombre'
+            user.save()
+            mock_collection.return_value.find_one.return_value = dict(USER_DOCUMENT, full_name='Otro Nombre')
+
+            assert User.find_by_username('testuser').full_name == 'Otro Nombre'
+            assert mock_collection.return_value.find_one.call_count == 2
+            assert cache.get_metrics()['invalidations'] == 1
+
+    def test_projected_lookups_bypass_cache(self):
+        """Test que las consultas con proyección (login) van siempre a la BD"""
+        cache = UserCache()
+        cache.put(dict(USER_DOCUMENT))
+        with patch('models.user.user_cache', cache), patch.object(User, 'get_collection') as mock_collection:
+            mock_collection.return_value.find_one.return_value = dict(USER_DOCUMENT)
+            User.find_credentials_by_email('test@example.com', covered=False)
+
+            mock_collection.return_value.find_one.assert_called_once()
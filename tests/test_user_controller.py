@@ -91,15 +91,19 @@ class TestUserController:
                     'full_name': 'Test User',
                     'email': 'test@example.com'
                 }
-                mock_user_class.find_by_email.return_value = mock_user
+                mock_user_class.find_credentials_by_email.return_value = mock_user
                 
-                # Mock bcrypt
-                with patch('controllers.user_controller.bcrypt') as mock_bcrypt:
-                    mock_bcrypt.checkpw.return_value = True
+                # Mock del servicio de hashing
+                with patch('controllers.user_controller.password_hasher') as mock_hasher:
+                    mock_hasher.verify_password.return_value = True
                     
-                    # Mock jwt
-                    with patch('controllers.user_controller.jwt') as mock_jwt:
-                        mock_jwt.encode.return_value = b'mock_token'  # jwt devuelve bytes
+                    # Mock del servicio de tokens (access + refresh)
+                    with patch('controllers.user_controller.token_service') as mock_tokens:
+                        mock_tokens.issue_token_pair.return_value = {
+                            'token': 'mock_token',
+                            'refreshToken': 'mock_refresh_token',
+                            'expiresIn': 900
+                        }
                         
                         # Ejecutar
                         result, status_code = UserController.login_user(request_data)
@@ -107,6 +111,7 @@ class TestUserController:
                         # Verificar
                         assert status_code == 200
                         assert 'token' in result or 'message' in result
+                        assert result['refreshToken'] == 'mock_refresh_token'
     
     @pytest.mark.skipif(not IMPORT_SUCCESS, reason="No se pudo importar UserController")
     def test_login_user_invalid_credentials(self):
@@ -118,7 +123,7 @@ class TestUserController:
         
         # Mock usuario no encontrado
         with patch('controllers.user_controller.User') as mock_user_class:
-            mock_user_class.find_by_email.return_value = None
+            mock_user_class.find_credentials_by_email.return_value = None
             
             # Ejecutar
             result, status_code = UserController.login_user(request_data)
@@ -166,11 +171,11 @@ class TestUserController:
             mock_user = Mock()
             mock_user._id = 'mock_user_id'
             mock_user.password = '$2b$12$hash'  # Hash mock
-            mock_user_class.find_by_email.return_value = mock_user
+            mock_user_class.find_credentials_by_email.return_value = mock_user
             
-            # Mock bcrypt para que falle la verificación
-            with patch('controllers.user_controller.bcrypt') as mock_bcrypt:
-                mock_bcrypt.checkpw.return_value = False  # Contraseña incorrecta
+            # Mock del servicio de hashing para que falle la verificación
+            with patch('controllers.user_controller.password_hasher') as mock_hasher:
+                mock_hasher.verify_password.return_value = False  # Contraseña incorrecta
                 
                 # Ejecutar
                 result, status_code = UserController.login_user(request_data)
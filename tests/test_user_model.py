@@ -0,0 +1,214 @@
+"""
+Tests para el modelo User (actualizaciones parciales con dirty tracking)
+"""
+import pytest
+import sys
+import os
+from datetime import datetime
+from unittest.mock import patch
+
+import bson
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.user import User
+from services.user_cache import UserCache
+
+USER_DOCUMENT = {
+    '_id': bson.ObjectId('507f1f77bcf86cd799439011'),
+    'full_name': 'Test User',
+    'email': 'test@example.com',
+    'password': '$2b$12$' + 'x' * 53,
+    'username': 'testuser',
+    'profilePicture': '/static/uploads/profile_pictures/test.jpg',
+    'gender': 'other',
+    'address': 'Calle 123 # 45-67, Bogotá',
+    'phoneNumber': '+57 300 123 4567',
+    'createdAt': datetime(2024, 1, 1),
+    'updatedAt': datetime(2024, 1, 1),
+}
+
+
+def wire_bytes(update):
+    """Tamaño BSON del documento de actualización enviado a MongoDB"""
+    return len(bson.encode(update))
+
+
+class TestUserDirtyTracking:
+    """Tests para save() con $set/$unset mínimos"""
+
+    def load_user(self):
+        with patch('models.user.user_cache', UserCache(enabled=False)), \
+             patch.object(User, 'get_collection') as mock_collection:
+            mock_collection.return_value.find_one.return_value = dict(USER_DOCUMENT)
+            return User.find_by_id(str(USER_DOCUMENT['_id']))
+
+    def test_unchanged_user_skips_write(self):
+        """Test que guardar sin cambios no escribe en la BD"""
+        user = self.load_user()
+
+        with patch.object(User, 'get_collection') as mock_collection:
+            user.save()
+            mock_collection.return_value.update_one.assert_not_called()
+
+    def test_only_changed_fields_are_sent(self):
+        """Test que solo se envía el campo modificado (sin el hash de contraseña)"""
+        user = self.load_user()
+        user.phone_number = '+57 311 000 0000'
+
+        with patch.object(User, 'get_collection') as mock_collection:
+            user.save()
+            _, update = mock_collection.return_value.update_one.call_args[0]
+
+        assert set(update['$set']) == {'phoneNumber', 'updatedAt'}
+        assert '$unset' not in update
+
+        full_rewrite = {'$set': {field: value for field, value in USER_DOCUMENT.items() if field != '_id'}}
+        print(f'📦 update parcial: {wire_bytes(update)} bytes, reescritura completa: {wire_bytes(full_rewrite)} bytes')
+        assert wire_bytes(update) < wire_bytes(full_rewrite) / 3
+
+    def test_cleared_optional_field_is_unset(self):
+        """Test que un campo opcional vaciado se elimina con $unset"""
+        user = self.load_user()
+        user.username = None
+
+        update = user.update_document()
+
+        assert update['$unset'] == {'username': ''}
+        assert set(update['$set']) == {'updatedAt'}
+
+    def test_save_resets_dirty_state(self):
+        """Test que tras guardar no quedan cambios pendientes"""
+        user = self.load_user()
+        user.full_name = 'Otro Nombre'
+
+        with patch.object(User, 'get_collection'):
+            user.save()
+
+        assert user.dirty_fields() == []
+        assert user.update_document() is None
+
+    def test_user_without_snapshot_never_unsets(self):
+        """Test que un usuario construido a mano no borra campos que no conoce"""
+        user = User(full_name='Test', email='test@example.com', password='hash', _id=str(USER_DOCUMENT['_id']))
+
+        update = user.update_document()
+
+        assert '$unset' not in update
+        assert 'username' not in update['$set']
+
+
+class TestUserMapping:
+    """Tests para from_document, __slots__ y campos perezosos"""
+
+    def test_instances_have_no_dict(self):
+        """Test que User usa __slots__"""
+        user = User.from_document(USER_DOCUMENT)
+
+        assert not hasattr(user, '__dict__')
+        assert user.phone_number == '+57 300 123 4567'
+        assert user._id == str(USER_DOCUMENT['_id'])
+
+    def test_projection_loads_missing_fields_lazily(self):
+        """Test que los campos fuera de la proyección se cargan en una sola consulta"""
+        with patch.object(User, 'get_collection') as mock_collection:
+            mock_collection.return_value.find_one.return_value = {
+                '_id': USER_DOCUMENT['_id'], 'email': USER_DOCUMENT['email'], 'password': USER_DOCUMENT['password']
+            }
+            user = User.find_by_email('test@example.com', fields=['email', 'password'])
+
+            query, projection = mock_collection.return_value.find_one.call_args[0]
+            assert projection == {'email': 1, 'password': 1}
+            assert user.password == USER_DOCUMENT['password']
+
+            mock_collection.return_value.find_one.reset_mock()
+            mock_collection.return_value.find_one.return_value = dict(USER_DOCUMENT)
+            assert user.full_name == 'Test User'
+            assert user.username == 'testuser'
+            assert mock_collection.return_value.find_one.call_count == 1
+
+    def test_projected_user_only_updates_changed_fields(self):
+        """Test que un usuario proyectado no reescribe campos que no cargó"""
+        user = User.from_document(
+            {'_id': USER_DOCUMENT['_id'], 'password': USER_DOCUMENT['password']}, fields=['password']
+        )
+        user.password = 'nuevo_hash'
+
+        update = user.update_document()
+
+        assert set(update['$set']) == {'password', 'updatedAt'}
+        assert '$unset' not in update
+
+
+class TestCredentialLookup:
+    """Tests para la búsqueda de credenciales del login"""
+
+    def test_projects_only_credential_fields(self):
+        """Test que el login no trae el documento completo"""
+        with patch.object(User, 'get_collection') as mock_collection:
+            mock_collection.return_value.find_one.return_value = {
+                '_id': USER_DOCUMENT['_id'],
+                **{User.FIELDS[a]: USER_DOCUMENT[User.FIELDS[a]] for a in User.CREDENTIAL_FIELDS}
+            }
+            user = User.find_credentials_by_email('Test@Example.com', covered=False)
+            user_dict = user.to_dict(fields=User.LOGIN_RESPONSE_FIELDS)
+
+            query, projection = mock_collection.return_value.find_one.call_args[0]
+            assert query == {'email': 'test@example.com'}
+            assert 'address' not in projection and 'phoneNumber' not in projection
+            assert mock_collection.return_value.find_one.call_count == 1
+            assert user_dict['username'] == 'testuser'
+            assert 'password' not in user_dict
+
+    def test_covered_lookup_uses_index_hint(self):
+        """Test que con el índice cubierto solo se piden campos del índice"""
+        with patch.object(User, 'get_collection') as mock_collection:
+            mock_collection.return_value.find_one.return_value = {
+                '_id': USER_DOCUMENT['_id'], 'email': USER_DOCUMENT['email'], 'password': USER_DOCUMENT['password']
+            }
+            user = User.find_credentials_by_email('test@example.com', covered=True)
+
+            args, kwargs = mock_collection.return_value.find_one.call_args
+            assert args[1] == {'email': 1, 'password': 1}
+            assert kwargs == {'hint': 'login_credentials'}
+            assert user.password == USER_DOCUMENT['password']
+
+
+class TestProfileConflictLookup:
+    """Tests para cargar el usuario y verificar unicidad en una consulta"""
+
+    def test_user_and_conflicts_in_one_query(self):
+        """Test que el $or incluye el _id del usuario y separa los conflictos"""
+        other = {'_id': bson.ObjectId(), 'email': 'otro@example.com', 'username': 'tomado'}
+        with patch.object(User, 'get_collection') as mock_collection:
+            mock_collection.return_value.find.return_value.limit.return_value = [
+                {k: v for k, v in USER_DOCUMENT.items() if k != 'password'}, other
+            ]
+            user, conflicts = User.find_with_conflicts(str(USER_DOCUMENT['_id']), email='test@example.com',
+                                                       username='tomado')
+
+            query, projection = mock_collection.return_value.find.call_args[0]
+            assert query['$or'] == [
+                {'_id': USER_DOCUMENT['_id']}, {'email': 'test@example.com'}, {'username': 'tomado'}
+            ]
+            assert 'password' not in projection
+            assert mock_collection.return_value.find.call_count == 1
+
+        assert user.full_name == 'Test User'
+        assert conflicts == ['username']  # El email es el del propio usuario
+
+    def test_duplicate_key_names_the_field(self):
+        """Test que un DuplicateKeyError se traduce al campo único violado"""
+        from pymongo.errors import DuplicateKeyError
+        from models.user import DuplicateUserFieldError
+
+        user = User(full_name='Test', email='test@example.com', password='hash')
+        error = DuplicateKeyError('E11000', 11000, {'keyPattern': {'username': 1}, 'keyValue': {'username': 'x'}})
+        with patch.object(User, 'get_collection') as mock_collection:
+            mock_collection.return_value.insert_one.side_effect = error
+            with pytest.raises(DuplicateUserFieldError) as excinfo:
+                user.save()
+
+        assert excinfo.value.field == 'username'
+        assert str(excinfo.value) == 'El nombre de usuario ya está en uso'
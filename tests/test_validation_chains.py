@@ -0,0 +1,106 @@
+"""
+Tests para las cadenas de validación precompiladas (registro y perfil)
+"""
+import pytest
+import sys
+import os
+from unittest.mock import patch, MagicMock
+
+import bson
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.user import User
+from services.profile_validation import create_profile_validation_chain
+from services.user_creation_validation import create_user_validation_chain
+from utils.handler_template import merge_validation_errors
+
+CURRENT_USER_ID = '507f1f77bcf86cd799439011'
+
+
+def fake_repository(conflicts=()):
+    calls = []
+
+    async def find_conflicts(email=None, username=None, exclude_id=None):
+        calls.append({'email': email, 'username': username, 'exclude_id': exclude_id})
+        return list(conflicts)
+
+    repository = MagicMock()
+    repository.find_conflicts = find_conflicts
+    return repository, calls
+
+
+class TestValidationChains:
+    """Tests para las cadenas singleton y la consulta de unicidad combinada"""
+
+    def test_chains_are_built_once_and_frozen(self):
+        """Test que cada request reutiliza la misma cadena inmutable"""
+        assert create_user_validation_chain() is create_user_validation_chain()
+        assert create_profile_validation_chain() is create_profile_validation_chain()
+
+        with pytest.raises(RuntimeError):
+            create_user_validation_chain().set_next(MagicMock())
+
+    @pytest.mark.asyncio
+    async def test_profile_uniqueness_is_one_query(self):
+        """Test que email y username se verifican en una sola consulta"""
+        repository, calls = fake_repository(conflicts=['username'])
+        responses = []
+
+        with patch('handlers.profile_validation_handler.user_repository', repository):
+            passed = await create_profile_validation_chain().handle(
+                {'email': ' Nuevo@Example.com ', 'username': 'tomado', 'current_user_id': CURRENT_USER_ID},
+                lambda data, status: responses.append((data, status))
+            )
+
+        assert passed is False
+        assert calls == [{'email': 'nuevo@example.com', 'username': 'tomado', 'exclude_id': CURRENT_USER_ID}]
+        assert responses[0][0]['message'] == 'El nombre de usuario ya está en uso'
+
+    @pytest.mark.asyncio
+    async def test_pure_checks_fail_before_db(self):
+        """Test que un dato inválido no llega a consultar la BD"""
+        repository, calls = fake_repository()
+
+        with patch('handlers.user_creation_handler.user_repository', repository):
+            passed = await create_user_validation_chain().handle(
+                {'full_name': 'Test', 'email': 'no-es-email', 'password': 'Password123'}, lambda *args: None
+            )
+
+        assert passed is False
+        assert calls == []
+
+    @pytest.mark.asyncio
+    async def test_collect_all_errors(self):
+        """Test que handle_all reporta todas las validaciones puras fallidas"""
+        repository, calls = fake_repository()
+
+        with patch('handlers.user_creation_handler.user_repository', repository):
+            errors = await create_user_validation_chain().handle_all(
+                {'full_name': 'T', 'email': 'no-es-email', 'password': 'abc'}
+            )
+
+        data, status = merge_validation_errors(errors)
+        assert status == 400
+        assert data['errors'] == [  # Un error por campo inválido
+            'El nombre debe tener al menos 2 caracteres',
+            'El formato del correo electrónico no es válido',
+            'La contraseña debe tener al menos 6 caracteres'
+        ]
+        assert calls == []  # La unicidad no se consulta si ya hay errores
+
+    def test_find_conflicts_uses_single_or_query(self):
+        """Test que User.find_conflicts combina los campos únicos con $or"""
+        with patch.object(User, 'get_collection') as mock_collection:
+            mock_collection.return_value.find.return_value.limit.return_value = [
+                {'_id': bson.ObjectId(), 'email': 'nuevo@example.com', 'username': 'otro'}
+            ]
+            conflicts = User.find_conflicts('Nuevo@Example.com', 'tomado', exclude_id=CURRENT_USER_ID)
+
+            query, projection = mock_collection.return_value.find.call_args[0]
+
+        assert conflicts == ['email']
+        assert query['$or'] == [{'email': 'nuevo@example.com'}, {'username': 'tomado'}]
+        assert query['_id'] == {'$ne': bson.ObjectId(CURRENT_USER_ID)}
+        assert mock_collection.return_value.find.call_count == 1
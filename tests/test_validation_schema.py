@@ -0,0 +1,175 @@
+"""
+Tests para los schemas de validación compilados
+"""
+import pytest
+import sys
+import os
+
+# Agregar el directorio padre al path para importar módulos
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.schema import Field, Schema, error_messages
+from services.validation_schemas import (
+    validate_registration,
+    validate_profile_update,
+    validate_profile_request,
+    validate_password_change,
+    validate_password_reset,
+    validate_password_reset_request
+)
+from handlers.schema_validation_handler import SchemaValidationHandler
+
+
+class TestSchema:
+    """Tests para el compilador de schemas"""
+
+    def test_normalizes_in_one_pass(self):
+        """Test que strip/lower se aplican y solo se devuelven los campos declarados"""
+        validate = Schema({'email': Field(lower=True), 'name': Field()}).compile()
+
+        data, errors = validate({'email': ' A@B.CO ', 'name': ' Ana ', 'extra': 1})
+
+        assert errors == []
+        assert data == {'email': 'a@b.co', 'name': 'Ana'}
+
+    def test_rule_messages_in_declaration_order(self):
+        """Test que se reporta un error por campo, en el orden del schema"""
+        validate = Schema({
+            'a': Field(min_length=3, message='a corto'),
+            'b': Field(choices=('x', 'y'), messages={'choices': 'b inválido'}),
+        }).compile()
+
+        _, errors = validate({'b': 'z', 'a': 'ab'})
+
+        assert errors == [('a', 'a corto'), ('b', 'b inválido')]
+
+    def test_non_string_values_are_rejected(self):
+        """Test que un valor que no es texto da error en lugar de excepción"""
+        validate = Schema({'a': Field(message='a inválido')}).compile()
+
+        assert validate({'a': 123})[1] == [('a', 'a inválido')]
+
+    def test_nullable_fields(self):
+        """Test que None o vacío se normalizan a None en campos opcionales"""
+        validate = Schema({'a': Field(nullable=True, min_length=5)}).compile()
+
+        assert validate({'a': '   '}) == ({'a': None}, [])
+        assert validate({'a': None}) == ({'a': None}, [])
+
+    def test_choices_are_exact_values(self):
+        """Test que choices compara contra los valores, no contra el mensaje"""
+        validate = Schema({'a': Field(choices=('male',), message='Opciones: male')}).compile()
+
+        assert validate({'a': 'male'}) == ({'a': 'male'}, [])
+        assert validate({'a': 'Opc'})[1] == [('a', 'Opciones: male')]
+        assert validate({'a': ''})[1] == [('a', 'Opciones: male')]
+
+
+class TestPayloadSchemas:
+    """Tests para los schemas de registro, perfil y contraseñas"""
+
+    def test_registration_valid(self):
+        """Test registro válido con normalización"""
+        data, errors = validate_registration(
+            {'full_name': '  Ana Pérez ', 'email': ' Ana@Example.com', 'password': 'Password123'}
+        )
+
+        assert errors == []
+        assert data == {'full_name': 'Ana Pérez', 'email': 'ana@example.com', 'password': 'Password123'}
+
+    def test_registration_missing_fields_single_message(self):
+        """Test que los obligatorios faltantes dan un solo mensaje, antes que el resto"""
+        _, errors = validate_registration({'full_name': ' ', 'email': 'no-es-email'})
+
+        assert error_messages(errors) == [
+            'Todos los campos son obligatorios (nombre, email, contraseña)',
+            'El formato del correo electrónico no es válido'
+        ]
+
+    @pytest.mark.parametrize('password, message', [
+        ('abc', 'La contraseña debe tener al menos 6 caracteres'),
+        ('password123', 'La contraseña debe contener al menos una mayúscula, una minúscula y un número'),
+    ])
+    def test_registration_weak_password(self, password, message):
+        """Test reglas de contraseña del registro"""
+        _, errors = validate_registration({'full_name': 'Ana', 'email': 'ana@example.com', 'password': password})
+
+        assert errors == [('password', message)]
+
+    def test_profile_unknown_and_empty(self):
+        """Test campos no permitidos y payload vacío en perfil"""
+        assert validate_profile_update({'password': 'x', 'full_name': 'Ana'})[1] == [
+            (None, 'Campos no permitidos: password')
+        ]
+        assert validate_profile_update({})[1] == [
+            (None, 'Debe proporcionar al menos un campo para actualizar')
+        ]
+
+    def test_profile_optional_fields(self):
+        """Test que los opcionales vacíos se borran y el resto se normaliza"""
+        data, errors = validate_profile_update({
+            'username': '', 'gender': 'Female', 'address': None,
+            'phoneNumber': ' +57 300 123 4567 ', 'profilePicture': None
+        })
+
+        assert errors == []
+        assert data == {
+            'username': None, 'gender': 'female', 'address': None,
+            'phoneNumber': '+57 300 123 4567', 'profilePicture': None
+        }
+
+    def test_profile_invalid_values(self):
+        """Test mensajes de los campos de perfil inválidos"""
+        _, errors = validate_profile_update({'username': 'a!', 'gender': 'x', 'address': 'abc'})
+
+        assert error_messages(errors) == [
+            'Username inválido. Debe tener 3-20 caracteres y solo letras, números y guiones bajos',
+            'Género inválido. Opciones: male, female, other, prefer_not_to_say',
+            'Dirección inválida. Debe tener entre 5 y 200 caracteres'
+        ]
+        assert validate_profile_update({'gender': 'ido'})[1] == [
+            ('gender', 'Género inválido. Opciones: male, female, other, prefer_not_to_say')
+        ]
+
+    def test_profile_request_email_message(self):
+        """Test que PUT /profile mantiene su mensaje de email inválido"""
+        assert validate_profile_request({'email': 'no-es-email'})[1] == [('email', 'Formato de correo inválido')]
+        assert validate_profile_update({'email': 'no-es-email'})[1] == [
+            ('email', 'El formato del correo electrónico no es válido')
+        ]
+
+    def test_password_change_and_reset(self):
+        """Test schemas de cambio y restablecimiento de contraseña"""
+        assert validate_password_change({'currentPassword': 'x'})[1] == [
+            (None, 'Contraseña actual y nueva son obligatorias')
+        ]
+        assert validate_password_change({'currentPassword': 'x', 'newPassword': 'abc'})[1] == [
+            ('newPassword', 'La nueva contraseña debe tener al menos 6 caracteres')
+        ]
+        assert error_messages(validate_password_reset({'newPassword': 'Password123'})[1]) == ['Token requerido']
+        assert validate_password_reset_request({'email': 42})[1] == [
+            ('email', 'Formato de email inválido en la solicitud.')
+        ]
+
+
+class TestSchemaValidationHandler:
+    """Tests para el handler de schema en las cadenas"""
+
+    @pytest.mark.asyncio
+    async def test_writes_normalized_values_to_context(self):
+        """Test que la cadena deja el payload normalizado para los handlers siguientes"""
+        context = {'full_name': ' Ana ', 'email': 'ANA@example.com', 'password': 'Password123'}
+
+        assert await SchemaValidationHandler(validate_registration).check(context) is None
+        assert context['email'] == 'ana@example.com'
+        assert context['full_name'] == 'Ana'
+
+    @pytest.mark.asyncio
+    async def test_context_keys_are_not_validated(self):
+        """Test que las claves propias del contexto no cuentan como campos no permitidos"""
+        handler = SchemaValidationHandler(validate_profile_update, context_keys=('current_user_id',))
+
+        assert await handler.check({'full_name': 'Ana', 'current_user_id': 'abc'}) is None
+        assert await handler.check_all({'full_name': 'A', 'current_user_id': 'abc'}) == [
+            ({'message': 'El nombre debe tener al menos 2 caracteres'}, 400)
+        ]
@@ -4,28 +4,106 @@ Template base para el patrón Chain of Responsibility
 from abc import ABC, abstractmethod
 
 class Handler(ABC):
-    """Clase base abstracta para handlers"""
-    
+    """
+    Clase base abstracta para handlers
+
+    Cada handler implementa check(); la cadena se arma una sola vez, se
+    congela con freeze() y se reutiliza en todos los requests (los handlers
+    no guardan estado por request).
+    """
+
+    # True en los handlers que consultan la BD: en modo collect-all-errors
+    # solo se ejecutan si las validaciones puras pasaron
+    db_backed = False
+
     def __init__(self):
         self._next_handler = None
-    
+        self._frozen = False
+
     def set_next(self, handler):
         """Establecer el siguiente handler en la cadena"""
+        if self._frozen:
+            raise RuntimeError('La cadena de validación está congelada')
         self._next_handler = handler
         return handler
-    
+
+    def freeze(self):
+        """Impedir cambios en la cadena a partir de este handler"""
+        handler = self
+        while handler:
+            handler._frozen = True
+            handler = handler._next_handler
+        return self
+
     @abstractmethod
-    async def handle(self, context, response_handler):
+    async def check(self, context):
         """
         Método abstracto que debe implementar cada handler
-        
+
+        Args:
+            context: Datos a validar
+
+        Returns:
+            tuple or None: (datos de respuesta, código HTTP) si la validación
+            falló, None si pasó
+        """
+        pass
+
+    async def check_all(self, context):
+        """
+        Todas las validaciones fallidas de este handler (modo collect-all-errors)
+
+        Por defecto es el resultado de check(); los handlers que validan
+        varios campos a la vez lo sobrescriben.
+
+        Returns:
+            list: (datos de respuesta, código HTTP) de cada validación fallida
+        """
+        error = await self.check(context)
+        return [error] if error is not None else []
+
+    async def handle(self, context, response_handler):
+        """
+        Ejecutar la cadena desde este handler hasta el primer error
+
         Args:
             context: Datos a validar
             response_handler: Función para enviar respuesta HTTP
-            
+
         Returns:
             bool: True si la validación pasó, False si falló
         """
-        if self._next_handler:
-            return await self._next_handler.handle(context, response_handler)
+        handler = self
+        while handler:
+            error = await handler.check(context)
+            if error is not None:
+                response_handler(*error)
+                return False
+            handler = handler._next_handler
         return True
+
+    async def handle_all(self, context):
+        """
+        Ejecutar todas las validaciones (modo collect-all-errors)
+
+        Returns:
+            list: (datos de respuesta, código HTTP) de cada validación fallida
+        """
+        errors = []
+        handler = self
+        while handler:
+            if not (handler.db_backed and errors):
+                errors.extend(await handler.check_all(context))
+            handler = handler._next_handler
+        return errors
+
+
+def merge_validation_errors(errors):
+    """
+    Unir los errores de handle_all() en una sola respuesta
+
+    Returns:
+        tuple: ({'message': primer mensaje, 'errors': [mensajes]}, código HTTP más alto)
+    """
+    messages = [data['message'] for data, _ in errors]
+    return {'message': messages[0], 'errors': messages}, max(status for _, status in errors)
@@ -0,0 +1,221 @@
+"""
+Validación declarativa de payloads
+
+Cada payload se describe con un Schema de Fields y se compila una sola vez
+(al importar el módulo): cada Field se convierte en una función check con sus
+normalizaciones y reglas ya resueltas (closures con las expresiones regulares
+compiladas), y el Schema en una función validate(data) que recorre esos
+checks en una pasada.
+"""
+import re
+
+_MISSING = object()
+
+RULES = ('required', 'type', 'min_length', 'max_length', 'pattern', 'choices')
+
+
+class Field:
+    """
+    Definición de un campo
+
+    Args:
+        required (bool): El campo debe venir y no estar vacío
+        strip (bool): Quitar espacios al inicio y al final
+        lower (bool): Pasar a minúsculas
+        nullable (bool): None o vacío son válidos y se normalizan a None
+        min_length (int): Longitud mínima (tras normalizar)
+        max_length (int): Longitud máxima (tras normalizar)
+        pattern (str | re.Pattern): Expresión que debe cumplir (re.match)
+        choices (iterable): Valores permitidos (tras normalizar)
+        string (bool): El valor debe ser str (False = se copia tal cual)
+        message (str): Mensaje de error por defecto para todas las reglas
+        messages (dict): Mensaje por regla (required, type, min_length,
+            max_length, pattern, choices)
+    """
+
+    def __init__(self, required=False, strip=True, lower=False, nullable=False,
+                 min_length=None, max_length=None, pattern=None, choices=None,
+                 string=True, message=None, messages=None):
+        self.required = required
+        self.strip = strip
+        self.lower = lower
+        self.nullable = nullable
+        self.min_length = min_length
+        self.max_length = max_length
+        self.pattern = re.compile(pattern) if isinstance(pattern, str) else pattern
+        self.choices = frozenset(choices) if choices is not None else None
+        self.string = string
+        self.messages = {rule: message for rule in RULES}
+        self.messages.update(messages or {})
+
+    def _rules(self):
+        """Reglas del campo en orden: pares (falla(value) -> bool, mensaje)"""
+        rules = []
+        if self.min_length is not None:
+            rules.append((_shorter_than(self.min_length), self.messages['min_length']))
+        if self.max_length is not None:
+            rules.append((_longer_than(self.max_length), self.messages['max_length']))
+        if self.pattern is not None:
+            rules.append((_no_match(self.pattern), self.messages['pattern']))
+        if self.choices is not None:
+            rules.append((_not_in(self.choices), self.messages['choices']))
+        return rules
+
+    def compile(self, name):
+        """
+        Compilar el campo en una función check(value, normalized, missing, errors)
+
+        check recibe un valor presente en el payload y deja el valor
+        normalizado en `normalized[name]`, o agrega (campo, mensaje) a
+        `missing` (obligatorio vacío) o a `errors` (primera regla que falla).
+
+        Args:
+            name (str): Nombre del campo en el payload
+        """
+        # Vacío (o None) en un obligatorio cuenta como faltante; en un opcional es None
+        empty_is_missing = self.required and not self.nullable
+        check_empty = self.required or self.nullable
+        required_error = (name, self.messages['required'])
+        type_error = (name, self.messages['type'])
+
+        def empty(normalized, missing):
+            if empty_is_missing:
+                missing.append(required_error)
+            else:
+                normalized[name] = None
+
+        if not self.string:
+            def check(value, normalized, missing, errors):
+                if value is None or value == '':
+                    empty(normalized, missing)
+                else:
+                    normalized[name] = value
+            return check
+
+        normalizers = []
+        if self.strip:
+            normalizers.append(str.strip)
+        if self.lower:
+            normalizers.append(str.lower)
+        rules = [(fails, (name, message)) for fails, message in self._rules()]
+
+        def check(value, normalized, missing, errors):
+            if value.__class__ is not str:
+                if value is None and check_empty:
+                    empty(normalized, missing)
+                else:
+                    errors.append(type_error)
+                return
+            for normalize in normalizers:
+                value = normalize(value)
+            if check_empty and not value:
+                empty(normalized, missing)
+                return
+            for fails, error in rules:
+                if fails(value):
+                    errors.append(error)
+                    return
+            normalized[name] = value
+
+        return check
+
+
+def _shorter_than(limit):
+    return lambda value: len(value) < limit
+
+
+def _longer_than(limit):
+    return lambda value: len(value) > limit
+
+
+def _no_match(pattern):
+    match = pattern.match
+    return lambda value: match(value) is None
+
+
+def _not_in(choices):
+    return lambda value: value not in choices
+
+
+class Schema:
+    """
+    Conjunto de campos de un payload
+
+    Args:
+        fields (dict): Nombre del campo en el payload -> Field (en orden de validación)
+        required_message (str): Un solo mensaje para todos los obligatorios
+            que falten (si no, el 'required' de cada campo)
+        unknown_message (str): Rechazar campos no declarados; admite {fields}
+        empty_message (str): Rechazar payloads sin ningún campo declarado
+    """
+
+    def __init__(self, fields, required_message=None, unknown_message=None, empty_message=None):
+        self.fields = dict(fields)
+        self.required_message = required_message
+        self.unknown_message = unknown_message
+        self.empty_message = empty_message
+
+    def compile(self):
+        """
+        Compilar el schema en una función validate(data) -> (datos, errores)
+
+        `datos` tiene solo los campos declarados que vinieron en el payload, ya
+        normalizados. `errores` es una lista de (campo, mensaje) en orden:
+        campos no permitidos, obligatorios faltantes, payload vacío y luego un
+        error por campo. Los errores del payload completo usan campo None.
+        """
+        names = frozenset(self.fields)
+        required_message = self.required_message
+        unknown_message = self.unknown_message
+        empty_message = self.empty_message
+        checks = tuple(
+            (name, (name, field.messages['required']) if field.required else None, field.compile(name))
+            for name, field in self.fields.items()
+        )
+
+        def validate(data):
+            if data is None:
+                data = {}
+            normalized = {}
+            missing = []
+            errors = []
+            present = 0
+            for name, required_error, check in checks:
+                value = data.get(name, _MISSING)
+                if value is _MISSING:
+                    if required_error is not None:
+                        missing.append(required_error)
+                    continue
+                present += 1
+                check(value, normalized, missing, errors)
+            if (not missing and not errors
+                    and (unknown_message is None or present == len(data))
+                    and (empty_message is None or present)):
+                return normalized, errors
+            return normalized, _collect_errors(data, names, present, missing, errors,
+                                               required_message, unknown_message, empty_message)
+
+        validate.schema = self
+        return validate
+
+
+def _collect_errors(data, names, present, missing, errors, required_message, unknown_message, empty_message):
+    """Ordenar los errores de validate(): payload completo primero, luego por campo"""
+    result = []
+    if unknown_message is not None and present != len(data):
+        unknown = [key for key in data if key not in names]
+        result.append((None, unknown_message.format(fields=', '.join(unknown))))
+    if missing:
+        if required_message is not None:
+            result.append((None, required_message))
+        else:
+            result.extend(missing)
+    if empty_message is not None and not present:
+        result.append((None, empty_message))
+    result.extend(errors)
+    return result
+
+
+def error_messages(errors):
+    """Mensajes de una lista de errores (campo, mensaje) de validate()"""
+    return [message for _, message in errors]